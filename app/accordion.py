@@ -1,6 +1,9 @@
 """
 Componente Acordeon para PyQt6.
 Exibe eixos temáticos com contagem de respostas sim/não.
+
+As respostas são carregadas uma única vez por AccordionWidget
+(Database.get_respostas_agrupadas) e as contagens são mantidas em memória.
 """
 
 from PyQt6.QtWidgets import (
@@ -29,6 +32,7 @@ class AccordionItem(QFrame):
     """Item de acordeon com header e conteúdo expansível."""
 
     response_changed = pyqtSignal(int, str)  # resposta_id, novo_valor
+    score_changed = pyqtSignal(int, str)  # nova pontuação, novo nível de risco
 
     def __init__(self, eixo_nome, respostas, db, parent=None, avaliacao_id=None):
         super().__init__(parent)
@@ -105,12 +109,10 @@ class AccordionItem(QFrame):
         )
         header_layout.addWidget(eixo_label, 1)
 
-        # Contagem de respostas (sem emojis)
-        contagem = self.db.get_contagem_respostas(
-            self.eixo_nome, avaliacao_id=self.avaliacao_id
-        )
-        sim_count = contagem.get("sim", 0)
-        nao_count = contagem.get("nao", 0)
+        # Contagem de respostas (sem emojis), calculada das respostas em memória
+        contagem = self._contar_respostas()
+        sim_count = contagem["sim"]
+        nao_count = contagem["nao"]
 
         count_label = QLabel(f"[✓ {sim_count}  ✗ {nao_count}]")
         count_label.setStyleSheet(
@@ -282,28 +284,40 @@ class AccordionItem(QFrame):
         sim_cb.blockSignals(False)
         nao_cb.blockSignals(False)
 
-        # Atualizar no banco de dados
-        self.db.update_resposta(resposta_id, novo_valor)
+        # Atualizar no banco de dados (recalcula pontuação e nível)
+        totais = self.db.update_resposta(resposta_id, novo_valor)
 
-        # Atualizar contagem no header
+        # Atualizar cópia local e contagem no header (sem nova consulta)
+        for resposta in self.respostas:
+            if resposta["id"] == resposta_id:
+                resposta["resposta"] = novo_valor
+                break
         self.update_count()
 
-        # Emitir sinal
+        # Emitir sinais
         self.response_changed.emit(resposta_id, novo_valor)
+        if totais:
+            self.score_changed.emit(totais["pontuacao"], totais["nivel_risco"])
 
     def update_count(self):
         """Atualiza a contagem de respostas no header."""
-        contagem = self.db.get_contagem_respostas(
-            self.eixo_nome, avaliacao_id=self.avaliacao_id
-        )
-        sim_count = contagem.get("sim", 0)
-        nao_count = contagem.get("nao", 0)
-        self.count_label.setText(f"[✓ {sim_count}  ✗ {nao_count}]")
+        contagem = self._contar_respostas()
+        self.count_label.setText(f"[✓ {contagem['sim']}  ✗ {contagem['nao']}]")
+
+    def _contar_respostas(self):
+        """Conta sim/não nas respostas carregadas deste eixo."""
+        contagem = {"sim": 0, "nao": 0}
+        for resposta in self.respostas:
+            if resposta.get("resposta") in contagem:
+                contagem[resposta["resposta"]] += 1
+        return contagem
 
 
 class AccordionWidget(QWidget):
     """Widget container com múltiplos acordeons (um por eixo)."""
 
+    score_changed = pyqtSignal(int, str)  # nova pontuação, novo nível de risco
+
     def __init__(self, db, eixos, parent=None, avaliacao_id=None):
         super().__init__(parent)
         self.db = db
@@ -315,14 +329,16 @@ class AccordionWidget(QWidget):
         layout.setContentsMargins(0, 0, 0, 0)
         layout.setSpacing(8)
 
+        # Uma única consulta para todos os eixos
+        agrupadas = self.db.get_respostas_agrupadas(avaliacao_id)
+
         # Criar um acordeon para cada eixo
         for eixo_nome in eixos:
-            respostas = self.db.get_respostas_by_eixo(
-                eixo_nome, avaliacao_id=avaliacao_id
-            )
+            respostas = agrupadas.get(eixo_nome, {}).get("respostas", [])
             acordeon = AccordionItem(
                 eixo_nome, respostas, self.db, avaliacao_id=avaliacao_id
             )
+            acordeon.score_changed.connect(self.score_changed)
             self.acordeons.append(acordeon)
             layout.addWidget(acordeon)
 
@@ -331,9 +347,10 @@ class AccordionWidget(QWidget):
 
     def refresh_all(self):
         """Atualiza todos os acordeons com dados do BD."""
+        agrupadas = self.db.get_respostas_agrupadas(self.avaliacao_id)
         for acordeon in self.acordeons:
-            acordeon.respostas = self.db.get_respostas_by_eixo(
-                acordeon.eixo_nome, avaliacao_id=self.avaliacao_id
+            acordeon.respostas = agrupadas.get(acordeon.eixo_nome, {}).get(
+                "respostas", []
             )
             acordeon.update_count()
             if acordeon.is_expanded and acordeon.content_widget:
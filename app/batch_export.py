@@ -0,0 +1,154 @@
+"""
+Exportação de prontuários em lote.
+
+As avaliações são lidas do banco em blocos e renderizadas em paralelo por
+um ProcessPoolExecutor (um PDFGenerator por processo). O destino é um
+diretório ou um único arquivo .zip; no modo ZIP os PDFs voltam dos
+processos como bytes e vão direto para o arquivo, sem arquivos temporários.
+"""
+
+import multiprocessing
+import os
+import re
+import zipfile
+from contextlib import nullcontext
+from concurrent.futures import (
+    ALL_COMPLETED,
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    wait,
+)
+
+from db import Database
+
+# Gerador reaproveitado por todas as avaliações do mesmo processo
+_generator = None
+
+
+def _init_worker():
+    global _generator
+    from pdf_generator import PDFGenerator
+
+    _generator = PDFGenerator()
+
+
+def _render(record, output_path):
+    """
+    Executado no processo filho: gera um prontuário.
+
+    Com output_path grava o arquivo e devolve o caminho; sem ele (modo ZIP)
+    devolve os bytes do PDF, sem passar pelo disco.
+    """
+    if output_path is None:
+        return _generator.generate_prontuario_bytes(record)
+    _generator.generate_prontuario(record, output_path)
+    return output_path
+
+
+def export_filename(record):
+    """Nome do arquivo de um prontuário: '<id>_<paciente>.pdf'."""
+    nome = re.sub(r"[^\w-]+", "_", record.get("patient_name") or "paciente").strip("_")
+    return f"{record['id']:06d}_{nome or 'paciente'}.pdf"
+
+
+def export_batch(
+    destino,
+    data_inicio=None,
+    data_fim=None,
+    nivel_risco=None,
+    db_path=None,
+    db=None,
+    workers=None,
+    chunk_size=200,
+    progress=None,
+    should_cancel=None,
+):
+    """
+    Gera um prontuário por avaliação que satisfaz os filtros.
+
+    Args:
+        destino: Diretório de saída, ou caminho terminado em .zip
+        data_inicio / data_fim / nivel_risco: Filtros (ver
+            Database.iter_avaliacoes_completas); None = sem filtro
+        db_path: Banco a exportar (padrão: banco do usuário)
+        db: Database já aberto (ex.: o do app); tem precedência sobre
+            db_path e não é fechado ao final
+        workers: Número de processos (padrão: núcleos da CPU)
+        chunk_size: Avaliações lidas do banco por consulta
+        progress: Callback progress(feitos, total), opcional
+        should_cancel: Callable sem argumentos; True interrompe a exportação
+
+    Returns:
+        Dicionário {'total': avaliações encontradas, 'gerados': PDFs
+        gravados, 'destino': caminho, 'cancelado': bool}
+    """
+    workers = workers or os.cpu_count() or 1
+    como_zip = str(destino).lower().endswith(".zip")
+    if not como_zip:
+        os.makedirs(destino, exist_ok=True)
+
+    gerados = 0
+    cancelado = False
+    zip_file = zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED) if como_zip else None
+    try:
+        # Banco recebido pronto não é fechado aqui
+        banco = nullcontext(db) if db is not None else Database(db_path)
+        with banco as db, ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            # spawn: seguro quando chamado de uma thread da interface Qt
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as pool:
+            total = db.count_avaliacoes(data_inicio, data_fim, nivel_risco)
+            if progress:
+                progress(0, total)
+
+            pendentes = set()
+            nomes = {}  # futuro -> nome do arquivo dentro do ZIP
+
+            def coletar(quando):
+                nonlocal gerados
+                prontos, restantes = wait(pendentes, return_when=quando)
+                for futuro in prontos:
+                    resultado = futuro.result()
+                    if zip_file is not None:
+                        zip_file.writestr(nomes.pop(futuro), resultado)
+                    gerados += 1
+                    if progress:
+                        progress(gerados, total)
+                return restantes
+
+            registros = db.iter_avaliacoes_completas(
+                data_inicio, data_fim, nivel_risco, chunk_size=chunk_size
+            )
+            for record in registros:
+                if should_cancel and should_cancel():
+                    cancelado = True
+                    break
+                # Poucas tarefas em voo: memória constante mesmo com milhares
+                if len(pendentes) >= workers * 4:
+                    pendentes = coletar(FIRST_COMPLETED)
+                nome = export_filename(record)
+                if zip_file is not None:
+                    futuro = pool.submit(_render, record, None)
+                    nomes[futuro] = nome
+                else:
+                    futuro = pool.submit(_render, record, os.path.join(destino, nome))
+                pendentes.add(futuro)
+
+            if cancelado:
+                for futuro in pendentes:
+                    futuro.cancel()
+                pendentes = {f for f in pendentes if not f.cancelled()}
+            if pendentes:
+                coletar(ALL_COMPLETED)
+    finally:
+        if zip_file is not None:
+            zip_file.close()
+
+    return {
+        "total": total,
+        "gerados": gerados,
+        "destino": destino,
+        "cancelado": cancelado,
+    }
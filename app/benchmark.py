@@ -0,0 +1,527 @@
+"""
+Benchmarks de desempenho do sistema.
+
+Uso:
+    python benchmark.py indices [--respostas 1000000]
+    python benchmark.py insert [--avaliacoes 5000] [--lote 1000]
+    python benchmark.py score [--vetores 200000]
+    python benchmark.py pdf [--pdfs 200]
+    python benchmark.py quiz [--rodadas 5]
+    python benchmark.py busca [--avaliacoes 1000000]
+    python benchmark.py inicio [--rodadas 10] [--exe dist/SistemaAvaliacaoRisco]
+
+Cada subcomando cria seus próprios dados sintéticos em um diretório
+temporário; o banco real do usuário nunca é tocado.
+"""
+
+import argparse
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import scoring
+from data_manager import load_compiled_questions
+from db import Database
+
+PERGUNTAS_POR_AVALIACAO = 22
+EIXOS = [
+    ("Eixo 1 — Comportamento Alimentar", range(1, 5)),
+    ("Eixo 2 — Imagem Corporal", range(5, 9)),
+    ("Eixo 3 — Emoção e Autoconceito", range(9, 13)),
+    ("Eixo 4 — Controle e Rotina", range(13, 18)),
+    ("Eixo 5 — Percepção do Problema", range(18, 23)),
+]
+
+
+def _avaliacao_sintetica(n, data=None):
+    """Monta uma avaliação sintética no formato de save_avaliacoes_bulk."""
+    return {
+        "nome_paciente": f"Paciente {n}",
+        "nivel_risco": "Baixo",
+        "pontuacao": 30,
+        "data_criacao": data,
+        "respostas": [
+            {
+                "eixo_nome": eixo,
+                "question_id": pid,
+                "pergunta_texto": f"Pergunta {pid}",
+                "resposta": "sim" if (n + pid) % 2 else "nao",
+                "pontos": 1,
+            }
+            for eixo, ids in EIXOS
+            for pid in ids
+        ],
+    }
+
+
+def _popular(db, total_avaliacoes, lote=2000):
+    """Insere avaliações sintéticas em lotes (uma transação por lote)."""
+    inicio = datetime(2015, 1, 1)
+    for base in range(0, total_avaliacoes, lote):
+        db.save_avaliacoes_bulk(
+            _avaliacao_sintetica(n, inicio + timedelta(minutes=37 * n))
+            for n in range(base, min(base + lote, total_avaliacoes))
+        )
+
+
+def _medir(fn, repeticoes):
+    """Retorna a mediana (ms) de várias execuções de fn."""
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        fn()
+        tempos.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(tempos)
+
+
+def _medir_consultas(db, total_avaliacoes, repeticoes):
+    ids = [random.randint(1, total_avaliacoes) for _ in range(repeticoes)]
+    it = iter(ids * 3)
+    eixo = EIXOS[2][0]
+    return {
+        "respostas_avaliacao": _medir(
+            lambda: db.get_respostas_avaliacao(next(it)), repeticoes
+        ),
+        "contagem_eixo": _medir(
+            lambda: db.get_contagem_respostas(eixo, next(it)), repeticoes
+        ),
+        "historico_8": _medir(lambda: db.get_avaliacoes(limit=8), repeticoes),
+        "delete_avaliacao": _medir(
+            lambda: db.delete_avaliacao(next(it)), min(repeticoes, 20)
+        ),
+    }
+
+
+def bench_indices(args):
+    """Latência das consultas principais com e sem índices, por tamanho."""
+    alvo = args.respostas // PERGUNTAS_POR_AVALIACAO
+    tamanhos = sorted({max(1, alvo // 100), max(1, alvo // 10), alvo})
+
+    print(f"{'respostas':>10} {'índices':>8} " + " ".join(
+        f"{nome:>20}"
+        for nome in ("respostas_avaliacao", "contagem_eixo", "historico_8", "delete_avaliacao")
+    ))
+    with tempfile.TemporaryDirectory() as tmp:
+        for total in tamanhos:
+            path = os.path.join(tmp, f"bench_{total}.db")
+            db = Database(path)
+            _popular(db, total)
+
+            com = _medir_consultas(db, total, args.repeticoes)
+
+            conn = db._get_conn()
+            conn.execute("DROP INDEX idx_respostas_avaliacao_pergunta")
+            conn.execute("DROP INDEX idx_avaliacoes_data")
+            sem = _medir_consultas(db, total, max(3, args.repeticoes // 10))
+            db.close()
+
+            linhas = total * PERGUNTAS_POR_AVALIACAO
+            for rotulo, res in (("sim", com), ("não", sem)):
+                print(f"{linhas:>10} {rotulo:>8} " + " ".join(
+                    f"{res[k]:>18.3f}ms" for k in res
+                ))
+
+
+def _salvar_por_linha(db, av):
+    """Caminho antigo: um execute e um datetime.now() por resposta."""
+    conn = db._get_conn()
+    with conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO avaliacoes (nome_paciente, nivel_risco, pontuacao, data_criacao) VALUES (?, ?, ?, ?)",
+            (av["nome_paciente"], av["nivel_risco"], av["pontuacao"], datetime.now()),
+        )
+        avaliacao_id = cursor.lastrowid
+        for r in av["respostas"]:
+            cursor.execute(
+                "INSERT INTO respostas (pergunta_id, resposta, pontos, data_criacao, avaliacao_id) VALUES (?, ?, ?, ?, ?)",
+                (
+                    r.get("question_id"),
+                    db._normalize_resposta(r.get("resposta")),
+                    r.get("pontos", 0),
+                    datetime.now(),
+                    avaliacao_id,
+                ),
+            )
+
+
+def bench_insert(args):
+    """Vazão de escrita (avaliações/s): por linha vs executemany vs lote."""
+    avaliacoes = [_avaliacao_sintetica(n) for n in range(args.avaliacoes)]
+
+    def por_linha(db):
+        for av in avaliacoes:
+            _salvar_por_linha(db, av)
+
+    def bulk_individual(db):
+        for av in avaliacoes:
+            db.save_avaliacoes_bulk([av])
+
+    def bulk_lote(db):
+        for i in range(0, len(avaliacoes), args.lote):
+            db.save_avaliacoes_bulk(avaliacoes[i : i + args.lote])
+
+    caminhos = [
+        ("por linha (antigo)", por_linha),
+        ("executemany, 1/transação", bulk_individual),
+        (f"executemany, {args.lote}/transação", bulk_lote),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, (nome, fn) in enumerate(caminhos):
+            db = Database(os.path.join(tmp, f"insert_{i}.db"))
+            t0 = time.perf_counter()
+            fn(db)
+            dt = time.perf_counter() - t0
+            db.close()
+            print(f"{nome:<32} {args.avaliacoes / dt:>10.0f} avaliações/s")
+
+
+def bench_score(args):
+    """Vazão de score_batch (vetores/s): Python puro vs NumPy."""
+    questionario = load_compiled_questions()
+    rng = random.Random(42)
+    vetores = [
+        [rng.randint(0, 1) for _ in range(len(questionario))]
+        for _ in range(args.vetores)
+    ]
+
+    implementacoes = [("python puro", False)]
+    np = scoring._np()
+    if np is not None:
+        implementacoes.append(("numpy", True))
+        vetores_np = np.asarray(vetores, dtype=np.int8)
+    else:
+        print("NumPy não instalado; medindo apenas o fallback")
+
+    for nome, use_numpy in implementacoes:
+        entrada = vetores_np if use_numpy else vetores
+        t0 = time.perf_counter()
+        scoring.score_batch(entrada, questionario, use_numpy=use_numpy)
+        dt = time.perf_counter() - t0
+        print(f"{nome:<16} {args.vetores / dt:>14,.0f} vetores/s")
+
+
+def _record_sintetico(n):
+    """Avaliação sintética no formato de Database.get_avaliacao_completa."""
+    av = _avaliacao_sintetica(n)
+    return {
+        "id": n,
+        "patient_name": av["nome_paciente"],
+        "level": av["nivel_risco"],
+        "score": av["pontuacao"],
+        "data": "01/01/2025 10:00",
+        "responses": [
+            dict(r, pergunta_id=r["question_id"]) for r in av["respostas"]
+        ],
+    }
+
+
+def bench_pdf(args):
+    """Vazão de geração de prontuários (PDFs/s) de 22 perguntas."""
+    import pdf_generator
+    from pdf_generator import PDFGenerator
+
+    records = [_record_sintetico(n) for n in range(args.pdfs)]
+
+    def estilos_por_pdf(path, record):
+        # Controle: caminho antigo, estilos e flowables fixos refeitos a cada PDF
+        pdf_generator._cache = None
+        PDFGenerator().generate_prontuario(record, path)
+
+    def novo_gerador(path, record):
+        PDFGenerator().generate_prontuario(record, path)
+
+    gerador = PDFGenerator()
+
+    def gerador_reutilizado(path, record):
+        gerador.generate_prontuario(record, path)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.pdf")
+        # Aquecimento (imports e primeira construção de estilos)
+        novo_gerador(path, records[0])
+        controle = None
+        for nome, fn in (
+            ("estilos refeitos por PDF", estilos_por_pdf),
+            ("PDFGenerator() por PDF", novo_gerador),
+            ("PDFGenerator reutilizado", gerador_reutilizado),
+        ):
+            t0 = time.perf_counter()
+            for record in records:
+                fn(path, record)
+            vazao = args.pdfs / (time.perf_counter() - t0)
+            if controle is None:
+                controle = vazao
+                print(f"{nome:<28} {vazao:>8.1f} PDFs/s  (controle)")
+            else:
+                print(f"{nome:<28} {vazao:>8.1f} PDFs/s  ({vazao / controle - 1:+.1%})")
+
+
+def bench_quiz(args):
+    """Tempo de quadro por resposta (ms): tela recriada vs QuizView persistente."""
+    # Sem display (CI, SSH) o Qt renderiza fora da tela
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication, QStackedWidget
+
+    from data_manager import QuestionManager
+    from main import QuizView
+
+    app = QApplication.instance() or QApplication([])
+    stack = QStackedWidget()
+    stack.resize(1280, 800)
+    stack.show()
+    qm = QuestionManager(load_compiled_questions())
+
+    def sem_acao(*_):
+        pass
+
+    def percorrer(persistente):
+        tempos = []
+        view = None
+        for _ in range(args.rodadas):
+            qm.reset()
+            while not qm.is_finished():
+                t0 = time.perf_counter()
+                if view is None or not persistente:
+                    # Caminho antigo: toda a árvore de widgets refeita por resposta
+                    if view is not None:
+                        stack.removeWidget(view)
+                        view.deleteLater()
+                    view = QuizView(sem_acao, sem_acao)
+                    stack.addWidget(view)
+                    stack.setCurrentWidget(view)
+                view.mark_answer(t0)
+                pintados = len(view.frame_times)
+                view.show_question(
+                    qm.get_current_question(),
+                    qm.get_current_eixo(),
+                    qm.get_current_question_number(),
+                    qm.total_questions,
+                    500,
+                )
+                while len(view.frame_times) == pintados:
+                    app.processEvents()
+                tempos.append(view.frame_times[-1])
+                qm.answer_question("sim")
+        return tempos
+
+    percorrer(True)  # Aquecimento (fontes, primeira compilação do estilo)
+    for nome, persistente in (("recriada por resposta", False), ("persistente", True)):
+        tempos = sorted(percorrer(persistente))
+        p95 = tempos[int(len(tempos) * 0.95) - 1]
+        print(
+            f"{nome:<24} mediana {statistics.median(tempos):>7.2f}ms"
+            f"   p95 {p95:>7.2f}ms   máx {tempos[-1]:>7.2f}ms"
+        )
+
+
+NOMES = ["Ana", "Maria", "José", "João", "Lúcia", "Pedro", "Marcos", "Beatriz",
+         "Carla", "Antônio", "Fernanda", "Rafael", "Juliana", "Luís", "Patrícia"]
+SOBRENOMES = ["Silva", "Santos", "Oliveira", "Souza", "Pereira", "Lima", "Carvalho",
+              "Gomes", "Ribeiro", "Almeida", "Conceição", "Araújo", "Fernandes", "Barros"]
+
+
+def _popular_cabecalhos(db, total, lote=50_000):
+    """Só a tabela avaliacoes (sem respostas), com nomes realistas."""
+    rng = random.Random(7)
+    niveis = ["Baixo", "Médio", "Alto", "Crítico"]
+    inicio = datetime(2015, 1, 1)
+    conn = db._get_conn()
+    for base in range(0, total, lote):
+        with conn:
+            conn.executemany(
+                "INSERT INTO avaliacoes (nome_paciente, nivel_risco, pontuacao, data_criacao) VALUES (?, ?, ?, ?)",
+                (
+                    (
+                        f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)} {n}",
+                        rng.choice(niveis),
+                        rng.randint(0, 66),
+                        (inicio + timedelta(minutes=5 * n)).isoformat(" "),
+                    )
+                    for n in range(base, min(base + lote, total))
+                ),
+            )
+
+
+def bench_busca(args):
+    """Latência da busca do histórico (primeira página de 50) por consulta."""
+    consultas = [
+        ("'m'", {"texto": "m"}),
+        ("'mar'", {"texto": "mar"}),
+        ("'maria'", {"texto": "maria"}),
+        ("'maria sil'", {"texto": "maria sil"}),
+        ("'jose' (sem acento)", {"texto": "jose"}),
+        ("'conceicao lu'", {"texto": "conceicao lu"}),
+        ("'999999' (raro)", {"texto": "999999"}),
+        ("'xyz' (nenhum)", {"texto": "xyz"}),
+        ("nível Crítico", {"nivel_risco": "Crítico"}),
+        ("pontuação 60-66", {"pontuacao_min": 60, "pontuacao_max": 66}),
+        ("'ana' + Crítico + 53-66", {"texto": "ana", "nivel_risco": "Crítico", "pontuacao_min": 53}),
+        ("'ana' + 2016", {
+            "texto": "ana",
+            "data_inicio": datetime(2016, 1, 1).date(),
+            "data_fim": datetime(2016, 12, 31).date(),
+        }),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, "busca.db"))
+        t0 = time.perf_counter()
+        _popular_cabecalhos(db, args.avaliacoes)
+        db._get_conn().execute("ANALYZE")
+        print(f"{args.avaliacoes} avaliações inseridas em {time.perf_counter() - t0:.1f}s")
+
+        for nome, filtros in consultas:
+            ms = _medir(lambda: db.search_avaliacoes(filtros, 50), args.repeticoes)
+            encontrados = len(db.search_avaliacoes(filtros, 50)[0])
+            print(f"{nome:<28} {ms:>8.2f}ms  ({encontrados} na 1ª página)")
+        db.close()
+
+
+def _importtime_main(pasta):
+    """(cumulativo_ms, módulo) dos imports diretos de main.py (-X importtime)."""
+    saida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=pasta,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    # Os filhos aparecem antes do pai: junta os de nível 1 até fechar 'main'
+    filhos = []
+    for linha in saida.splitlines():
+        m = re.match(r"import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)", linha)
+        if not m:
+            continue
+        recuo = len(m.group(2))
+        if recuo == 0:
+            if m.group(3) == "main":
+                return sorted(filhos, reverse=True)
+            filhos = []
+        elif recuo == 2:
+            filhos.append((int(m.group(1)) / 1000, m.group(3)))
+    return []
+
+
+def _abrir_ate_interativo(comando, env, relatorio):
+    """
+    Abre o app e espera o relatório de inicialização aparecer.
+
+    Returns:
+        (ms do processo até a janela interativa, texto do relatório)
+    """
+    if os.path.exists(relatorio):
+        os.remove(relatorio)
+    t0 = time.perf_counter()
+    processo = subprocess.Popen(comando, env=env, stderr=subprocess.PIPE, text=True)
+    while not os.path.exists(relatorio):
+        if processo.poll() is not None:
+            raise SystemExit(processo.stderr.read() or f"saiu com {processo.returncode}")
+        time.sleep(0.002)
+    total = (time.perf_counter() - t0) * 1000
+    processo.communicate(timeout=60)
+    with open(relatorio, encoding="utf-8") as f:
+        return total, f.read()
+
+
+def bench_inicio(args):
+    """Tempo até a janela interativa (APP_STARTUP_REPORT) e imports mais caros."""
+    pasta = os.path.dirname(os.path.abspath(__file__))
+    if args.exe:
+        # Executável congelado: o tempo externo inclui a extração do onefile
+        comando = [os.path.abspath(args.exe)]
+    else:
+        comando = [sys.executable, os.path.join(pasta, "main.py")]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        relatorio = os.path.join(tmp, "inicio.txt")
+        # HOME temporário: o banco real não é aberto
+        env = dict(
+            os.environ,
+            APP_STARTUP_REPORT="exit",
+            APP_STARTUP_REPORT_FILE=relatorio,
+            HOME=tmp,
+            USERPROFILE=tmp,
+        )
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+        etapas = {}
+        totais = []
+        pesados = set()
+        for rodada in range(args.rodadas + 1):
+            total, texto = _abrir_ate_interativo(comando, env, relatorio)
+            if rodada == 0:
+                # Cria o banco (migrações) e aquece o cache de disco
+                print(f"primeira abertura (banco novo): {total:.0f}ms até interativo")
+                continue
+            totais.append(total)
+            for etapa, ms in re.findall(r"^  (\S.*?)\s+([\d.]+)  \(", texto, re.M):
+                etapas.setdefault(etapa, []).append(float(ms))
+            m = re.search(r"módulos pesados: (.*)", texto)
+            if m and m.group(1) != "nenhum":
+                pesados.update(m.group(1).split(", "))
+
+    print(f"\nMediana de {args.rodadas} aberturas (ms desde a importação de main.py):")
+    for etapa, tempos in etapas.items():
+        print(f"  {etapa:<18}{statistics.median(tempos):8.1f}")
+    print(f"  {'processo inteiro':<18}{statistics.median(totais):8.1f}  (até interativo)")
+    print(f"  módulos pesados antes de interativo: {', '.join(sorted(pesados)) or 'nenhum'}")
+
+    if not args.exe:
+        print("\nImports diretos de main.py mais caros (cumulativo):")
+        for ms, modulo in _importtime_main(pasta)[: args.top]:
+            print(f"  {modulo:<28}{ms:8.1f}ms")
+
+
+BENCHMARKS = {
+    "indices": bench_indices,
+    "insert": bench_insert,
+    "score": bench_score,
+    "pdf": bench_pdf,
+    "quiz": bench_quiz,
+    "busca": bench_busca,
+    "inicio": bench_inicio,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p = sub.add_parser("indices", help=bench_indices.__doc__)
+    p.add_argument("--respostas", type=int, default=1_000_000)
+    p.add_argument("--repeticoes", type=int, default=200)
+
+    p = sub.add_parser("insert", help=bench_insert.__doc__)
+    p.add_argument("--avaliacoes", type=int, default=5000)
+    p.add_argument("--lote", type=int, default=1000)
+
+    p = sub.add_parser("score", help=bench_score.__doc__)
+    p.add_argument("--vetores", type=int, default=200_000)
+
+    p = sub.add_parser("pdf", help=bench_pdf.__doc__)
+    p.add_argument("--pdfs", type=int, default=200)
+
+    p = sub.add_parser("quiz", help=bench_quiz.__doc__)
+    p.add_argument("--rodadas", type=int, default=5)
+
+    p = sub.add_parser("busca", help=bench_busca.__doc__)
+    p.add_argument("--avaliacoes", type=int, default=1_000_000)
+    p.add_argument("--repeticoes", type=int, default=20)
+
+    p = sub.add_parser("inicio", help=bench_inicio.__doc__)
+    p.add_argument("--rodadas", type=int, default=10)
+    p.add_argument("--top", type=int, default=10)
+    p.add_argument("--exe", help="Executável do PyInstaller em vez de main.py")
+
+    args = parser.parse_args()
+    BENCHMARKS[args.bench](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -85,3 +85,8 @@ FONT_FAMILY_BODY = "Poppins"  # Para texto geral (Regular/Bold)
 
 # Configurações de estilo
 BORDER_RADIUS = 2  # Raio de borda para elementos (Tkinter usa bd/relief)
+
+# Versão do layout do prontuário; incrementar ao mudar o conteúdo gerado
+# (invalida o cache de PDFs em pdf_cache.py). Fica aqui, e não em
+# pdf_generator, para o cache não precisar importar o ReportLab
+TEMPLATE_VERSION = 2
@@ -6,59 +6,238 @@ Agora usa SQLite para persistência de respostas.
 import os
 import sys
 import json
+import marshal
+import hashlib
+from array import array
+from pathlib import Path
 from db import Database
 
+# Incrementar ao mudar o layout do cache compilado
+COMPILED_FORMAT_VERSION = 1
+COMPILED_CACHE_NAME = "questions.compiled"
+
+
+def _questions_base_path():
+    """Pasta do questions.json (dentro do executável quando congelado)."""
+    if getattr(sys, "frozen", False):
+        return sys._MEIPASS
+    return os.path.dirname(os.path.abspath(__file__))
+
 
 def load_questions():
     """Carrega as perguntas do arquivo JSON."""
     try:
-        if getattr(sys, "frozen", False):
-            base_path = sys._MEIPASS
-        else:
-            base_path = os.path.dirname(os.path.abspath(__file__))
-
-        path = os.path.join(base_path, "questions.json")
+        path = os.path.join(_questions_base_path(), "questions.json")
         with open(path, "r", encoding="utf-8") as f:
             return json.load(f)
     except (FileNotFoundError, json.JSONDecodeError):
         return None
 
 
+class Eixo:
+    """Eixo temático compilado: nome e faixa de perguntas na tabela plana."""
+
+    __slots__ = ("indice", "nome", "inicio", "total")
+
+    def __init__(self, indice, nome, inicio, total):
+        self.indice = indice
+        self.nome = nome
+        self.inicio = inicio  # índice global da primeira pergunta
+        self.total = total
+
+
+class Pergunta:
+    """Pergunta compilada com índice global e pesos já resolvidos."""
+
+    __slots__ = (
+        "indice",
+        "id",
+        "texto",
+        "justificativa",
+        "eixo_indice",
+        "eixo_nome",
+        "peso_sim",
+        "peso_nao",
+    )
+
+    def __init__(
+        self, indice, id, texto, justificativa, eixo_indice, eixo_nome, peso_sim, peso_nao
+    ):
+        self.indice = indice
+        self.id = id
+        self.texto = texto
+        self.justificativa = justificativa
+        self.eixo_indice = eixo_indice
+        self.eixo_nome = eixo_nome
+        self.peso_sim = peso_sim
+        self.peso_nao = peso_nao
+
+
+class Questionario:
+    """
+    Questionário compilado em tabela plana.
+
+    Navegação, progresso e pontuação viram consultas O(1) por índice global,
+    sem percorrer a estrutura aninhada do JSON.
+    """
+
+    __slots__ = ("eixos", "perguntas", "pesos_sim", "pesos_nao", "eixo_offsets")
+
+    def __init__(self, eixos, perguntas):
+        self.eixos = tuple(eixos)
+        self.perguntas = tuple(perguntas)
+        self.pesos_sim = array("i", (p.peso_sim for p in self.perguntas))
+        self.pesos_nao = array("i", (p.peso_nao for p in self.perguntas))
+        self.eixo_offsets = tuple(e.inicio for e in self.eixos)
+
+    def __len__(self):
+        return len(self.perguntas)
+
+    def to_tuples(self):
+        """Serializa em tuplas simples (formato do cache em disco)."""
+        return (
+            tuple((e.nome, e.inicio, e.total) for e in self.eixos),
+            tuple(
+                (p.id, p.texto, p.justificativa, p.eixo_indice, p.peso_sim, p.peso_nao)
+                for p in self.perguntas
+            ),
+        )
+
+    @classmethod
+    def from_tuples(cls, eixos_t, perguntas_t):
+        """Reconstrói a partir de to_tuples()."""
+        eixos = [Eixo(i, nome, inicio, total) for i, (nome, inicio, total) in enumerate(eixos_t)]
+        perguntas = [
+            Pergunta(i, pid, texto, just, ei, eixos[ei].nome, ps, pn)
+            for i, (pid, texto, just, ei, ps, pn) in enumerate(perguntas_t)
+        ]
+        return cls(eixos, perguntas)
+
+
+def compile_questions(questions_data):
+    """Compila o dicionário do questions.json em um Questionario."""
+    eixos = []
+    perguntas = []
+    for eixo_data in questions_data["eixos"]:
+        eixo = Eixo(len(eixos), eixo_data["nome"], len(perguntas), 0)
+        for q in eixo_data["perguntas"]:
+            perguntas.append(
+                Pergunta(
+                    len(perguntas),
+                    q["id"],
+                    q["texto"],
+                    q.get("justificativa", ""),
+                    eixo.indice,
+                    eixo.nome,
+                    # Mesmos padrões históricos de answer_question
+                    q.get("peso_sim", q.get("peso", 0)),
+                    q.get("peso_nao", 1),
+                )
+            )
+        eixo.total = len(perguntas) - eixo.inicio
+        # Eixos vazios não entram na navegação
+        if eixo.total:
+            eixo.indice = len(eixos)
+            for p in perguntas[eixo.inicio :]:
+                p.eixo_indice = eixo.indice
+            eixos.append(eixo)
+    return Questionario(eixos, perguntas)
+
+
+def _compiled_cache_paths(base_path):
+    """Locais candidatos do cache compilado, em ordem de preferência."""
+    candidatos = [Path(base_path) / COMPILED_CACHE_NAME]
+    # Fallback gravável (executável congelado ou instalação somente leitura)
+    candidatos.append(Path.home() / ".app_pythonse" / COMPILED_CACHE_NAME)
+    if getattr(sys, "frozen", False):
+        candidatos.reverse()
+    return candidatos
+
+
+def load_compiled_questions():
+    """
+    Carrega o questionário compilado, usando o cache em disco quando válido.
+
+    O cache (marshal de tuplas simples) fica ao lado do questions.json e é
+    indexado pelo SHA-256 do JSON: qualquer edição no arquivo invalida o
+    cache automaticamente.
+
+    Returns:
+        Questionario, ou None se o questions.json não existir/for inválido
+    """
+    base_path = _questions_base_path()
+    try:
+        with open(os.path.join(base_path, "questions.json"), "rb") as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return None
+    digest = hashlib.sha256(raw).hexdigest()
+    caminhos = _compiled_cache_paths(base_path)
+
+    for caminho in caminhos:
+        try:
+            versao, chave, eixos_t, perguntas_t = marshal.loads(caminho.read_bytes())
+        except (OSError, EOFError, ValueError, TypeError):
+            continue
+        if versao == COMPILED_FORMAT_VERSION and chave == digest:
+            return Questionario.from_tuples(eixos_t, perguntas_t)
+
+    try:
+        questionario = compile_questions(json.loads(raw.decode("utf-8")))
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+
+    dados = marshal.dumps((COMPILED_FORMAT_VERSION, digest) + questionario.to_tuples())
+    for caminho in caminhos:
+        try:
+            caminho.parent.mkdir(exist_ok=True)
+            caminho.write_bytes(dados)
+            break
+        except OSError:
+            continue
+    return questionario
+
+
 class QuestionManager:
     """Gerencia o fluxo de perguntas e cálculo de pontuação."""
 
     def __init__(self, questions_data):
-        self.questions_data = questions_data
+        if not isinstance(questions_data, Questionario):
+            questions_data = compile_questions(questions_data)
+        self.questionario = questions_data
         self.responses = (
             []
         )  # Lista de respostas: [(eixo_idx, q_idx, pergunta_id, resposta, pontos), ...]
         self.score = 0
-        self.current_eixo_index = 0
-        self.current_question_index = 0
-        self.total_questions = sum(
-            len(eixo["perguntas"]) for eixo in self.questions_data["eixos"]
-        )
+        self.position = 0  # índice global da pergunta atual
+        self.total_questions = len(self.questionario.perguntas)
+
+    @property
+    def current_eixo_index(self):
+        """Índice do eixo atual (len(eixos) quando terminado)."""
+        if self.position >= self.total_questions:
+            return len(self.questionario.eixos)
+        return self.questionario.perguntas[self.position].eixo_indice
+
+    @property
+    def current_question_index(self):
+        """Índice da pergunta atual dentro do eixo."""
+        if self.position >= self.total_questions:
+            return 0
+        return self.position - self.questionario.eixo_offsets[self.current_eixo_index]
 
     def get_current_question_number(self):
         """Retorna o número da pergunta atual (1-indexado)."""
-        return (
-            sum(
-                len(self.questions_data["eixos"][i]["perguntas"])
-                for i in range(self.current_eixo_index)
-            )
-            + self.current_question_index
-            + 1
-        )
+        return self.position + 1
 
     def get_current_eixo(self):
         """Retorna o eixo atual."""
-        return self.questions_data["eixos"][self.current_eixo_index]
+        return self.questionario.eixos[self.current_eixo_index]
 
     def get_current_question(self):
         """Retorna a pergunta atual."""
-        eixo = self.get_current_eixo()
-        if self.current_question_index < len(eixo["perguntas"]):
-            return eixo["perguntas"][self.current_question_index]
+        if self.position < self.total_questions:
+            return self.questionario.perguntas[self.position]
         return None
 
     def answer_question(self, response):
@@ -69,19 +248,19 @@ class QuestionManager:
 
         # Determinar pontos baseado na resposta
         if response == "sim":
-            points = question.get("peso_sim", question.get("peso", 0))
+            points = question.peso_sim
         else:  # "nao"
-            points = question.get("peso_nao", 1)
+            points = question.peso_nao
 
         # Registrar resposta
         self.responses.append(
             {
-                "eixo_index": self.current_eixo_index,
+                "eixo_index": question.eixo_indice,
                 "question_index": self.current_question_index,
-                "question_id": question["id"],
-                "eixo_nome": self.get_current_eixo()["nome"],
-                "pergunta_texto": question["texto"],
-                "justificativa": question.get("justificativa", ""),
+                "question_id": question.id,
+                "eixo_nome": question.eixo_nome,
+                "pergunta_texto": question.texto,
+                "justificativa": question.justificativa,
                 "resposta": response,
                 "pontos": points,
             }
@@ -90,31 +269,32 @@ class QuestionManager:
         self.score += points
 
         # Avançar para próxima pergunta
-        self.current_question_index += 1
+        self.position += 1
 
-        if self.current_question_index >= len(self.get_current_eixo()["perguntas"]):
-            self.current_eixo_index += 1
-            self.current_question_index = 0
-
-        return self.current_eixo_index < len(self.questions_data["eixos"])
+        return self.position < self.total_questions
 
     def is_finished(self):
         """Verifica se o questionário acabou."""
-        return self.current_eixo_index >= len(self.questions_data["eixos"])
+        return self.position >= self.total_questions
 
     def reset(self):
         """Reseta o gerenciador para um novo questionário."""
         self.responses = []
         self.score = 0
-        self.current_eixo_index = 0
-        self.current_question_index = 0
+        self.position = 0
 
 
 class HistoryManager:
     """Gerencia o histórico de avaliações usando SQLite."""
 
-    def __init__(self):
-        self.db = Database()
+    def __init__(self, db=None):
+        """
+        Args:
+            db: Database compartilhado com o restante do app (conexões,
+                statements preparados e cache de linhas). Se None, abre o
+                banco padrão.
+        """
+        self.db = db if db is not None else Database()
 
     def add_assessment(self, assessment_data):
         """
@@ -136,26 +316,69 @@ class HistoryManager:
             respostas=assessment_data["responses"],
         )
 
-    def get_assessment(self, index):
-        """Retorna uma avaliação específica (ordenada por índice reverso)."""
-        avaliacoes = self.db.get_avaliacoes()
-        if 0 <= index < len(avaliacoes):
-            avaliacao = avaliacoes[index]
-            # Adicionar respostas
-            respostas = self.db.get_respostas_avaliacao(avaliacao["id"])
-            # Renomear 'eixo' para 'eixo_nome' para compatibilidade com PDF generator
-            for resp in respostas:
-                if "eixo" in resp and "eixo_nome" not in resp:
-                    resp["eixo_nome"] = resp.pop("eixo")
-            avaliacao["responses"] = respostas
-            # 'data' já vem formatada do db.get_avaliacoes()
-            return avaliacao
-        return None
+    def get_assessment(self, avaliacao_id):
+        """
+        Retorna uma avaliação pelo ID, já com suas respostas.
+
+        Args:
+            avaliacao_id: ID da avaliação no banco
+
+        Returns:
+            Dicionário da avaliação com 'responses', ou None se não existir
+        """
+        if avaliacao_id is None:
+            return None
+        # Cabeçalho + respostas em uma consulta; 'data' já vem formatada
+        return self.db.get_avaliacao_completa(avaliacao_id)
 
     def get_all(self):
         """Retorna todas as avaliações."""
         return self.db.get_avaliacoes()
 
+    def get_page(self, limit, cursor=None):
+        """
+        Retorna uma página do histórico (mais recentes primeiro).
+
+        Args:
+            limit: Número de registros por página
+            cursor: Cursor devolvido pela página anterior (None = primeira)
+
+        Returns:
+            Tupla (registros, cursor da próxima página ou None)
+        """
+        return self.db.get_avaliacoes_page(limit, after=cursor)
+
+    def get_page_keys(self, limit, cursor=None):
+        """
+        Retorna só as chaves (cursores) das próximas avaliações do histórico.
+
+        Args:
+            limit: Número máximo de chaves
+            cursor: Cursor a partir do qual continuar (None = início)
+
+        Returns:
+            Lista de cursores, cada um aceito por get_page
+        """
+        return self.db.get_avaliacoes_keys(limit, after=cursor)
+
+    def search_page(self, filtros, limit, cursor=None):
+        """
+        Retorna uma página de resultados da busca (maior id primeiro).
+
+        Args:
+            filtros: Ver Database.search_avaliacoes
+            limit: Número de registros
+            cursor: Cursor devolvido pela página anterior (None = primeira)
+
+        Returns:
+            Tupla (registros, cursor da próxima página ou None)
+        """
+        return self.db.search_avaliacoes(filtros, limit, after=cursor)
+
+    def search_page_keys(self, filtros, limit, cursor=None):
+        """Cursores dos próximos resultados da busca (ver get_page_keys)."""
+        return self.db.search_avaliacoes_keys(filtros, limit, after=cursor)
+
     def get_count(self):
         """Retorna o número de avaliações."""
         return self.db.get_total_avaliacoes()
@@ -5,19 +5,96 @@ Gerencia banco de dados para respostas do questionário.
 
 import sqlite3
 import os
-from datetime import datetime
+import re
+import threading
+import unicodedata
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from pathlib import Path
+from scoring import SEM_RESPOSTA, TabelaPesos, risk_levels, score_batch
+from utils import get_risk_level
+
+
+# Tamanho do cache de statements preparados por conexão
+STATEMENT_CACHE_SIZE = 128
+
+# Avaliações (cabeçalho, completa, respostas agrupadas) mantidas em memória
+# por thread; descartadas quando o banco muda
+ROW_CACHE_SIZE = 256
+
+# PRAGMAs aplicados a cada conexão aberta
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",  # seguro com WAL e bem mais rápido que FULL
+    "PRAGMA cache_size = -16000",  # ~16 MB de page cache
+    "PRAGMA mmap_size = 268435456",  # até 256 MB mapeados em memória
+    "PRAGMA temp_store = MEMORY",
+)
+
+# Respostas com eixo e texto da pergunta vindos do catálogo (eixos/perguntas)
+SELECT_RESPOSTAS = """
+    SELECT r.id, e.nome AS eixo, r.pergunta_id, p.texto AS pergunta_texto,
+           r.resposta, r.pontos, r.data_criacao
+    FROM respostas r
+    JOIN perguntas p ON p.id = r.pergunta_id
+    JOIN eixos e ON e.id = p.eixo_id
+"""
+
+# Avaliação com respostas (LEFT JOIN); consumido por _agrupar_avaliacoes_completas
+SELECT_AVALIACAO_COMPLETA = """
+    SELECT a.id, a.nome_paciente, a.nivel_risco, a.pontuacao, a.data_criacao,
+           r.id AS r_id, e.nome AS r_eixo, r.pergunta_id AS r_pergunta_id,
+           p.texto AS r_pergunta_texto, r.resposta AS r_resposta,
+           r.pontos AS r_pontos, r.data_criacao AS r_data_criacao
+    FROM avaliacoes a
+    LEFT JOIN respostas r ON r.avaliacao_id = a.id
+    LEFT JOIN perguntas p ON p.id = r.pergunta_id
+    LEFT JOIN eixos e ON e.id = p.eixo_id
+"""
+
+
+def _sem_acentos(texto):
+    """Minúsculas sem diacríticos, como o unicode61 remove_diacritics 2 do FTS."""
+    decomposto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def _palavras_busca(texto):
+    """Palavras de um texto como o FTS as separa (letras e dígitos; '_' separa)."""
+    return re.findall(r"[^\W_]+", texto or "")
+
+
+def _nome_busca(nome):
+    """Nome normalizado para LIKE '% prefixo%': palavras sem acento, com espaço antes."""
+    return " " + " ".join(_palavras_busca(_sem_acentos(nome)))
+
+
+def _escapar_like(texto):
+    """Escapa os curingas de LIKE (para uso com ESCAPE '\\')."""
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class _DonoConexao:
+    """Chave de Database._conexoes: existe enquanto a thread usa a conexão."""
+
+    __slots__ = ("thread", "__weakref__")
+
+    def __init__(self, thread):
+        self.thread = thread
 
 
 class Database:
     """Gerenciador de banco de dados SQLite."""
 
-    def __init__(self, db_path=None):
+    def __init__(self, db_path=None, pesos=None):
         """
         Inicializa conexão com banco de dados.
 
         Args:
             db_path: Caminho do arquivo .db. Se None, cria na pasta do usuário.
+            pesos: Mapa opcional {pergunta_id: (peso_sim, peso_nao)}. Se None,
+                vem do catálogo de perguntas (sincronizado com o questions.json).
         """
         if db_path is None:
             # Criar na pasta de dados da aplicação, não no .exe
@@ -26,77 +103,402 @@ class Database:
             db_path = app_data_dir / "dbhistory.db"
 
         self.db_path = str(db_path)
+        self._pesos = pesos
+        self._perguntas_conhecidas = None
+        self._tem_fts = None
+
+        # Uma conexão persistente por thread (sqlite3 não compartilha
+        # conexões entre threads com segurança). _conexoes não as mantém
+        # vivas: a chave é o _DonoConexao guardado no threading.local, e
+        # quando a thread termina (ou o QThreadPool descarta o estado Python
+        # dela ao fim de cada Job) a entrada some e a conexão é fechada
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conexoes = weakref.WeakKeyDictionary()
+
         self._initialize_db()
 
-    def _initialize_db(self):
-        """Cria tabelas se não existirem."""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+    def __enter__(self):
+        return self
 
-            # Tabela de respostas
-            # Respostas: armazenar como inteiro (1=sim,0=nao) para otimização
-            cursor.execute(
-                """
-                CREATE TABLE IF NOT EXISTS respostas (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    eixo TEXT NOT NULL,
-                    pergunta_id INTEGER NOT NULL,
-                    pergunta_texto TEXT NOT NULL,
-                    resposta INTEGER NOT NULL CHECK (resposta IN (0,1)),
-                    pontos INTEGER DEFAULT 0,
-                    data_criacao TIMESTAMP NOT NULL,
-                    avaliacao_id INTEGER,
-                    FOREIGN KEY (avaliacao_id) REFERENCES avaliacoes(id)
-                )
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ------------------ Conexões ------------------
+    def _get_conn(self):
+        """Retorna a conexão da thread atual, abrindo-a se necessário."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=10,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        # Busca por nome sem FTS5 (_filtro_busca)
+        conn.create_function("nome_busca", 1, _nome_busca, deterministic=True)
+
+        dono = _DonoConexao(threading.current_thread())
+        with self._lock:
+            self._conexoes[dono] = conn
+            self._local.dono = dono
+            self._local.conn = conn
+            self._local.cache = {}
+            self._local.rows = OrderedDict()
+            self._local.data_version = None
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Executa um bloco em transação (commit ao final, rollback em erro)."""
+        conn = self._get_conn()
+        try:
+            with conn:
+                yield conn.cursor()
+        finally:
+            # Escritas desta conexão não alteram o data_version dela mesma
+            self._local.cache.clear()
+            self._local.rows.clear()
+
+    def _validar_cache(self):
+        """
+        Descarta os caches da thread se o banco mudou.
+
+        A mudança feita por outra conexão (outra thread, outra instância ou
+        outro processo) é detectada via PRAGMA data_version; as escritas
+        desta conexão limpam os caches em _transaction.
+        """
+        conn = self._get_conn()
+        versao = conn.execute("PRAGMA data_version").fetchone()[0]
+        if self._local.data_version != versao:
+            self._local.cache.clear()
+            self._local.rows.clear()
+            self._local.data_version = versao
+
+    def _cached(self, chave, carregar):
+        """Retorna valor do cache da thread, recalculando se o banco mudou."""
+        self._validar_cache()
+        cache = self._local.cache
+        if chave not in cache:
+            cache[chave] = carregar()
+        return cache[chave]
+
+    def _cached_row(self, chave, carregar):
+        """
+        Como _cached, para linhas: LRU de até ROW_CACHE_SIZE entradas.
+
+        Resultados None (registro inexistente) não são guardados. O valor
+        em cache é compartilhado: quem o devolve para fora deve copiá-lo.
+        """
+        self._validar_cache()
+        rows = self._local.rows
+        valor = rows.get(chave)
+        if valor is not None:
+            rows.move_to_end(chave)
+            return valor
+        valor = carregar()
+        if valor is not None:
+            rows[chave] = valor
+            if len(rows) > ROW_CACHE_SIZE:
+                rows.popitem(last=False)
+        return valor
+
+    def close(self):
+        """
+        Fecha a conexão da thread atual e as de threads já encerradas.
+
+        Conexões de threads ainda vivas (um Job ou o OutboxWorker que não
+        terminou no prazo do fechamento) continuam abertas para não falharem
+        no meio do trabalho; fecham quando a thread terminar. A thread atual
+        reabre a sua se usar o banco de novo.
+        """
+        atual = threading.current_thread()
+        with self._lock:
+            fechar = [
+                (dono, conn)
+                for dono, conn in self._conexoes.items()
+                if dono.thread is atual or not dono.thread.is_alive()
+            ]
+            for dono, _ in fechar:
+                del self._conexoes[dono]
+        for _, conn in fechar:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local.__dict__.clear()
+
+    def _initialize_db(self):
+        """Cria/atualiza o schema aplicando as migrações pendentes."""
+        conn = self._get_conn()
+        # WAL é persistente no arquivo: leitores não bloqueiam o escritor
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(
             """
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                descricao TEXT NOT NULL,
+                aplicada_em TIMESTAMP NOT NULL
             )
+        """
+        )
+        conn.commit()
 
-            # Adicionar coluna pontos se não existir (para compatibilidade com BD existente)
-            cursor.execute("PRAGMA table_info(respostas)")
-            columns = [col[1] for col in cursor.fetchall()]
-            if "pontos" not in columns:
-                cursor.execute(
-                    "ALTER TABLE respostas ADD COLUMN pontos INTEGER DEFAULT 0"
-                )
+        aplicadas = []
+        for version, migracao in MIGRATIONS:
+            if version <= self.get_schema_version():
+                continue
+            try:
+                # BEGIN IMMEDIATE serializa instâncias concorrentes do app
+                conn.execute("BEGIN IMMEDIATE")
+                # Outra instância pode ter aplicado enquanto esperávamos o lock
+                if version > self.get_schema_version():
+                    migracao(conn.cursor())
+                    conn.execute(
+                        "INSERT INTO schema_version (version, descricao, aplicada_em) VALUES (?, ?, ?)",
+                        (version, migracao.__doc__.strip(), datetime.now()),
+                    )
+                    aplicadas.append(version)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
 
-            # Tabela de avaliações (para agrupar respostas)
-            cursor.execute(
+        # Devolver ao sistema o espaço liberado pela deduplicação
+        if MIGRATIONS_COM_VACUUM.intersection(aplicadas):
+            conn.execute("VACUUM")
+
+        self._sincronizar_catalogo()
+
+    def _sincronizar_catalogo(self):
+        """Alinha as tabelas eixos/perguntas ao questions.json (só o que mudou)."""
+        # Import tardio: data_manager importa este módulo. O questionário
+        # compilado vem do cache em disco, sem reprocessar o JSON, e já traz
+        # os pesos padrão resolvidos
+        from data_manager import load_compiled_questions
+
+        questionario = load_compiled_questions()
+        if questionario is None:
+            return
+
+        desejadas = {
+            p.id: (p.eixo_nome, p.texto, p.peso_sim, p.peso_nao)
+            for p in questionario.perguntas
+        }
+        conn = self._get_conn()
+        atuais = {
+            row["id"]: (row["nome"], row["texto"], row["peso_sim"], row["peso_nao"])
+            for row in conn.execute(
                 """
-                CREATE TABLE IF NOT EXISTS avaliacoes (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    nome_paciente TEXT NOT NULL,
-                    nivel_risco TEXT NOT NULL,
-                    pontuacao INTEGER NOT NULL,
-                    data_criacao TIMESTAMP NOT NULL
-                )
+                SELECT p.id, e.nome, p.texto, p.peso_sim, p.peso_nao
+                FROM perguntas p JOIN eixos e ON e.id = p.eixo_id
             """
             )
+        }
+        mudancas = [
+            (pid,) + valores
+            for pid, valores in desejadas.items()
+            if atuais.get(pid) != valores
+        ]
+        if not mudancas:
+            return
+
+        with self._transaction() as cursor:
+            cursor.executemany(
+                "INSERT OR IGNORE INTO eixos (nome) VALUES (?)",
+                [(m[1],) for m in mudancas],
+            )
+            cursor.executemany(
+                """
+                INSERT INTO perguntas (id, eixo_id, texto, peso_sim, peso_nao)
+                VALUES (?, (SELECT id FROM eixos WHERE nome = ?), ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    eixo_id = excluded.eixo_id,
+                    texto = excluded.texto,
+                    peso_sim = excluded.peso_sim,
+                    peso_nao = excluded.peso_nao
+            """,
+                mudancas,
+            )
 
-            conn.commit()
+    def get_schema_version(self):
+        """Retorna a versão atual do schema (0 se nenhuma migração aplicada)."""
+        row = self._get_conn().execute(
+            "SELECT COALESCE(MAX(version), 0) FROM schema_version"
+        ).fetchone()
+        return row[0]
 
     # MÉTODO REMOVIDO: add_resposta
     # Use save_avaliacao_with_respostas para salvar avaliação + respostas atomicamente
 
     def update_resposta(self, resposta_id, resposta):
         """
-        Atualiza uma resposta existente.
+        Atualiza uma resposta existente e recalcula a pontuação da avaliação.
+
+        A diferença de pontos da pergunta (peso_sim/peso_nao) é aplicada ao
+        total já gravado e o nível de risco é reclassificado, tudo na mesma
+        transação, sem reler as demais respostas.
 
         Args:
             resposta_id: ID da resposta
             resposta: Novo valor ("sim" ou "nao")
+
+        Returns:
+            Dicionário {'avaliacao_id', 'pontuacao', 'nivel_risco'} com os
+            novos totais, ou None se a resposta não pertence a uma avaliação
         """
         val = self._normalize_resposta(resposta)
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        pesos = self._get_pesos()
+
+        with self._transaction() as cursor:
+            cursor.execute(
+                "SELECT avaliacao_id, pergunta_id, resposta, pontos FROM respostas WHERE id = ?",
+                (resposta_id,),
+            )
+            atual = cursor.fetchone()
+            if atual is None:
+                return None
+
+            pontos_antigos = atual["pontos"] or 0
+            pontos = pontos_antigos
+            if val != atual["resposta"] and atual["pergunta_id"] in pesos:
+                pontos = pesos[atual["pergunta_id"]][0 if val else 1]
+
             cursor.execute(
                 """
                 UPDATE respostas 
-                SET resposta = ?, data_criacao = ?
+                SET resposta = ?, pontos = ?, data_criacao = ?
                 WHERE id = ?
             """,
-                (val, datetime.now(), resposta_id),
+                (val, pontos, datetime.now(), resposta_id),
+            )
+
+            avaliacao_id = atual["avaliacao_id"]
+            if avaliacao_id is None:
+                return None
+
+            cursor.execute(
+                "SELECT pontuacao FROM avaliacoes WHERE id = ?", (avaliacao_id,)
             )
-            conn.commit()
+            row = cursor.fetchone()
+            if row is None:
+                return None
+
+            pontuacao = row["pontuacao"] + (pontos - pontos_antigos)
+            nivel_risco = get_risk_level(pontuacao)
+            cursor.execute(
+                "UPDATE avaliacoes SET pontuacao = ?, nivel_risco = ? WHERE id = ?",
+                (pontuacao, nivel_risco, avaliacao_id),
+            )
+
+        return {
+            "avaliacao_id": avaliacao_id,
+            "pontuacao": pontuacao,
+            "nivel_risco": nivel_risco,
+        }
+
+    def rescore_all(self, chunk_size=500):
+        """
+        Recalcula pontos, pontuação e nível de risco de todas as avaliações.
+
+        Percorre a tabela em blocos de IDs (uma transação por bloco), então o
+        uso de memória não cresce com o histórico. Útil após mudar os pesos
+        do questions.json.
+
+        Args:
+            chunk_size: Número de avaliações por bloco
+
+        Returns:
+            Dicionário {'avaliacoes': processadas, 'alteradas': com novo total}
+        """
+        pesos = self._get_pesos()
+        if not pesos:
+            # Catálogo sem pesos (questions.json ausente): nada a recalcular,
+            # e score_batch não aceita uma matriz sem colunas
+            return {"avaliacoes": 0, "alteradas": 0}
+        # Uma coluna por pergunta com peso conhecido, para score_batch
+        colunas = {pid: i for i, pid in enumerate(sorted(pesos))}
+        tabela = TabelaPesos(
+            [pesos[pid][0] for pid in colunas],
+            [pesos[pid][1] for pid in colunas],
+            (0,),
+        )
+        conn = self._get_conn()
+        processadas = alteradas = 0
+        ultimo_id = 0
+
+        while True:
+            cabecalhos = conn.execute(
+                "SELECT id, pontuacao, nivel_risco FROM avaliacoes WHERE id > ? ORDER BY id LIMIT ?",
+                (ultimo_id, chunk_size),
+            ).fetchall()
+            if not cabecalhos:
+                break
+            primeiro_id, ultimo_id = cabecalhos[0]["id"], cabecalhos[-1]["id"]
+            linha_de = {cab["id"]: i for i, cab in enumerate(cabecalhos)}
+
+            matriz = [[SEM_RESPOSTA] * len(colunas) for _ in cabecalhos]
+            # Pontos fora da matriz: perguntas sem peso no catálogo (mantêm o
+            # valor gravado) e respostas duplicadas para a mesma pergunta
+            extras = [0] * len(cabecalhos)
+            com_respostas = set()
+            respostas_alteradas = []
+            for r in conn.execute(
+                """
+                SELECT id, avaliacao_id, pergunta_id, resposta, pontos
+                FROM respostas
+                WHERE avaliacao_id BETWEEN ? AND ?
+            """,
+                (primeiro_id, ultimo_id),
+            ):
+                linha = linha_de.get(r["avaliacao_id"])
+                if linha is None:
+                    continue
+                com_respostas.add(linha)
+                coluna = colunas.get(r["pergunta_id"])
+                if coluna is None:
+                    extras[linha] += r["pontos"] or 0
+                    continue
+                pontos = pesos[r["pergunta_id"]][0 if r["resposta"] else 1]
+                if pontos != r["pontos"]:
+                    respostas_alteradas.append((pontos, r["id"]))
+                if matriz[linha][coluna] == SEM_RESPOSTA:
+                    matriz[linha][coluna] = r["resposta"]
+                else:
+                    extras[linha] += pontos
+
+            totais = score_batch(matriz, tabela)["totais"]
+            totais = [int(t) + e for t, e in zip(totais, extras)]
+            niveis = risk_levels(totais)
+
+            avaliacoes_alteradas = []
+            for linha, cab in enumerate(cabecalhos):
+                # Avaliações sem respostas mantêm o total gravado
+                if linha not in com_respostas:
+                    continue
+                total, nivel = totais[linha], str(niveis[linha])
+                if total != cab["pontuacao"] or nivel != cab["nivel_risco"]:
+                    avaliacoes_alteradas.append((total, nivel, cab["id"]))
+
+            with self._transaction() as cursor:
+                cursor.executemany(
+                    "UPDATE respostas SET pontos = ? WHERE id = ?",
+                    respostas_alteradas,
+                )
+                cursor.executemany(
+                    "UPDATE avaliacoes SET pontuacao = ?, nivel_risco = ? WHERE id = ?",
+                    avaliacoes_alteradas,
+                )
+
+            processadas += len(cabecalhos)
+            alteradas += len(avaliacoes_alteradas)
+
+        return {"avaliacoes": processadas, "alteradas": alteradas}
 
     def get_respostas_by_eixo(self, eixo, avaliacao_id=None):
         """
@@ -109,39 +511,35 @@ class Database:
         Returns:
             Lista de dicionários com respostas
         """
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+        cursor = self._get_conn().cursor()
 
-            if avaliacao_id:
-                cursor.execute(
-                    """
-                    SELECT id, eixo, pergunta_id, pergunta_texto, resposta, pontos, data_criacao
-                    FROM respostas
-                    WHERE eixo = ? AND avaliacao_id = ?
-                    ORDER BY pergunta_id
-                """,
-                    (eixo, avaliacao_id),
-                )
-            else:
-                cursor.execute(
-                    """
-                    SELECT id, eixo, pergunta_id, pergunta_texto, resposta, pontos, data_criacao
-                    FROM respostas
-                    WHERE eixo = ?
-                    ORDER BY pergunta_id DESC
-                """,
-                    (eixo,),
-                )
-            rows = cursor.fetchall()
+        if avaliacao_id:
+            cursor.execute(
+                SELECT_RESPOSTAS
+                + """
+                WHERE e.nome = ? AND r.avaliacao_id = ?
+                ORDER BY r.pergunta_id
+            """,
+                (eixo, avaliacao_id),
+            )
+        else:
+            cursor.execute(
+                SELECT_RESPOSTAS
+                + """
+                WHERE e.nome = ?
+                ORDER BY r.pergunta_id DESC
+            """,
+                (eixo,),
+            )
+        rows = cursor.fetchall()
 
-            out = []
-            for row in rows:
-                d = dict(row)
-                # converter para 'sim'/'nao'
-                d["resposta"] = "sim" if d.get("resposta") == 1 else "nao"
-                out.append(d)
-            return out
+        out = []
+        for row in rows:
+            d = dict(row)
+            # converter para 'sim'/'nao'
+            d["resposta"] = "sim" if d.get("resposta") == 1 else "nao"
+            out.append(d)
+        return out
 
     def get_contagem_respostas(self, eixo, avaliacao_id=None):
         """
@@ -154,34 +552,94 @@ class Database:
         Returns:
             Dicionário com contagem {'sim': int, 'nao': int}
         """
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        cursor = self._get_conn().cursor()
 
-            if avaliacao_id:
-                cursor.execute(
-                    """
-                    SELECT 
-                        COALESCE(SUM(CASE WHEN resposta = 1 THEN 1 ELSE 0 END), 0) as sim,
-                        COALESCE(SUM(CASE WHEN resposta = 0 THEN 1 ELSE 0 END), 0) as nao
-                    FROM respostas
-                    WHERE eixo = ? AND avaliacao_id = ?
-                """,
-                    (eixo, avaliacao_id),
-                )
-            else:
-                cursor.execute(
-                    """
-                    SELECT 
-                        COALESCE(SUM(CASE WHEN resposta = 1 THEN 1 ELSE 0 END), 0) as sim,
-                        COALESCE(SUM(CASE WHEN resposta = 0 THEN 1 ELSE 0 END), 0) as nao
-                    FROM respostas
-                    WHERE eixo = ?
-                """,
-                    (eixo,),
-                )
+        if avaliacao_id:
+            cursor.execute(
+                """
+                SELECT 
+                    COALESCE(SUM(CASE WHEN r.resposta = 1 THEN 1 ELSE 0 END), 0) as sim,
+                    COALESCE(SUM(CASE WHEN r.resposta = 0 THEN 1 ELSE 0 END), 0) as nao
+                FROM respostas r
+                JOIN perguntas p ON p.id = r.pergunta_id
+                JOIN eixos e ON e.id = p.eixo_id
+                WHERE e.nome = ? AND r.avaliacao_id = ?
+            """,
+                (eixo, avaliacao_id),
+            )
+        else:
+            cursor.execute(
+                """
+                SELECT 
+                    COALESCE(SUM(CASE WHEN r.resposta = 1 THEN 1 ELSE 0 END), 0) as sim,
+                    COALESCE(SUM(CASE WHEN r.resposta = 0 THEN 1 ELSE 0 END), 0) as nao
+                FROM respostas r
+                JOIN perguntas p ON p.id = r.pergunta_id
+                JOIN eixos e ON e.id = p.eixo_id
+                WHERE e.nome = ?
+            """,
+                (eixo,),
+            )
 
-            row = cursor.fetchone()
-            return {"sim": row[0], "nao": row[1]} if row else {"sim": 0, "nao": 0}
+        row = cursor.fetchone()
+        return {"sim": row[0], "nao": row[1]} if row else {"sim": 0, "nao": 0}
+
+    def get_respostas_agrupadas(self, avaliacao_id=None):
+        """
+        Obtém respostas e contagens sim/não de todos os eixos de uma vez.
+
+        Args:
+            avaliacao_id: Se fornecido, filtra apenas dessa avaliação
+
+        Returns:
+            Dicionário {eixo: {'respostas': [...], 'sim': int, 'nao': int}},
+            com respostas no mesmo formato de get_respostas_by_eixo
+        """
+        if not avaliacao_id:
+            return self._carregar_respostas_agrupadas(None)
+        grupos = self._cached_row(
+            ("agrupadas", avaliacao_id),
+            lambda: self._carregar_respostas_agrupadas(avaliacao_id),
+        )
+        # Cópia: o acordeon altera respostas e contagens em memória
+        return {
+            eixo: {
+                "respostas": [dict(r) for r in grupo["respostas"]],
+                "sim": grupo["sim"],
+                "nao": grupo["nao"],
+            }
+            for eixo, grupo in grupos.items()
+        }
+
+    def _carregar_respostas_agrupadas(self, avaliacao_id):
+        conn = self._get_conn()
+        if avaliacao_id:
+            cursor = conn.execute(
+                SELECT_RESPOSTAS
+                + """
+                WHERE r.avaliacao_id = ?
+                ORDER BY r.pergunta_id
+            """,
+                (avaliacao_id,),
+            )
+        else:
+            cursor = conn.execute(
+                SELECT_RESPOSTAS
+                + """
+                ORDER BY r.pergunta_id DESC
+            """
+            )
+
+        grupos = {}
+        for row in cursor:
+            d = dict(row)
+            grupo = grupos.get(d["eixo"])
+            if grupo is None:
+                grupo = grupos[d["eixo"]] = {"respostas": [], "sim": 0, "nao": 0}
+            d["resposta"] = "sim" if d["resposta"] == 1 else "nao"
+            grupo[d["resposta"]] += 1
+            grupo["respostas"].append(d)
+        return grupos
 
     # MÉTODO REMOVIDO: add_avaliacao
     # Use save_avaliacao_with_respostas para salvar avaliação + respostas atomicamente
@@ -197,49 +655,227 @@ class Database:
         Returns:
             Lista de dicionários com avaliações
         """
-        from datetime import datetime as dt
+        cursor = self._get_conn().cursor()
 
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+        if limit:
+            cursor.execute(
+                """
+                SELECT id, nome_paciente, nivel_risco, pontuacao, data_criacao
+                FROM avaliacoes
+                ORDER BY data_criacao DESC, id DESC
+                LIMIT ? OFFSET ?
+            """,
+                (limit, offset),
+            )
+        else:
+            cursor.execute(
+                """
+                SELECT id, nome_paciente, nivel_risco, pontuacao, data_criacao
+                FROM avaliacoes
+                ORDER BY data_criacao DESC, id DESC
+            """
+            )
 
-            if limit:
-                cursor.execute(
-                    """
-                    SELECT id, nome_paciente, nivel_risco, pontuacao, data_criacao
-                    FROM avaliacoes
-                    ORDER BY data_criacao DESC
-                    LIMIT ? OFFSET ?
-                """,
-                    (limit, offset),
-                )
-            else:
-                cursor.execute(
-                    """
-                    SELECT id, nome_paciente, nivel_risco, pontuacao, data_criacao
-                    FROM avaliacoes
-                    ORDER BY data_criacao DESC
+        return [self._formatar_avaliacao(row) for row in cursor.fetchall()]
+
+    def get_avaliacoes_page(self, limit, after=None):
+        """
+        Obtém uma página do histórico por keyset (seek), sem OFFSET.
+
+        O custo é proporcional ao tamanho da página, independente de quantas
+        avaliações existem antes dela.
+
+        Args:
+            limit: Número de registros da página
+            after: Cursor retornado pela página anterior (None = primeira)
+
+        Returns:
+            Tupla (lista de avaliações, cursor da próxima página ou None)
+        """
+        conn = self._get_conn()
+        if after is None:
+            cursor = conn.execute(
                 """
+                SELECT id, nome_paciente, nivel_risco, pontuacao, data_criacao
+                FROM avaliacoes
+                ORDER BY data_criacao DESC, id DESC
+                LIMIT ?
+            """,
+                (limit + 1,),
+            )
+        else:
+            cursor = conn.execute(
+                """
+                SELECT id, nome_paciente, nivel_risco, pontuacao, data_criacao
+                FROM avaliacoes
+                WHERE (data_criacao, id) < (?, ?)
+                ORDER BY data_criacao DESC, id DESC
+                LIMIT ?
+            """,
+                (after[0], after[1], limit + 1),
+            )
+
+        rows = cursor.fetchall()
+        # Uma linha a mais indica se existe próxima página
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = (rows[-1]["data_criacao"], rows[-1]["id"])
+        return [self._formatar_avaliacao(row) for row in rows], next_cursor
+
+    def get_avaliacoes_keys(self, limit, after=None):
+        """
+        Chaves (data_criacao, id) do histórico, na ordem de get_avaliacoes_page.
+
+        Só lê o índice idx_avaliacoes_data (o id é o rowid), sem tocar nas
+        linhas da tabela; cada chave serve de cursor para get_avaliacoes_page.
+
+        Args:
+            limit: Número máximo de chaves
+            after: Cursor a partir do qual continuar (None = início)
+
+        Returns:
+            Lista de tuplas (data_criacao, id)
+        """
+        if after is None:
+            cursor = self._get_conn().execute(
+                """
+                SELECT data_criacao, id FROM avaliacoes
+                ORDER BY data_criacao DESC, id DESC
+                LIMIT ?
+            """,
+                (limit,),
+            )
+        else:
+            cursor = self._get_conn().execute(
+                """
+                SELECT data_criacao, id FROM avaliacoes
+                WHERE (data_criacao, id) < (?, ?)
+                ORDER BY data_criacao DESC, id DESC
+                LIMIT ?
+            """,
+                (after[0], after[1], limit),
+            )
+        return [tuple(row) for row in cursor.fetchall()]
+
+    # ------------------ Busca ------------------
+    def _fts_disponivel(self):
+        """True se o índice avaliacoes_fts existe (SQLite com FTS5)."""
+        if self._tem_fts is None:
+            self._tem_fts = (
+                self._get_conn()
+                .execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'avaliacoes_fts'"
                 )
+                .fetchone()
+                is not None
+            )
+        return self._tem_fts
 
-            rows = cursor.fetchall()
-            result = []
-            for row in rows:
-                d = dict(row)
-                # Renomear campos para compatibilidade com main.py
-                d["patient_name"] = d.pop("nome_paciente", "")
-                d["level"] = d.pop("nivel_risco", "")
-                d["score"] = d.pop("pontuacao", 0)
-                # Formatar data
-                data_criacao = d.pop("data_criacao", "")
-                if data_criacao:
-                    try:
-                        data_obj = dt.fromisoformat(data_criacao)
-                        d["data"] = data_obj.strftime("%d/%m/%Y %H:%M")
-                    except:
-                        d["data"] = data_criacao
-                result.append(d)
-            return result
+    @staticmethod
+    def _fts_query(texto):
+        """
+        Converte o texto digitado em consulta FTS5: cada palavra vira um
+        prefixo ("mar"*), todas obrigatórias. Aspas e operadores são
+        descartados, então qualquer entrada é segura.
+        """
+        palavras = _palavras_busca(texto)
+        return " ".join(f'"{p}"*' for p in palavras) or None
+
+    def _filtro_busca(self, filtros):
+        """
+        Monta (FROM, WHERE, params, coluna de ordenação) de search_avaliacoes.
+
+        Com texto e FTS5, o índice do nome é a tabela externa (CROSS JOIN
+        fixa a ordem) e é percorrido por rowid decrescente: o LIMIT para
+        assim que houver linhas suficientes, sem materializar os resultados.
+        """
+        filtros = filtros or {}
+        where, params = self._filtro_avaliacoes(
+            filtros.get("data_inicio"), filtros.get("data_fim"), filtros.get("nivel_risco")
+        )
+        if filtros.get("pontuacao_min") is not None:
+            where += " AND pontuacao >= ?"
+            params.append(filtros["pontuacao_min"])
+        if filtros.get("pontuacao_max") is not None:
+            where += " AND pontuacao <= ?"
+            params.append(filtros["pontuacao_max"])
+
+        consulta = self._fts_query(filtros.get("texto"))
+        if consulta is None:
+            return "avaliacoes", where, params, "id"
+        if self._fts_disponivel():
+            return (
+                "avaliacoes_fts CROSS JOIN avaliacoes ON avaliacoes.id = avaliacoes_fts.rowid",
+                " AND avaliacoes_fts MATCH ?" + where,
+                [consulta] + params,
+                "avaliacoes_fts.rowid",
+            )
+        # Sem FTS5: mesma semântica (prefixo de palavra, sem acentos) sobre
+        # o nome normalizado por nome_busca(), percorrendo a tabela
+        for palavra in _palavras_busca(_sem_acentos(filtros["texto"])):
+            where += " AND nome_busca(nome_paciente) LIKE ? ESCAPE '\\'"
+            params.append(f"% {_escapar_like(palavra)}%")
+        return "avaliacoes", where, params, "id"
+
+    def search_avaliacoes(self, filtros, limit, after=None):
+        """
+        Busca avaliações por nome e filtros, mais recentes (maior id) primeiro.
+
+        Args:
+            filtros: Dicionário com chaves opcionais 'texto' (prefixos das
+                palavras do nome, sem diferenciar acentos), 'nivel_risco',
+                'pontuacao_min', 'pontuacao_max', 'data_inicio', 'data_fim'
+            limit: Número de registros
+            after: Cursor (id) retornado pela chamada anterior
+
+        Returns:
+            Tupla (lista de avaliações, cursor da próxima página ou None)
+        """
+        origem, where, params, ordem = self._filtro_busca(filtros)
+        if after is not None:
+            where += f" AND {ordem} < ?"
+            params.append(after)
+        rows = self._get_conn().execute(
+            f"""
+            SELECT avaliacoes.id, avaliacoes.nome_paciente, nivel_risco, pontuacao,
+                   data_criacao
+            FROM {origem}
+            WHERE 1 = 1{where}
+            ORDER BY {ordem} DESC
+            LIMIT ?
+        """,
+            params + [limit + 1],
+        ).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = rows[-1]["id"]
+        return [self._formatar_avaliacao(row) for row in rows], next_cursor
+
+    def search_avaliacoes_keys(self, filtros, limit, after=None):
+        """
+        Ids (cursores) dos próximos resultados de search_avaliacoes.
+
+        Returns:
+            Lista de ids, na ordem dos resultados
+        """
+        origem, where, params, ordem = self._filtro_busca(filtros)
+        if after is not None:
+            where += f" AND {ordem} < ?"
+            params.append(after)
+        return [
+            row[0]
+            for row in self._get_conn().execute(
+                f"""
+                SELECT avaliacoes.id FROM {origem}
+                WHERE 1 = 1{where}
+                ORDER BY {ordem} DESC
+                LIMIT ?
+            """,
+                params + [limit],
+            )
+        ]
 
     def get_avaliacao(self, avaliacao_id):
         """
@@ -251,37 +887,153 @@ class Database:
         Returns:
             Dicionário com dados da avaliação
         """
-        from datetime import datetime as dt
 
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute(
+        def carregar():
+            row = self._get_conn().execute(
                 """
                 SELECT id, nome_paciente, nivel_risco, pontuacao, data_criacao
                 FROM avaliacoes
                 WHERE id = ?
             """,
                 (avaliacao_id,),
+            ).fetchone()
+            return self._formatar_avaliacao(row) if row else None
+
+        avaliacao = self._cached_row(("avaliacao", avaliacao_id), carregar)
+        return dict(avaliacao) if avaliacao else None
+
+    def get_avaliacao_completa(self, avaliacao_id):
+        """
+        Obtém uma avaliação e suas respostas em uma única consulta (JOIN).
+
+        Args:
+            avaliacao_id: ID da avaliação
+
+        Returns:
+            Dicionário no formato de get_avaliacao com a chave extra
+            'responses' (lista no formato de get_respostas_avaliacao, com
+            'eixo' renomeado para 'eixo_nome'), ou None se não existir.
+            Releituras (detalhes, PDF, email) vêm do cache de linhas.
+        """
+
+        def carregar():
+            cursor = self._get_conn().execute(
+                SELECT_AVALIACAO_COMPLETA
+                + """
+                WHERE a.id = ?
+                ORDER BY r.pergunta_id
+            """,
+                (avaliacao_id,),
             )
+            avaliacoes = self._agrupar_avaliacoes_completas(cursor)
+            return avaliacoes[0] if avaliacoes else None
 
-            row = cursor.fetchone()
-            if row:
-                d = dict(row)
-                # Renomear campos para compatibilidade com main.py
-                d["patient_name"] = d.pop("nome_paciente", "")
-                d["level"] = d.pop("nivel_risco", "")
-                d["score"] = d.pop("pontuacao", 0)
-                # Formatar data
-                data_criacao = d.pop("data_criacao", "")
-                if data_criacao:
-                    try:
-                        data_obj = dt.fromisoformat(data_criacao)
-                        d["data"] = data_obj.strftime("%d/%m/%Y %H:%M")
-                    except:
-                        d["data"] = data_criacao
-                return d
+        avaliacao = self._cached_row(("completa", avaliacao_id), carregar)
+        if avaliacao is None:
             return None
+        return dict(avaliacao, responses=[dict(r) for r in avaliacao["responses"]])
+
+    def iter_avaliacoes_completas(
+        self, data_inicio=None, data_fim=None, nivel_risco=None, chunk_size=200
+    ):
+        """
+        Percorre avaliações completas (com respostas) em blocos, por ID.
+
+        Cada bloco é uma única consulta com JOIN; a memória usada não cresce
+        com o tamanho do histórico.
+
+        Args:
+            data_inicio: date/datetime mínimo (inclusivo), ou None
+            data_fim: date/datetime máximo (inclusivo; date cobre o dia todo)
+            nivel_risco: Nível exato ('Baixo', 'Médio', ...), ou None
+            chunk_size: Número de avaliações por consulta
+
+        Yields:
+            Dicionários no formato de get_avaliacao_completa
+        """
+        where, params = self._filtro_avaliacoes(data_inicio, data_fim, nivel_risco)
+        ultimo_id = 0
+        while True:
+            cursor = self._get_conn().execute(
+                SELECT_AVALIACAO_COMPLETA
+                + f"""
+                WHERE a.id IN (
+                    SELECT id FROM avaliacoes
+                    WHERE id > ?{where}
+                    ORDER BY id
+                    LIMIT ?
+                )
+                ORDER BY a.id, r.pergunta_id
+            """,
+                (ultimo_id, *params, chunk_size),
+            )
+            bloco = self._agrupar_avaliacoes_completas(cursor)
+            if not bloco:
+                return
+            ultimo_id = bloco[-1]["id"]
+            yield from bloco
+
+    def count_avaliacoes(self, data_inicio=None, data_fim=None, nivel_risco=None):
+        """Conta avaliações com os mesmos filtros de iter_avaliacoes_completas."""
+        where, params = self._filtro_avaliacoes(data_inicio, data_fim, nivel_risco)
+        return self._get_conn().execute(
+            f"SELECT COUNT(*) FROM avaliacoes WHERE 1 = 1{where}", params
+        ).fetchone()[0]
+
+    @staticmethod
+    def _filtro_avaliacoes(data_inicio, data_fim, nivel_risco):
+        """Monta o trecho ' AND ...' e os parâmetros dos filtros de avaliações."""
+        where = ""
+        params = []
+        if data_inicio is not None:
+            if not isinstance(data_inicio, datetime):
+                data_inicio = datetime.combine(data_inicio, datetime.min.time())
+            where += " AND data_criacao >= ?"
+            params.append(data_inicio.isoformat(" "))
+        if data_fim is not None:
+            if isinstance(data_fim, datetime):
+                where += " AND data_criacao <= ?"
+            else:
+                # Data sem hora: até o fim do dia
+                data_fim = datetime.combine(data_fim + timedelta(days=1), datetime.min.time())
+                where += " AND data_criacao < ?"
+            params.append(data_fim.isoformat(" "))
+        if nivel_risco:
+            where += " AND nivel_risco = ?"
+            params.append(nivel_risco)
+        return where, params
+
+    def _agrupar_avaliacoes_completas(self, rows):
+        """Agrupa linhas do JOIN avaliação×respostas (ordenadas por avaliação)."""
+        avaliacoes = []
+        atual = None
+        for row in rows:
+            if atual is None or atual["id"] != row["id"]:
+                atual = self._formatar_avaliacao(
+                    {
+                        "id": row["id"],
+                        "nome_paciente": row["nome_paciente"],
+                        "nivel_risco": row["nivel_risco"],
+                        "pontuacao": row["pontuacao"],
+                        "data_criacao": row["data_criacao"],
+                    }
+                )
+                atual["responses"] = []
+                avaliacoes.append(atual)
+            # LEFT JOIN: avaliação sem respostas vem com colunas r_* nulas
+            if row["r_id"] is not None:
+                atual["responses"].append(
+                    {
+                        "id": row["r_id"],
+                        "eixo_nome": row["r_eixo"],
+                        "pergunta_id": row["r_pergunta_id"],
+                        "pergunta_texto": row["r_pergunta_texto"],
+                        "resposta": "sim" if row["r_resposta"] == 1 else "nao",
+                        "pontos": row["r_pontos"],
+                        "data_criacao": row["r_data_criacao"],
+                    }
+                )
+        return avaliacoes
 
     def get_respostas_avaliacao(self, avaliacao_id):
         """
@@ -293,41 +1045,38 @@ class Database:
         Returns:
             Lista de dicionários com respostas
         """
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT id, eixo, pergunta_id, pergunta_texto, resposta, pontos, data_criacao
-                FROM respostas
-                WHERE avaliacao_id = ?
-                ORDER BY pergunta_id
-            """,
-                (avaliacao_id,),
-            )
-            rows = cursor.fetchall()
-            out = []
-            for row in rows:
-                d = dict(row)
-                d["resposta"] = "sim" if d.get("resposta") == 1 else "nao"
-                out.append(d)
-            return out
+        cursor = self._get_conn().cursor()
+        cursor.execute(
+            SELECT_RESPOSTAS
+            + """
+            WHERE r.avaliacao_id = ?
+            ORDER BY r.pergunta_id
+        """,
+            (avaliacao_id,),
+        )
+        rows = cursor.fetchall()
+        out = []
+        for row in rows:
+            d = dict(row)
+            d["resposta"] = "sim" if d.get("resposta") == 1 else "nao"
+            out.append(d)
+        return out
 
     def get_total_avaliacoes(self):
-        """Obtém total de avaliações."""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM avaliacoes")
+        """Obtém total de avaliações (em cache até o banco mudar)."""
+
+        def contar():
+            cursor = self._get_conn().execute("SELECT COUNT(*) FROM avaliacoes")
             result = cursor.fetchone()
             return result[0] if result else 0
 
+        return self._cached("total_avaliacoes", contar)
+
     def clear_all_data(self):
         """Limpa todas os dados (para reset/teste)."""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        with self._transaction() as cursor:
             cursor.execute("DELETE FROM respostas")
             cursor.execute("DELETE FROM avaliacoes")
-            conn.commit()
 
     def save_avaliacao_with_respostas(
         self, nome_paciente, nivel_risco, pontuacao, respostas
@@ -341,69 +1090,357 @@ class Database:
         Returns:
             ID da avaliação criada
         """
-        with sqlite3.connect(self.db_path) as conn:
-            try:
-                cursor = conn.cursor()
+        return self.save_avaliacoes_bulk(
+            [
+                {
+                    "nome_paciente": nome_paciente,
+                    "nivel_risco": nivel_risco,
+                    "pontuacao": pontuacao,
+                    "respostas": respostas,
+                }
+            ]
+        )[0]
+
+    def save_avaliacoes_bulk(self, avaliacoes):
+        """
+        Salva várias avaliações com suas respostas em uma única transação.
+
+        As respostas de todas as avaliações são normalizadas em tuplas e
+        gravadas com um único executemany. Cada avaliação usa um só
+        timestamp para o cabeçalho e todas as suas respostas.
+
+        Args:
+            avaliacoes: iterável de dicts com nome_paciente, nivel_risco,
+                pontuacao, respostas (formato de save_avaliacao_with_respostas)
+                e, opcionalmente, data_criacao (datetime; padrão: agora)
+
+        Returns:
+            Lista com os IDs criados, na mesma ordem
+        """
+        agora = datetime.now().isoformat(" ")
+        normalizar = self._normalize_resposta
+        conhecidas = self._get_perguntas_conhecidas()
+        ids = []
+        linhas = []
+        novas = {}
+
+        with self._transaction() as cursor:
+            for av in avaliacoes:
+                data = av.get("data_criacao")
+                data = data.isoformat(" ") if data else agora
                 cursor.execute(
                     """
                     INSERT INTO avaliacoes (nome_paciente, nivel_risco, pontuacao, data_criacao)
                     VALUES (?, ?, ?, ?)
                 """,
-                    (nome_paciente, nivel_risco, pontuacao, datetime.now()),
+                    (av["nome_paciente"], av["nivel_risco"], av["pontuacao"], data),
                 )
                 avaliacao_id = cursor.lastrowid
+                ids.append(avaliacao_id)
 
-                for r in respostas:
-                    val = self._normalize_resposta(r.get("resposta"))
-                    cursor.execute(
-                        """
-                        INSERT INTO respostas (eixo, pergunta_id, pergunta_texto, resposta, pontos, data_criacao, avaliacao_id)
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                        """,
+                for r in av["respostas"]:
+                    pergunta_id = r.get("question_id")
+                    # Pergunta fora do catálogo (ex.: importação): registrar
+                    if pergunta_id not in conhecidas and pergunta_id not in novas:
+                        novas[pergunta_id] = (r.get("eixo_nome"), r.get("pergunta_texto"))
+                    linhas.append(
                         (
-                            r.get("eixo_nome"),
-                            r.get("question_id"),
-                            r.get("pergunta_texto"),
-                            val,
+                            pergunta_id,
+                            normalizar(r.get("resposta")),
                             r.get("pontos", 0),
-                            datetime.now(),
+                            data,
                             avaliacao_id,
-                        ),
+                        )
                     )
 
-                conn.commit()
-                return avaliacao_id
-            except Exception:
-                conn.rollback()
-                raise
+            if novas:
+                cursor.executemany(
+                    "INSERT OR IGNORE INTO eixos (nome) VALUES (?)",
+                    [(eixo,) for eixo, _ in novas.values()],
+                )
+                cursor.executemany(
+                    """
+                    INSERT OR IGNORE INTO perguntas (id, eixo_id, texto)
+                    VALUES (?, (SELECT id FROM eixos WHERE nome = ?), ?)
+                """,
+                    [(pid, eixo, texto) for pid, (eixo, texto) in novas.items()],
+                )
+
+            cursor.executemany(
+                """
+                INSERT INTO respostas (pergunta_id, resposta, pontos, data_criacao, avaliacao_id)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                linhas,
+            )
+
+        # Só depois do commit: um rollback não pode deixar o conjunto adiantado
+        conhecidas.update(novas)
+        return ids
 
     def delete_avaliacao(self, avaliacao_id):
         """Remove avaliação e respostas associadas."""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        with self._transaction() as cursor:
             cursor.execute(
                 "DELETE FROM respostas WHERE avaliacao_id = ?", (avaliacao_id,)
             )
             cursor.execute("DELETE FROM avaliacoes WHERE id = ?", (avaliacao_id,))
-            conn.commit()
+
+    def enqueue_email(self, avaliacao_id, destinatario, nome_destinatario):
+        """
+        Coloca o envio de um prontuário na fila (outbox).
+
+        Só grava a linha; o PDF é gerado e enviado depois pelo OutboxWorker.
+
+        Args:
+            avaliacao_id: ID da avaliação a enviar
+            destinatario: Email do destinatário
+            nome_destinatario: Nome usado no corpo do email
+
+        Returns:
+            ID da entrada na fila
+        """
+        agora = datetime.now().isoformat(" ")
+        with self._transaction() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO outbox (avaliacao_id, destinatario, nome_destinatario,
+                                    proxima_tentativa, criado_em)
+                VALUES (?, ?, ?, ?, ?)
+            """,
+                (avaliacao_id, destinatario, nome_destinatario, agora, agora),
+            )
+            return cursor.lastrowid
+
+    def claim_outbox(self, limit=10, dono=None):
+        """
+        Reserva envios devidos, marcando-os como 'enviando'.
+
+        Args:
+            limit: Máximo de entradas reservadas
+            dono: Identificador de quem reserva (ex.: o OutboxWorker), gravado
+                com a hora da reserva para recover_outbox
+
+        Returns:
+            Lista de dicionários da tabela outbox
+        """
+        agora = datetime.now().isoformat(" ")
+        with self._transaction() as cursor:
+            # Lock de escrita antes do SELECT: duas instâncias do app nunca
+            # reservam a mesma entrada
+            cursor.execute("BEGIN IMMEDIATE")
+            rows = cursor.execute(
+                """
+                SELECT * FROM outbox
+                WHERE status = 'pendente' AND proxima_tentativa <= ?
+                ORDER BY proxima_tentativa, id
+                LIMIT ?
+            """,
+                (agora, limit),
+            ).fetchall()
+            cursor.executemany(
+                """
+                UPDATE outbox
+                SET status = 'enviando', reservado_por = ?, reservado_em = ?
+                WHERE id = ?
+            """,
+                [(dono, agora, row["id"]) for row in rows],
+            )
+        return [dict(row) for row in rows]
+
+    def mark_outbox_sent(self, outbox_id):
+        """Marca um envio como concluído."""
+        with self._transaction() as cursor:
+            cursor.execute(
+                """
+                UPDATE outbox
+                SET status = 'enviado', tentativas = tentativas + 1,
+                    ultimo_erro = NULL, enviado_em = ?,
+                    reservado_por = NULL, reservado_em = NULL
+                WHERE id = ?
+            """,
+                (datetime.now().isoformat(" "), outbox_id),
+            )
+
+    def mark_outbox_failed(self, outbox_id, erro, proxima_tentativa=None):
+        """
+        Registra uma falha de envio.
+
+        Args:
+            outbox_id: ID da entrada
+            erro: Mensagem de erro
+            proxima_tentativa: datetime da nova tentativa; None = desistir
+        """
+        with self._transaction() as cursor:
+            if proxima_tentativa is None:
+                cursor.execute(
+                    """
+                    UPDATE outbox
+                    SET status = 'falhou', tentativas = tentativas + 1, ultimo_erro = ?,
+                        reservado_por = NULL, reservado_em = NULL
+                    WHERE id = ?
+                """,
+                    (erro, outbox_id),
+                )
+            else:
+                cursor.execute(
+                    """
+                    UPDATE outbox
+                    SET status = 'pendente', tentativas = tentativas + 1,
+                        ultimo_erro = ?, proxima_tentativa = ?,
+                        reservado_por = NULL, reservado_em = NULL
+                    WHERE id = ?
+                """,
+                    (erro, proxima_tentativa.isoformat(" "), outbox_id),
+                )
+
+    def recover_outbox(self, dono, vencidas_apos=None):
+        """
+        Devolve à fila envios interrompidos ('enviando').
+
+        Só mexe nas reservas de `dono` e nas abandonadas: outra instância do
+        app pode estar entregando as suas neste momento.
+
+        Args:
+            dono: Identificador passado a claim_outbox
+            vencidas_apos: timedelta; reservas de qualquer dono mais antigas
+                que isso (ou sem dono/hora registrados) também voltam. None =
+                só as de `dono`
+
+        Returns:
+            Número de envios devolvidos à fila
+        """
+        where, params = "reservado_por = ?", [dono]
+        if vencidas_apos is not None:
+            where += " OR reservado_por IS NULL OR reservado_em IS NULL OR reservado_em < ?"
+            params.append((datetime.now() - vencidas_apos).isoformat(" "))
+        with self._transaction() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE outbox
+                SET status = 'pendente', reservado_por = NULL, reservado_em = NULL
+                WHERE status = 'enviando' AND ({where})
+            """,
+                params,
+            )
+            return cursor.rowcount
+
+    def retry_failed_outbox(self):
+        """Recoloca na fila, para envio imediato, os envios que falharam."""
+        with self._transaction() as cursor:
+            cursor.execute(
+                """
+                UPDATE outbox
+                SET status = 'pendente', tentativas = 0, proxima_tentativa = ?
+                WHERE status = 'falhou'
+            """,
+                (datetime.now().isoformat(" "),),
+            )
+            return cursor.rowcount
+
+    def get_outbox_counts(self):
+        """Retorna {status: quantidade} da fila de emails (em cache)."""
+
+        def contar():
+            return {
+                row[0]: row[1]
+                for row in self._get_conn().execute(
+                    "SELECT status, COUNT(*) FROM outbox GROUP BY status"
+                )
+            }
+
+        return dict(self._cached("outbox_counts", contar))
+
+    def get_outbox(self, limit=50):
+        """Entradas mais recentes da fila, com o nome do paciente."""
+        cursor = self._get_conn().execute(
+            """
+            SELECT o.*, a.nome_paciente
+            FROM outbox o
+            LEFT JOIN avaliacoes a ON a.id = o.avaliacao_id
+            ORDER BY o.id DESC
+            LIMIT ?
+        """,
+            (limit,),
+        )
+        return [dict(row) for row in cursor.fetchall()]
+
+    def next_outbox_due(self):
+        """Data/hora (texto ISO) do próximo envio pendente, ou None."""
+        row = self._get_conn().execute(
+            "SELECT MIN(proxima_tentativa) FROM outbox WHERE status = 'pendente'"
+        ).fetchone()
+        return row[0]
 
     def get_orphan_avaliacoes(self):
         """Lista avaliações sem nenhuma resposta."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute(
+        cursor = self._get_conn().cursor()
+        cursor.execute(
+            """
+            SELECT a.id, a.nome_paciente, a.nivel_risco, a.pontuacao, a.data_criacao
+            FROM avaliacoes a
+            LEFT JOIN respostas r ON r.avaliacao_id = a.id
+            WHERE r.id IS NULL
+            ORDER BY a.data_criacao DESC
+            """
+        )
+        return [dict(row) for row in cursor.fetchall()]
+
+    def count_orphan_avaliacoes(self):
+        """Conta avaliações sem nenhuma resposta (em cache até o banco mudar)."""
+
+        def contar():
+            row = self._get_conn().execute(
                 """
-                SELECT a.id, a.nome_paciente, a.nivel_risco, a.pontuacao, a.data_criacao
+                SELECT COUNT(*)
                 FROM avaliacoes a
-                LEFT JOIN respostas r ON r.avaliacao_id = a.id
-                WHERE r.id IS NULL
-                ORDER BY a.data_criacao DESC
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM respostas r WHERE r.avaliacao_id = a.id
+                )
                 """
-            )
-            return [dict(row) for row in cursor.fetchall()]
+            ).fetchone()
+            return row[0]
+
+        return self._cached("orphan_avaliacoes", contar)
 
     # ------------------ Funções Internas ------------------
+    @staticmethod
+    def _formatar_avaliacao(row):
+        """Converte uma linha de avaliacoes para o formato usado pela UI."""
+        d = dict(row)
+        # Renomear campos para compatibilidade com main.py
+        d["patient_name"] = d.pop("nome_paciente", "")
+        d["level"] = d.pop("nivel_risco", "")
+        d["score"] = d.pop("pontuacao", 0)
+        # Formatar data
+        data_criacao = d.pop("data_criacao", "")
+        if data_criacao:
+            try:
+                data_obj = datetime.fromisoformat(data_criacao)
+                d["data"] = data_obj.strftime("%d/%m/%Y %H:%M")
+            except:
+                d["data"] = data_criacao
+        return d
+
+    def _get_pesos(self):
+        """Retorna {pergunta_id: (peso_sim, peso_nao)} do catálogo de perguntas."""
+        if self._pesos is None:
+            self._pesos = {
+                row["id"]: (row["peso_sim"], row["peso_nao"])
+                for row in self._get_conn().execute(
+                    "SELECT id, peso_sim, peso_nao FROM perguntas WHERE peso_sim IS NOT NULL"
+                )
+            }
+        return self._pesos
+
+    def _get_perguntas_conhecidas(self):
+        """Conjunto de IDs já presentes no catálogo de perguntas."""
+        if self._perguntas_conhecidas is None:
+            self._perguntas_conhecidas = {
+                row[0] for row in self._get_conn().execute("SELECT id FROM perguntas")
+            }
+        return self._perguntas_conhecidas
+
     def _normalize_resposta(self, resposta):
         """Converte diferentes formatos para inteiro 1(sim)/0(nao)."""
         if isinstance(resposta, bool):
@@ -414,3 +1451,254 @@ class Database:
             r = resposta.strip().lower()
             return 1 if r in ("sim", "s", "1", "true") else 0
         return 0
+
+
+# ------------------ Migrações ------------------
+# Cada migração recebe um cursor dentro de uma transação já aberta.
+# Nunca altere uma migração publicada: adicione uma nova ao final da lista.
+
+
+def _migracao_001_tabelas_base(cursor):
+    """Tabelas base de avaliações e respostas"""
+    # Respostas: armazenar como inteiro (1=sim,0=nao) para otimização
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS respostas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            eixo TEXT NOT NULL,
+            pergunta_id INTEGER NOT NULL,
+            pergunta_texto TEXT NOT NULL,
+            resposta INTEGER NOT NULL CHECK (resposta IN (0,1)),
+            pontos INTEGER DEFAULT 0,
+            data_criacao TIMESTAMP NOT NULL,
+            avaliacao_id INTEGER,
+            FOREIGN KEY (avaliacao_id) REFERENCES avaliacoes(id)
+        )
+    """
+    )
+
+    # Tabela de avaliações (para agrupar respostas)
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS avaliacoes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome_paciente TEXT NOT NULL,
+            nivel_risco TEXT NOT NULL,
+            pontuacao INTEGER NOT NULL,
+            data_criacao TIMESTAMP NOT NULL
+        )
+    """
+    )
+
+
+def _migracao_002_coluna_pontos(cursor):
+    """Coluna pontos em respostas"""
+    # Bancos criados antes da coluna existir
+    cursor.execute("PRAGMA table_info(respostas)")
+    columns = [col[1] for col in cursor.fetchall()]
+    if "pontos" not in columns:
+        cursor.execute("ALTER TABLE respostas ADD COLUMN pontos INTEGER DEFAULT 0")
+
+
+def _migracao_003_indices(cursor):
+    """Índices de respostas por avaliação/eixo e de avaliações por data"""
+    # Cobre get_respostas_avaliacao, contagens por eixo e delete_avaliacao;
+    # 'resposta' no final deixa as contagens sim/não só no índice
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_respostas_avaliacao_eixo
+        ON respostas (avaliacao_id, eixo, pergunta_id, resposta)
+    """
+    )
+    # ORDER BY data_criacao DESC no histórico (o rowid desempata)
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_avaliacoes_data
+        ON avaliacoes (data_criacao)
+    """
+    )
+    cursor.execute("ANALYZE")
+
+
+def _migracao_004_catalogo_perguntas(cursor):
+    """Catálogo eixos/perguntas; respostas guardam só chaves inteiras"""
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS eixos (
+            id INTEGER PRIMARY KEY,
+            nome TEXT NOT NULL UNIQUE
+        )
+    """
+    )
+    # id = id da pergunta no questions.json
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS perguntas (
+            id INTEGER PRIMARY KEY,
+            eixo_id INTEGER NOT NULL,
+            texto TEXT NOT NULL,
+            peso_sim INTEGER,
+            peso_nao INTEGER,
+            FOREIGN KEY (eixo_id) REFERENCES eixos(id)
+        )
+    """
+    )
+
+    # Deduplicar textos já gravados (o questions.json é sincronizado depois
+    # e prevalece; aqui vale o texto da resposta mais recente)
+    cursor.execute("INSERT OR IGNORE INTO eixos (nome) SELECT DISTINCT eixo FROM respostas")
+    cursor.execute(
+        """
+        INSERT OR IGNORE INTO perguntas (id, eixo_id, texto)
+        SELECT r.pergunta_id, e.id, r.pergunta_texto
+        FROM respostas r
+        JOIN eixos e ON e.nome = r.eixo
+        WHERE r.id IN (SELECT MAX(id) FROM respostas GROUP BY pergunta_id)
+    """
+    )
+
+    # SQLite não remove colunas com índices/CHECK: recriar a tabela
+    cursor.execute(
+        """
+        CREATE TABLE respostas_nova (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            avaliacao_id INTEGER,
+            pergunta_id INTEGER NOT NULL,
+            resposta INTEGER NOT NULL CHECK (resposta IN (0,1)),
+            pontos INTEGER DEFAULT 0,
+            data_criacao TIMESTAMP NOT NULL,
+            FOREIGN KEY (avaliacao_id) REFERENCES avaliacoes(id),
+            FOREIGN KEY (pergunta_id) REFERENCES perguntas(id)
+        )
+    """
+    )
+    cursor.execute(
+        """
+        INSERT INTO respostas_nova (id, avaliacao_id, pergunta_id, resposta, pontos, data_criacao)
+        SELECT id, avaliacao_id, pergunta_id, resposta, pontos, data_criacao
+        FROM respostas
+    """
+    )
+    cursor.execute("DROP TABLE respostas")
+    cursor.execute("ALTER TABLE respostas_nova RENAME TO respostas")
+
+    # Substitui idx_respostas_avaliacao_eixo (removido junto com a tabela)
+    cursor.execute(
+        """
+        CREATE INDEX idx_respostas_avaliacao_pergunta
+        ON respostas (avaliacao_id, pergunta_id, resposta)
+    """
+    )
+
+
+def _migracao_005_outbox(cursor):
+    """Fila persistente de emails (outbox) com status e novas tentativas"""
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            avaliacao_id INTEGER NOT NULL,
+            destinatario TEXT NOT NULL,
+            nome_destinatario TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pendente'
+                CHECK (status IN ('pendente', 'enviando', 'enviado', 'falhou')),
+            tentativas INTEGER NOT NULL DEFAULT 0,
+            proxima_tentativa TIMESTAMP NOT NULL,
+            ultimo_erro TEXT,
+            criado_em TIMESTAMP NOT NULL,
+            enviado_em TIMESTAMP
+        )
+    """
+    )
+    # Próximos envios devidos (claim_outbox) e contagens por status
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_outbox_status_proxima
+        ON outbox (status, proxima_tentativa)
+    """
+    )
+
+
+def _migracao_006_busca(cursor):
+    """Busca por nome (FTS5) e índices para filtros de nível e pontuação"""
+    # Filtros de search_avaliacoes; o id (rowid) completa os dois índices,
+    # então 'nivel = ? ORDER BY id DESC' já sai ordenado
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_avaliacoes_nivel ON avaliacoes (nivel_risco)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_avaliacoes_pontuacao ON avaliacoes (pontuacao)"
+    )
+
+    # Índice invertido do nome, sem acentos e com índices de prefixo para a
+    # busca enquanto se digita; o conteúdo fica em avaliacoes (content=)
+    try:
+        cursor.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS avaliacoes_fts USING fts5(
+                nome_paciente,
+                content='avaliacoes',
+                content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='1 2 3'
+            )
+        """
+        )
+    except sqlite3.OperationalError:
+        # SQLite sem FTS5: search_avaliacoes cai para LIKE
+        return
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS avaliacoes_fts_ai AFTER INSERT ON avaliacoes
+        BEGIN
+            INSERT INTO avaliacoes_fts (rowid, nome_paciente)
+            VALUES (new.id, new.nome_paciente);
+        END
+    """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS avaliacoes_fts_ad AFTER DELETE ON avaliacoes
+        BEGIN
+            INSERT INTO avaliacoes_fts (avaliacoes_fts, rowid, nome_paciente)
+            VALUES ('delete', old.id, old.nome_paciente);
+        END
+    """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS avaliacoes_fts_au
+        AFTER UPDATE OF nome_paciente ON avaliacoes
+        BEGIN
+            INSERT INTO avaliacoes_fts (avaliacoes_fts, rowid, nome_paciente)
+            VALUES ('delete', old.id, old.nome_paciente);
+            INSERT INTO avaliacoes_fts (rowid, nome_paciente)
+            VALUES (new.id, new.nome_paciente);
+        END
+    """
+    )
+    # Sem ANALYZE aqui: num banco novo ele gravaria as tabelas internas do
+    # FTS como vazias e as inserções seguintes degradariam com o tamanho
+    cursor.execute("INSERT INTO avaliacoes_fts (avaliacoes_fts) VALUES ('rebuild')")
+
+
+def _migracao_007_outbox_reserva(cursor):
+    """Dono e hora da reserva de cada envio da outbox"""
+    # recover_outbox só devolve à fila as reservas do próprio worker ou as
+    # abandonadas, não as que outra instância está entregando
+    cursor.execute("ALTER TABLE outbox ADD COLUMN reservado_por TEXT")
+    cursor.execute("ALTER TABLE outbox ADD COLUMN reservado_em TIMESTAMP")
+
+
+MIGRATIONS = [
+    (1, _migracao_001_tabelas_base),
+    (2, _migracao_002_coluna_pontos),
+    (3, _migracao_003_indices),
+    (4, _migracao_004_catalogo_perguntas),
+    (5, _migracao_005_outbox),
+    (6, _migracao_006_busca),
+    (7, _migracao_007_outbox_reserva),
+]
+
+# Migrações que liberam muito espaço e justificam um VACUUM logo após
+MIGRATIONS_COM_VACUUM = {4}
@@ -1,33 +1,197 @@
 """
 Configuração de email para envio de prontuários.
 Lê credenciais de variáveis de ambiente para não expor dados sensíveis no Git.
+
+Nada é lido na importação: o .env e as variáveis são resolvidos no primeiro
+get_email_config() e guardados em cache. Credenciais ausentes só viram erro
+quando um envio é tentado (EmailConfig.validate), nunca ao importar.
+
+Perfis: o perfil padrão usa EMAIL_SENDER, EMAIL_PASSWORD, EMAIL_PROVIDER,
+SMTP_SERVER e SMTP_PORT. Um perfil nomeado usa as mesmas variáveis com o
+nome como prefixo (ex.: perfil "clinica" -> CLINICA_EMAIL_SENDER,
+CLINICA_SMTP_SERVER...). EMAIL_PROFILE escolhe o perfil usado por padrão.
 """
 
 import os
-from dotenv import load_dotenv
-
-# Carregar variáveis do arquivo .env (se existir)
-load_dotenv()
-
-# Configuração de Email - Dados sensíveis vêm de variáveis de ambiente
-EMAIL_CONFIG = {
-    "provider": os.getenv("EMAIL_PROVIDER", "gmail"),
-    "sender_email": os.getenv("EMAIL_SENDER"),
-    "sender_password": os.getenv("EMAIL_PASSWORD"),
-    "sender_name": "Sistema de Avaliação",
-    "smtp_server": os.getenv("SMTP_SERVER", "smtp.gmail.com"),
-    "smtp_port": int(os.getenv("SMTP_PORT", "587")),
+import threading
+
+# Servidor e porta de cada provedor, quando SMTP_SERVER/SMTP_PORT não são definidos
+PROVIDERS = {
+    "gmail": ("smtp.gmail.com", 587),
+    "outlook": ("smtp.office365.com", 587),
+    "yahoo": ("smtp.mail.yahoo.com", 587),
 }
 
-# Validar se credenciais estão configuradas
-if not EMAIL_CONFIG["sender_email"] or not EMAIL_CONFIG["sender_password"]:
-    raise EnvironmentError(
-        "\nCredenciais de email não configuradas!\n\n"
-        "Para usar o envio de emails, configure as variáveis de ambiente:\n"
-        "  - EMAIL_SENDER: seu.email@gmail.com\n"
-        "  - EMAIL_PASSWORD: sua_senha_de_app\n"
-        "\nOpções:\n"
-        "  1. Criar arquivo .env na pasta do app (NÃO FAZER COMMIT)\n"
-        "  2. Definir variáveis de ambiente do sistema\n"
-        "  3. Ver arquivo .env.example para referência\n"
+DEFAULT_PROFILE = "default"
+DEFAULT_SENDER_NAME = "Sistema de Avaliação"
+
+_lock = threading.Lock()
+_env_carregado = False
+_configs = {}
+
+
+class EmailConfigError(EnvironmentError):
+    """Configuração de email ausente ou inválida (levantada ao enviar)."""
+
+
+class EmailConfig:
+    """Configuração SMTP resolvida de um perfil."""
+
+    __slots__ = (
+        "profile",
+        "provider",
+        "sender_email",
+        "sender_password",
+        "sender_name",
+        "smtp_server",
+        "smtp_port",
     )
+
+    def __init__(
+        self,
+        profile=DEFAULT_PROFILE,
+        provider="gmail",
+        sender_email=None,
+        sender_password=None,
+        sender_name=DEFAULT_SENDER_NAME,
+        smtp_server=None,
+        smtp_port=None,
+    ):
+        servidor_padrao, porta_padrao = PROVIDERS.get(provider, PROVIDERS["gmail"])
+        self.profile = profile
+        self.provider = provider
+        self.sender_email = sender_email
+        self.sender_password = sender_password
+        self.sender_name = sender_name
+        self.smtp_server = smtp_server or servidor_padrao
+        self.smtp_port = smtp_port or porta_padrao
+
+    def problems(self):
+        """Lista (vazia se ok) dos problemas que impedem um envio."""
+        prefixo = _prefixo(self.profile)
+        problemas = []
+        if not self.sender_email:
+            problemas.append(f"{prefixo}EMAIL_SENDER não definido")
+        if not self.sender_password:
+            problemas.append(f"{prefixo}EMAIL_PASSWORD não definido")
+        try:
+            porta = int(self.smtp_port)
+        except (TypeError, ValueError):
+            porta = 0
+        if not 0 < porta < 65536:
+            problemas.append(f"{prefixo}SMTP_PORT inválida: {self.smtp_port!r}")
+        return problemas
+
+    def is_configured(self):
+        return not self.problems()
+
+    def validate(self):
+        """
+        Garante que a configuração permite enviar.
+
+        Raises:
+            EmailConfigError: Com a lista de problemas e instruções
+        """
+        problemas = self.problems()
+        if not problemas:
+            return
+        prefixo = _prefixo(self.profile)
+        raise EmailConfigError(
+            "\nCredenciais de email não configuradas!\n\n"
+            + "".join(f"  - {problema}\n" for problema in problemas)
+            + "\nPara usar o envio de emails, configure as variáveis de ambiente:\n"
+            f"  - {prefixo}EMAIL_SENDER: seu.email@gmail.com\n"
+            f"  - {prefixo}EMAIL_PASSWORD: sua_senha_de_app\n"
+            "\nOpções:\n"
+            "  1. Criar arquivo .env na pasta do app (NÃO FAZER COMMIT)\n"
+            "  2. Definir variáveis de ambiente do sistema\n"
+            "  3. Ver arquivo .env.example para referência\n"
+        )
+
+    def as_dict(self):
+        """Formato do antigo EMAIL_CONFIG."""
+        return {campo: getattr(self, campo) for campo in self.__slots__ if campo != "profile"}
+
+    def __repr__(self):
+        # Nunca exibir a senha
+        return (
+            f"EmailConfig(profile={self.profile!r}, sender_email={self.sender_email!r}, "
+            f"smtp_server={self.smtp_server!r}, smtp_port={self.smtp_port!r})"
+        )
+
+
+def _prefixo(profile):
+    if not profile or profile == DEFAULT_PROFILE:
+        return ""
+    return profile.upper().replace("-", "_") + "_"
+
+
+def _load_env():
+    """Carrega o .env uma única vez (python-dotenv é opcional)."""
+    global _env_carregado
+    if _env_carregado:
+        return
+    _env_carregado = True
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+
+def _resolve(profile):
+    prefixo = _prefixo(profile)
+
+    def env(nome, padrao=None):
+        return os.getenv(prefixo + nome) or padrao
+
+    porta = env("SMTP_PORT")
+    if porta is not None:
+        try:
+            porta = int(porta)
+        except ValueError:
+            pass  # Reportada por validate(), não aqui
+    return EmailConfig(
+        profile=profile,
+        provider=env("EMAIL_PROVIDER", "gmail").lower(),
+        sender_email=env("EMAIL_SENDER"),
+        sender_password=env("EMAIL_PASSWORD"),
+        sender_name=env("EMAIL_SENDER_NAME", DEFAULT_SENDER_NAME),
+        smtp_server=env("SMTP_SERVER"),
+        smtp_port=porta,
+    )
+
+
+def get_email_config(profile=None):
+    """
+    Configuração do perfil, resolvida no primeiro uso e mantida em cache.
+
+    Args:
+        profile: Nome do perfil; None usa EMAIL_PROFILE ou o perfil padrão
+
+    Returns:
+        EmailConfig (pode estar incompleta; veja validate())
+    """
+    with _lock:
+        _load_env()
+        profile = (profile or os.getenv("EMAIL_PROFILE") or DEFAULT_PROFILE).lower()
+        config = _configs.get(profile)
+        if config is None:
+            config = _configs[profile] = _resolve(profile)
+        return config
+
+
+def reload_email_config():
+    """Descarta o cache; o próximo get_email_config() relê o ambiente."""
+    global _env_carregado
+    with _lock:
+        _env_carregado = False
+        _configs.clear()
+
+
+def __getattr__(name):
+    # Compatibilidade: EMAIL_CONFIG continua importável, mas só é resolvido
+    # quando acessado
+    if name == "EMAIL_CONFIG":
+        return get_email_config().as_dict()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
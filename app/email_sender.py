@@ -9,46 +9,134 @@ from email.mime.text import MIMEText
 from email.utils import formatdate
 from email import encoders
 from pathlib import Path
-from email_config import EMAIL_CONFIG
+from email_config import EmailConfigError, get_email_config
+
+
+# Falhas de conexão que justificam reconectar e reenviar uma vez
+_CONNECTION_ERRORS = (
+    smtplib.SMTPServerDisconnected,
+    ConnectionResetError,
+    BrokenPipeError,
+)
 
 
 class EmailSender:
-    """Gerenciador de envio de emails com prontuários PDF."""
+    """
+    Gerenciador de envio de emails com prontuários PDF.
+
+    Pode ser usado como sessão, mantendo uma única conexão autenticada
+    (STARTTLS + login) para vários envios:
+
+        with EmailSender() as sender:
+            sender.send_prontuario(...)
+            sender.send_prontuario(...)
+
+    Fora de um bloco with, cada send_prontuario abre e fecha a sua conexão.
+
+    Criar o EmailSender nunca falha por falta de credenciais: a
+    configuração só é validada ao conectar (EmailConfigError).
 
-    def __init__(self):
-        self.config = EMAIL_CONFIG
-        self.smtp_server = self.config["smtp_server"]
-        self.smtp_port = int(self.config["smtp_port"])
-        self.sender_email = self.config["sender_email"]
-        self.sender_password = self.config["sender_password"]
-        self.sender_name = self.config["sender_name"]
+    Args:
+        config: EmailConfig explícita (padrão: get_email_config(profile))
+        profile: Perfil de email_config a usar quando config é None
+    """
 
-    def send_prontuario(self, recipient_email, recipient_name, pdf_path):
+    def __init__(self, config=None, profile=None):
+        self.config = config or get_email_config(profile)
+        self.smtp_server = self.config.smtp_server
+        self.smtp_port = self.config.smtp_port
+        self.sender_email = self.config.sender_email
+        self.sender_password = self.config.sender_password
+        self.sender_name = self.config.sender_name
+        self.timeout = 30
+        self._server = None
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def connect(self):
         """
-        Envia prontuário em PDF por email.
+        Abre a conexão SMTP, com STARTTLS e login.
+
+        Raises:
+            EmailConfigError: Se a configuração estiver incompleta
+        """
+        self.config.validate()
+        self.close()
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
+        try:
+            server.starttls()  # Criptografia
+            server.login(self.sender_email, self.sender_password)
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+
+    def close(self):
+        """Encerra a conexão aberta, se houver."""
+        server, self._server = self._server, None
+        if server is None:
+            return
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def _send_message(self, msg):
+        """Envia pela conexão da sessão, reconectando uma vez se ela caiu."""
+        if self._server is None:
+            self.connect()
+        try:
+            self._server.send_message(msg)
+        except _CONNECTION_ERRORS:
+            self.connect()
+            self._server.send_message(msg)
+
+    def build_message(self, recipient_email, recipient_name, pdf, filename=None):
+        """
+        Monta a mensagem MIME do prontuário.
 
         Args:
             recipient_email: Email do destinatário
             recipient_name: Nome do destinatário
-            pdf_path: Caminho completo do arquivo PDF
+            pdf: Caminho do arquivo PDF, bytes, ou buffer legível (ex.: BytesIO)
+            filename: Nome do anexo (padrão: nome do arquivo ou prontuario.pdf)
 
         Returns:
-            Tupla (sucesso: bool, mensagem: str)
+            MIMEMultipart pronta para envio
+
+        Raises:
+            FileNotFoundError: Se pdf for um caminho inexistente
         """
-        try:
+        if isinstance(pdf, (bytes, bytearray, memoryview)):
+            pdf_data = bytes(pdf)
+        elif hasattr(pdf, "read"):
+            if hasattr(pdf, "getvalue"):
+                pdf_data = pdf.getvalue()
+            else:
+                pdf_data = pdf.read()
+        else:
             # Validar arquivo
-            if not Path(pdf_path).exists():
-                return False, f"Arquivo não encontrado: {pdf_path}"
-
-            # Criar mensagem
-            msg = MIMEMultipart()
-            msg["From"] = f"{self.sender_name} <{self.sender_email}>"
-            msg["To"] = recipient_email
-            msg["Date"] = formatdate(localtime=True)
-            msg["Subject"] = "Prontuário de Avaliação - Sistema de Avaliação"
-
-            # Corpo do email
-            body = f"""
+            if not Path(pdf).exists():
+                raise FileNotFoundError(f"Arquivo não encontrado: {pdf}")
+            pdf_data = Path(pdf).read_bytes()
+            filename = filename or Path(pdf).name
+        filename = filename or "prontuario.pdf"
+
+        # Criar mensagem
+        msg = MIMEMultipart()
+        msg["From"] = f"{self.sender_name} <{self.sender_email}>"
+        msg["To"] = recipient_email
+        msg["Date"] = formatdate(localtime=True)
+        msg["Subject"] = "Prontuário de Avaliação - Sistema de Avaliação"
+
+        # Corpo do email
+        body = f"""
 Prezado(a) {recipient_name},
 
 Segue anexado o prontuário de sua avaliação realizada através do Sistema de Avaliação de Risco.
@@ -76,29 +164,81 @@ Projeto Acadêmico - Apenas para fins educacionais
 
 """
 
-            msg.attach(MIMEText(body, "plain"))
+        msg.attach(MIMEText(body, "plain"))
 
-            # Anexar PDF
-            with open(pdf_path, "rb") as attachment:
-                part = MIMEBase("application", "octet-stream")
-                part.set_payload(attachment.read())
+        # Anexar PDF
+        part = MIMEBase("application", "octet-stream")
+        part.set_payload(pdf_data)
 
-            encoders.encode_base64(part)
-            filename = Path(pdf_path).name
-            part.add_header("Content-Disposition", f"attachment; filename= {filename}")
-            msg.attach(part)
+        encoders.encode_base64(part)
+        # Parâmetro gerado pelo pacote email: nomes com acento viram RFC 2231
+        # (filename*=utf-8''...), que os clientes leem como nome do anexo
+        part.add_header("Content-Disposition", "attachment", filename=filename)
+        msg.attach(part)
+        return msg
 
-            # Enviar email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()  # Criptografia
-                server.login(self.sender_email, self.sender_password)
-                server.send_message(msg)
+    def send_prontuario(self, recipient_email, recipient_name, pdf, filename=None):
+        """
+        Envia prontuário em PDF por email.
+
+        Usa a conexão da sessão, se houver; senão abre uma só para este envio.
+
+        Args:
+            recipient_email: Email do destinatário
+            recipient_name: Nome do destinatário
+            pdf: Caminho do arquivo PDF, bytes, ou buffer legível (ex.: BytesIO)
+            filename: Nome do anexo (padrão: nome do arquivo ou prontuario.pdf)
 
+        Returns:
+            Tupla (sucesso: bool, mensagem: str)
+        """
+        sessao_propria = self._server is None
+        try:
+            msg = self.build_message(recipient_email, recipient_name, pdf, filename)
+            self._send_message(msg)
             return True, f"Email enviado com sucesso para {recipient_email}"
 
+        except (FileNotFoundError, EmailConfigError) as e:
+            return False, str(e)
         except smtplib.SMTPAuthenticationError:
             return False, "Erro de autenticação. Verifique email e senha."
         except smtplib.SMTPException as e:
             return False, f"Erro ao enviar email: {str(e)}"
         except Exception as e:
             return False, f"Erro inesperado: {str(e)}"
+        finally:
+            if sessao_propria:
+                self.close()
+
+    def send_many(self, envios):
+        """
+        Envia vários prontuários por uma única conexão autenticada.
+
+        Falhas em um envio não interrompem os demais; se a conexão cair,
+        ela é reaberta automaticamente.
+
+        Args:
+            envios: Iterável de tuplas (recipient_email, recipient_name, pdf)
+                ou (recipient_email, recipient_name, pdf, filename)
+
+        Returns:
+            Lista de tuplas (sucesso, mensagem), na ordem de envios; se a
+            conexão inicial falhar, a lista termina com esse erro
+        """
+        resultados = []
+        sessao_propria = self._server is None
+        try:
+            if sessao_propria:
+                self.connect()
+            for envio in envios:
+                resultados.append(self.send_prontuario(*envio))
+        except EmailConfigError as e:
+            resultados.append((False, str(e)))
+        except smtplib.SMTPAuthenticationError:
+            resultados.append((False, "Erro de autenticação. Verifique email e senha."))
+        except (smtplib.SMTPException, OSError) as e:
+            resultados.append((False, f"Erro ao conectar: {str(e)}"))
+        finally:
+            if sessao_propria:
+                self.close()
+        return resultados
@@ -0,0 +1,430 @@
+"""
+Lista virtualizada do histórico de avaliações (model/view).
+
+HistoryModel carrega o histórico do banco sob demanda (canFetchMore/
+fetchMore, com paginação keyset) e mantém em memória só os blocos de
+linhas usados recentemente. HistoryDelegate pinta o cartão de cada linha
+diretamente com QPainter: nenhum widget é criado por avaliação, e só as
+linhas visíveis são desenhadas.
+"""
+
+from bisect import bisect_right
+from collections import OrderedDict, namedtuple
+
+from PyQt6.QtCore import (
+    QAbstractListModel,
+    QEvent,
+    QModelIndex,
+    QRect,
+    QSize,
+    Qt,
+    pyqtSignal,
+)
+from PyQt6.QtGui import QColor, QFont, QFontMetrics, QPainter
+from PyQt6.QtWidgets import QAbstractItemView, QListView, QStyledItemDelegate
+
+from config import (
+    DANGER_COLOR,
+    DARK_TEXT,
+    LEVEL_COLORS,
+    LEVEL_ICONS,
+    PRIMARY_COLOR,
+    SECONDARY_COLOR,
+)
+
+# Linhas por bloco lido do banco; só os MAX_CACHED_BLOCKS usados há menos
+# tempo ficam em memória
+BLOCK_SIZE = 100
+MAX_CACHED_BLOCKS = 20
+
+# Chaves buscadas pelo primeiro fetchMore; cada fetchMore seguinte dobra,
+# até FETCH_MAX (cada inserção de linhas relayouta a lista inteira)
+FETCH_MIN = 200
+FETCH_MAX = 20_000
+
+# Uma linha do histórico (formato de Database._formatar_avaliacao)
+HistoryRow = namedtuple("HistoryRow", ["id", "patient_name", "level", "score", "data"])
+
+# Papel com o HistoryRow completo da linha
+RecordRole = Qt.ItemDataRole.UserRole + 1
+
+# Cores mais suaves e amigáveis para o fundo do cartão
+SOFT_COLORS = {
+    "Baixo": "#E0F2FE",  # Azul claro
+    "Médio": "#FEF3C7",  # Amarelo claro
+    "Alto": "#FED7D7",  # Vermelho fraco
+    "Crítico": "#FED7D7",  # Vermelho fraco
+}
+
+
+class HistoryModel(QAbstractListModel):
+    """
+    Modelo do histórico (mais recentes primeiro), carregado sob demanda.
+
+    fetchMore lê apenas as chaves das próximas avaliações (índice, sem
+    tocar na tabela) e guarda um cursor keyset por bloco de BLOCK_SIZE
+    linhas. O conteúdo de um bloco só é lido quando uma linha dele é pintada,
+    e só os blocos usados há menos tempo ficam em cache: a memória não cresce
+    com a rolagem.
+
+    Com filtros (set_filters), as mesmas operações usam a busca indexada
+    (search_page/search_page_keys) e o total só é conhecido ao fim.
+
+    Args:
+        history_manager: HistoryManager (get_page, get_page_keys, get_count
+            e as variantes search_*)
+        block_size: Linhas por bloco
+        max_blocks: Blocos mantidos em memória
+    """
+
+    def __init__(
+        self,
+        history_manager,
+        block_size=BLOCK_SIZE,
+        max_blocks=MAX_CACHED_BLOCKS,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self.history_manager = history_manager
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        self.filtros = None
+        self._reset_state()
+
+    def _reset_state(self):
+        self._starts = []  # cursor anterior à primeira linha de cada bloco
+        self._sizes = []  # linhas de cada bloco
+        self._offsets = []  # primeira linha de cada bloco
+        self._count = 0
+        self._end_cursor = None
+        self._has_more = True
+        self._fetch_size = FETCH_MIN
+        self._blocks = OrderedDict()  # índice do bloco -> [HistoryRow]
+        # Numa busca o total não é contado (custaria percorrer todos os resultados)
+        self.total = None if self.filtros else self.history_manager.get_count()
+
+    def _keys(self, limit, cursor):
+        if self.filtros:
+            return self.history_manager.search_page_keys(self.filtros, limit, cursor)
+        return self.history_manager.get_page_keys(limit, cursor)
+
+    def _page(self, limit, cursor):
+        if self.filtros:
+            return self.history_manager.search_page(self.filtros, limit, cursor)
+        return self.history_manager.get_page(limit, cursor)
+
+    def rowCount(self, parent=QModelIndex()):
+        # Lista plana: apenas a raiz tem filhos
+        return 0 if parent.isValid() else self._count
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.row_at(index.row())
+        if row is None:
+            return None
+        if role == RecordRole:
+            return row
+        if role == Qt.ItemDataRole.DisplayRole:
+            return row.patient_name
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return f"{row.patient_name} — {row.level} ({row.score} pts)"
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self._has_more:
+            return
+        chaves = self._keys(self._fetch_size, self._end_cursor)
+        self._has_more = len(chaves) == self._fetch_size
+        self._fetch_size = min(self._fetch_size * 2, FETCH_MAX)
+        if not chaves:
+            return
+
+        inicio = self._count
+        self.beginInsertRows(QModelIndex(), inicio, inicio + len(chaves) - 1)
+        anterior = self._end_cursor
+        for i in range(0, len(chaves), self.block_size):
+            bloco = chaves[i : i + self.block_size]
+            self._starts.append(anterior)
+            self._sizes.append(len(bloco))
+            self._offsets.append(self._count)
+            self._count += len(bloco)
+            anterior = bloco[-1]
+        self._end_cursor = anterior
+        self.endInsertRows()
+
+    def row_at(self, row):
+        """HistoryRow da linha `row`, lendo o bloco do banco se preciso."""
+        j = bisect_right(self._offsets, row) - 1
+        if j < 0:
+            return None
+        linhas = self._block(j)
+        i = row - self._offsets[j]
+        return linhas[i] if i < len(linhas) else None
+
+    def _block(self, j):
+        linhas = self._blocks.get(j)
+        if linhas is not None:
+            self._blocks.move_to_end(j)
+            return linhas
+        registros, _ = self._page(self._sizes[j], self._starts[j])
+        linhas = [
+            HistoryRow(r["id"], r["patient_name"], r["level"], r["score"], r.get("data", ""))
+            for r in registros
+        ]
+        self._blocks[j] = linhas
+        while len(self._blocks) > self.max_blocks:
+            self._blocks.popitem(last=False)
+        return linhas
+
+    def reload(self):
+        """Descarta as linhas carregadas e recomeça do início."""
+        self.beginResetModel()
+        self._reset_state()
+        self.endResetModel()
+
+    def set_filters(self, filtros):
+        """
+        Troca a busca/filtros e recomeça a lista.
+
+        Args:
+            filtros: Dicionário de Database.search_avaliacoes (valores None
+                são ignorados); vazio ou None = histórico completo
+        """
+        filtros = {k: v for k, v in (filtros or {}).items() if v not in (None, "")}
+        if filtros == (self.filtros or {}):
+            return
+        self.filtros = filtros or None
+        self.reload()
+
+    def is_complete(self):
+        """True quando todas as linhas já foram descobertas por fetchMore."""
+        return not self._has_more
+
+    def remove_id(self, avaliacao_id):
+        """
+        Remove a linha de uma avaliação excluída, sem recarregar a lista.
+
+        Só procura nos blocos em cache (a linha excluída acabou de ser
+        clicada, então está visível).
+
+        Returns:
+            True se a avaliação estava carregada
+        """
+        for j, linhas in self._blocks.items():
+            for i, row in enumerate(linhas):
+                if row.id != avaliacao_id:
+                    continue
+                linha = self._offsets[j] + i
+                self.beginRemoveRows(QModelIndex(), linha, linha)
+                del linhas[i]
+                # O cursor dos blocos seguintes continua válido: a busca
+                # keyset é por "menor que", exista ou não a chave
+                self._sizes[j] -= 1
+                for k in range(j + 1, len(self._offsets)):
+                    self._offsets[k] -= 1
+                self._count -= 1
+                if self.total is not None:
+                    self.total -= 1
+                self.endRemoveRows()
+                return True
+        return False
+
+
+class HistoryDelegate(QStyledItemDelegate):
+    """Pinta cada avaliação como cartão, com os botões "Ver →" e "✕"."""
+
+    view_requested = pyqtSignal(int)  # avaliacao_id
+    delete_requested = pyqtSignal(int)  # avaliacao_id
+
+    ROW_HEIGHT = 84
+    MARGIN_V = 6
+    PADDING_H = 16
+    VIEW_BTN = QSize(72, 36)
+    DELETE_BTN = QSize(44, 36)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Fontes e cores criadas uma vez, reaproveitadas em cada paint
+        self.name_font = QFont("Poppins")
+        self.name_font.setPixelSize(15)
+        self.name_font.setWeight(QFont.Weight.DemiBold)
+        self.info_font = QFont("Poppins")
+        self.info_font.setPixelSize(12)
+        self.button_font = QFont("Segoe UI")
+        self.button_font.setPixelSize(13)
+        self.button_font.setWeight(QFont.Weight.DemiBold)
+        self.name_metrics = QFontMetrics(self.name_font)
+        self.info_metrics = QFontMetrics(self.info_font)
+        self.text_color = QColor(DARK_TEXT)
+        self.info_color = QColor("#6B7280")
+        self.white = QColor("white")
+        self.danger = QColor(DANGER_COLOR)
+        self._level_colors = {}
+        self._hover = None  # (linha, "ver" | "excluir")
+
+    def _colors(self, level):
+        """(cor do nível, fundo do cartão) em cache por nível."""
+        cores = self._level_colors.get(level)
+        if cores is None:
+            cores = self._level_colors[level] = (
+                QColor(LEVEL_COLORS.get(level, SECONDARY_COLOR)),
+                QColor(SOFT_COLORS.get(level, "#E0F2FE")),
+            )
+        return cores
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), self.ROW_HEIGHT)
+
+    def _card_rect(self, rect):
+        return rect.adjusted(0, self.MARGIN_V, 0, -self.MARGIN_V)
+
+    def _button_rects(self, rect):
+        """Retângulos dos botões "Ver →" e "✕", alinhados à direita."""
+        card = self._card_rect(rect)
+        direita = card.right() - self.PADDING_H
+        delete = QRect(0, 0, self.DELETE_BTN.width(), self.DELETE_BTN.height())
+        delete.moveRight(direita)
+        delete.moveTop(card.center().y() - delete.height() // 2)
+        view = QRect(0, 0, self.VIEW_BTN.width(), self.VIEW_BTN.height())
+        view.moveRight(delete.left() - 12)
+        view.moveTop(delete.top())
+        return view, delete
+
+    def paint(self, painter, option, index):
+        row = index.data(RecordRole)
+        if row is None:
+            return
+        level_color, card_bg = self._colors(row.level)
+        card = self._card_rect(option.rect)
+        view_rect, delete_rect = self._button_rects(option.rect)
+
+        painter.save()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(Qt.PenStyle.NoPen)
+
+        # Cartão
+        painter.setBrush(card_bg)
+        painter.drawRoundedRect(card, 12, 12)
+
+        # Indicador de nível (ponto colorido)
+        painter.setBrush(level_color)
+        x = card.left() + self.PADDING_H
+        painter.drawEllipse(x, card.center().y() - 5, 10, 10)
+
+        # Textos
+        texto_x = x + 10 + 12
+        largura = view_rect.left() - 12 - texto_x
+        row_number = index.row() + 1
+        info = (
+            f"Avaliação #{row_number}  •  {row.data}  •  "
+            f"{LEVEL_ICONS.get(row.level, '●')} {row.level}  •  {row.score} pts"
+        )
+        altura_nome = self.name_metrics.height()
+        altura_info = self.info_metrics.height()
+        topo = card.center().y() - (altura_nome + 2 + altura_info) // 2
+
+        painter.setPen(self.text_color)
+        painter.setFont(self.name_font)
+        painter.drawText(
+            QRect(texto_x, topo, largura, altura_nome),
+            Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+            self.name_metrics.elidedText(
+                row.patient_name or "", Qt.TextElideMode.ElideRight, largura
+            ),
+        )
+        painter.setPen(self.info_color)
+        painter.setFont(self.info_font)
+        painter.drawText(
+            QRect(texto_x, topo + altura_nome + 2, largura, altura_info),
+            Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+            self.info_metrics.elidedText(info, Qt.TextElideMode.ElideRight, largura),
+        )
+
+        # Botões
+        painter.setFont(self.button_font)
+        for rect, cor, texto, alvo in (
+            (view_rect, level_color, "Ver →", "ver"),
+            (delete_rect, self.danger, "✕", "excluir"),
+        ):
+            if self._hover == (index.row(), alvo):
+                cor = cor.lighter(115)
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(cor)
+            painter.drawRoundedRect(rect, 8, 8)
+            painter.setPen(self.white)
+            painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, texto)
+
+        painter.restore()
+
+    def _hit(self, option, pos):
+        view_rect, delete_rect = self._button_rects(option.rect)
+        if view_rect.contains(pos):
+            return "ver"
+        if delete_rect.contains(pos):
+            return "excluir"
+        return None
+
+    def editorEvent(self, event, model, option, index):
+        tipo = event.type()
+        if tipo == QEvent.Type.MouseMove:
+            hover = (index.row(), self._hit(option, event.position().toPoint()))
+            hover = hover if hover[1] else None
+            if hover != self._hover:
+                self._hover = hover
+                if self.parent() is not None:
+                    self.parent().viewport().update()
+            return False
+        if tipo == QEvent.Type.MouseButtonRelease and event.button() == Qt.MouseButton.LeftButton:
+            alvo = self._hit(option, event.position().toPoint())
+            row = index.data(RecordRole)
+            if row is not None and alvo == "ver":
+                self.view_requested.emit(row.id)
+                return True
+            if row is not None and alvo == "excluir":
+                self.delete_requested.emit(row.id)
+                return True
+        return super().editorEvent(event, model, option, index)
+
+    def clear_hover(self):
+        self._hover = None
+
+
+class HistoryListView(QListView):
+    """QListView configurada para o histórico (linhas de altura fixa)."""
+
+    view_requested = pyqtSignal(int)
+    delete_requested = pyqtSignal(int)
+
+    def __init__(self, model, parent=None):
+        super().__init__(parent)
+        self.delegate = HistoryDelegate(self)
+        self.setItemDelegate(self.delegate)
+        self.setModel(model)
+        # Altura uniforme: o layout não consulta sizeHint linha a linha
+        self.setUniformItemSizes(True)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        # Os cartões acompanham a largura da lista; nunca rolar na horizontal
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.verticalScrollBar().setSingleStep(24)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.setMouseTracking(True)
+        self.setFrameShape(QListView.Shape.NoFrame)
+        self.setStyleSheet(f"QListView {{ background-color: {PRIMARY_COLOR}; border: none; }}")
+        self.delegate.view_requested.connect(self.view_requested)
+        self.delegate.delete_requested.connect(self.delete_requested)
+        self.doubleClicked.connect(self._on_double_clicked)
+
+    def _on_double_clicked(self, index):
+        row = index.data(RecordRole)
+        if row is not None:
+            self.view_requested.emit(row.id)
+
+    def leaveEvent(self, event):
+        self.delegate.clear_hover()
+        self.viewport().update()
+        super().leaveEvent(event)
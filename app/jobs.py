@@ -0,0 +1,142 @@
+"""
+Execução de tarefas longas fora da thread da interface.
+
+Cada tarefa roda em um QThreadPool e conversa com a GUI apenas por sinais
+(progresso, conclusão, erro, cancelamento), entregues na thread principal.
+"""
+
+import threading
+import traceback
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class JobCancelled(Exception):
+    """Levantada dentro da tarefa quando o cancelamento foi solicitado."""
+
+
+class JobSignals(QObject):
+    """Sinais de um Job (QRunnable não é QObject e não pode emiti-los)."""
+
+    progress = pyqtSignal(int, str)  # percentual (0-100), mensagem
+    finished = pyqtSignal(object)  # valor de retorno da tarefa
+    failed = pyqtSignal(str, str)  # mensagem, traceback
+    cancelled = pyqtSignal()
+
+
+class Job(QRunnable):
+    """
+    Tarefa executada no pool de threads.
+
+    A função recebe o próprio Job como primeiro argumento, para reportar
+    progresso e respeitar o cancelamento:
+
+        def tarefa(job, caminho):
+            job.report(10, "Gerando PDF...")
+            ...
+    """
+
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = JobSignals()
+        self._cancelar = threading.Event()
+        self.done = threading.Event()
+        # O JobManager mantém a referência até o fim da execução
+        self.setAutoDelete(False)
+
+    def cancel(self):
+        """Solicita o cancelamento (efetivo no próximo report/check)."""
+        self._cancelar.set()
+
+    def is_cancelled(self):
+        return self._cancelar.is_set()
+
+    def check(self):
+        """Interrompe a tarefa se o cancelamento foi solicitado."""
+        if self._cancelar.is_set():
+            raise JobCancelled()
+
+    def report(self, percent, message=""):
+        """Reporta progresso; também é um ponto de cancelamento."""
+        self.check()
+        self.signals.progress.emit(int(percent), message)
+
+    def run(self):
+        try:
+            self.check()
+            result = self.fn(self, *self.args, **self.kwargs)
+            self.check()
+        except JobCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            self.signals.failed.emit(str(e), traceback.format_exc())
+        else:
+            self.signals.finished.emit(result)
+        finally:
+            self.done.set()
+
+
+class JobManager(QObject):
+    """Ponto único para disparar tarefas longas a partir da interface."""
+
+    def __init__(self, max_threads=None, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool()
+        if max_threads:
+            self.pool.setMaxThreadCount(max_threads)
+        self._jobs = set()
+
+    def submit(
+        self,
+        fn,
+        *args,
+        on_finished=None,
+        on_failed=None,
+        on_progress=None,
+        on_cancelled=None,
+        **kwargs,
+    ):
+        """
+        Agenda fn(job, *args, **kwargs) no pool.
+
+        Args:
+            fn: Função da tarefa (recebe o Job como primeiro argumento)
+            on_finished: Slot chamado com o valor de retorno
+            on_failed: Slot chamado com (mensagem, traceback)
+            on_progress: Slot chamado com (percentual, mensagem)
+            on_cancelled: Slot chamado sem argumentos
+
+        Returns:
+            O Job criado (use job.cancel() para cancelar)
+        """
+        job = Job(fn, *args, **kwargs)
+        for sinal, slot in (
+            (job.signals.finished, on_finished),
+            (job.signals.failed, on_failed),
+            (job.signals.progress, on_progress),
+            (job.signals.cancelled, on_cancelled),
+        ):
+            if slot is not None:
+                sinal.connect(slot)
+        for sinal in (job.signals.finished, job.signals.failed, job.signals.cancelled):
+            sinal.connect(lambda *_, job=job: self._jobs.discard(job))
+
+        self._jobs.add(job)
+        self.pool.start(job)
+        return job
+
+    def active_count(self):
+        """Número de tarefas ainda não concluídas."""
+        return sum(1 for job in self._jobs if not job.done.is_set())
+
+    def cancel_all(self):
+        """Solicita o cancelamento de todas as tarefas pendentes."""
+        for job in list(self._jobs):
+            job.cancel()
+
+    def wait(self, msecs=-1):
+        """Aguarda o pool esvaziar (usado ao fechar a janela)."""
+        return self.pool.waitForDone(msecs)
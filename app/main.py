@@ -1,3 +1,8 @@
+import time
+
+# Marco zero do relatório de inicialização (APP_STARTUP_REPORT)
+_T_INICIO = time.perf_counter()
+
 from PyQt6.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -16,18 +21,29 @@ from PyQt6.QtWidgets import (
     QFileDialog,
     QMessageBox,
     QDialog,
+    QProgressDialog,
+    QComboBox,
+    QCheckBox,
+    QDateEdit,
+    QSpinBox,
 )
-from PyQt6.QtCore import Qt, QPropertyAnimation, QEasingCurve, QSize
-from PyQt6.QtGui import QFont, QPalette, QColor
+from PyQt6.QtCore import QDate, Qt, QPropertyAnimation, QEasingCurve, QSize, QTimer, pyqtSignal
+from PyQt6.QtGui import QFont, QPalette, QColor, QPainter, QPixmap
 import sys
 import os
+import argparse
+from collections import deque
+from functools import lru_cache
 from datetime import datetime
 from config import *
-from data_manager import QuestionManager, HistoryManager, load_questions
+from data_manager import QuestionManager, HistoryManager, load_compiled_questions
 from utils import get_risk_level
-from pdf_generator import PDFGenerator
 from accordion import AccordionWidget
 from db import Database
+from jobs import JobManager
+from pdf_cache import PDFCache, default_cache_dir
+from outbox import OutboxWorker, STATUS_LABELS
+from email_config import get_email_config
 
 
 class ResponsesListWidget(QFrame):
@@ -256,169 +272,376 @@ class StatCard(QFrame):
         self.setGraphicsEffect(shadow)
 
 
-class HistoryCard(QFrame):
-    def __init__(self, number, data, on_view_details, on_delete, parent=None):
-        super().__init__(parent)
-        self.data = data
-        self.on_view_details = on_view_details
-        self.on_delete = on_delete
-        self.number = number
-
-        level = data.get("level", "Baixo")
-        level_color = LEVEL_COLORS.get(level, SECONDARY_COLOR)
-        # Cores mais suaves e amigáveis
-        soft_colors = {
-            "Baixo": "#E0F2FE",  # Azul claro
-            "Médio": "#FEF3C7",  # Amarelo claro
-            "Alto": "#FED7D7",  # Vermelho fraco
-            "Crítico": "#FED7D7",  # Vermelho fraco
-        }
-        card_bg_color = soft_colors.get(level, "#E0F2FE")
-        text_color = "#1F2937"  # Texto escuro para melhor contraste
-        level_icon = LEVEL_ICONS.get(level, "●")
-
-        self.setStyleSheet(
+@lru_cache(maxsize=None)
+def _quiz_stylesheet():
+    """
+    Folha de estilo única da tela de perguntas, compilada uma vez.
+
+    As cores por eixo ficam em regras com seletor de propriedade
+    ([eixoCor="N"]); trocar de eixo só muda a propriedade e repolia o
+    widget, sem gerar nem interpretar CSS novo.
+    """
+    regras = [
+        f"""
+        QFrame#quiz_header {{
+            background-color: {SECONDARY_COLOR};
+            border-radius: 0px;
+            padding: 24px 20px;
+            border: none;
+        }}
+        QFrame#quiz_header > QLabel {{
+            padding: 24px 20px;
+            background-color: transparent;
+        }}
+        QFrame#quiz_progress_frame {{
+            background-color: {LIGHT_BG};
+            padding: 10px;
+        }}
+        QProgressBar#quiz_progress {{
+            background-color: {BORDER_COLOR};
+            border: none;
+            border-radius: 4px;
+            height: 8px;
+        }}
+        QProgressBar#quiz_progress::chunk {{
+            background-color: {SECONDARY_COLOR};
+            border-radius: 4px;
+        }}
+        QLabel#quiz_progress_text {{
+            color: {DARK_TEXT};
+            font-size: 13px;
+            font-weight: 600;
+            font-family: 'Poppins', sans-serif;
+            margin-top: 8px;
+        }}
+        QFrame#quiz_box {{
+            background-color: {LIGHT_BG};
+            border-radius: 16px;
+            padding: 30px 40px;
+        }}
+        QLabel#quiz_question {{
+            color: {DARK_TEXT};
+            font-size: 18px;
+            font-weight: 600;
+            font-family: 'Poppins', sans-serif;
+            padding: 15px;
+            border-radius: 16px;
+            background-color: white;
+        }}
+        """
+    ]
+    for indice, cor in enumerate(EIXO_COLORS.values()):
+        regras.append(
             f"""
-            QFrame {{
-                background-color: {card_bg_color};
-                border-radius: 12px;
-                border: none;
-                padding: 14px 16px;
-                margin: 6px 0px;
-            }}
-            QFrame:hover {{
-                background-color: {card_bg_color};
-            }}
+        QFrame#quiz_header[eixoCor="{indice}"] {{ background-color: {cor}; }}
+        QProgressBar#quiz_progress[eixoCor="{indice}"]::chunk {{ background-color: {cor}; }}
         """
         )
+    return "".join(regras)
 
-        layout = QHBoxLayout()
-        layout.setSpacing(12)
 
-        # Indicador de nível (ponto colorido)
-        indicator = QFrame()
-        indicator.setFixedSize(10, 10)
-        indicator.setStyleSheet(f"background-color: {level_color}; border-radius: 5px;")
-        layout.addWidget(indicator, 0, Qt.AlignmentFlag.AlignVCenter)
+def _repolish(widget):
+    """Reaplica a folha já compilada após mudar uma propriedade dinâmica."""
+    widget.style().unpolish(widget)
+    widget.style().polish(widget)
+    widget.update()
 
-        # Informações
-        info_layout = QVBoxLayout()
-        info_layout.setSpacing(2)
 
-        # Nome do paciente
-        patient_name = data.get("patient_name")
-        name_label = QLabel(patient_name)
-        name_label.setStyleSheet(
-            f"""
-            color: {text_color};
-            font-size: 15px;
-            font-weight: 600;
-            font-family: 'Poppins', sans-serif;
-        """
+class _QuestionLabel(QLabel):
+    """QLabel da pergunta que avisa quando foi pintado (medição de quadro)."""
+
+    def __init__(self, on_painted, parent=None):
+        super().__init__(parent)
+        self._on_painted = on_painted
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        self._on_painted()
+
+
+class QuizView(QWidget):
+    """
+    Tela de perguntas persistente.
+
+    Construída uma vez por sessão; a cada resposta show_question só troca
+    textos, progresso e a propriedade de cor do eixo. Nenhum widget é
+    recriado e nenhuma folha de estilo é interpretada de novo.
+
+    Também mede o tempo de quadro: de mark_answer() até a nova pergunta ser
+    pintada (frame_times, em ms).
+    """
+
+    def __init__(self, on_answer, on_cancel, parent=None):
+        super().__init__(parent)
+        self.setStyleSheet(_quiz_stylesheet())
+        self.frame_times = deque(maxlen=200)
+        self._answer_t0 = None
+        self._eixo_cor = None
+        self._available_height = None
+
+        main_layout = QVBoxLayout()
+        main_layout.setSpacing(0)
+        main_layout.setContentsMargins(0, 0, 0, 0)
+
+        # Header
+        self.header = QFrame()
+        self.header.setObjectName("quiz_header")
+        self.header.setSizePolicy(
+            QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred
+        )
+        header_layout = QVBoxLayout()
+        header_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
+        header_layout.setContentsMargins(20, 12, 20, 12)
+        header_layout.setSpacing(6)
+        self.title_label = ExpertSystemApp._create_header_label(
+            "", 32, WHITE, "app_header_title"
         )
-        info_layout.addWidget(name_label)
+        header_layout.addWidget(self.title_label)
+        self.header.setLayout(header_layout)
+        main_layout.addWidget(self.header)
 
-        # Data e resultado
-        info_text = f"Avaliação #{number}  •  {data['data']}  •  {level_icon} {level}  •  {data['score']} pts"
-        info_label = QLabel(info_text)
-        info_label.setStyleSheet(
-            f"""
-            color: #6B7280;
-            font-size: 12px;
-            font-weight: 400;
-            font-family: 'Poppins', sans-serif;
-        """
+        # Progress bar
+        progress_frame = QFrame()
+        progress_frame.setObjectName("quiz_progress_frame")
+        progress_layout = QVBoxLayout()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setObjectName("quiz_progress")
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setTextVisible(False)
+        progress_layout.addWidget(self.progress_bar)
+        self.progress_text = QLabel()
+        self.progress_text.setObjectName("quiz_progress_text")
+        self.progress_text.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        progress_layout.addWidget(self.progress_text)
+        progress_frame.setLayout(progress_layout)
+        main_layout.addWidget(progress_frame)
+
+        # Conteúdo
+        content = QWidget()
+        content_layout = QVBoxLayout()
+        content_layout.setContentsMargins(20, 20, 20, 20)
+        content_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
+
+        # Box centralizada para pergunta e respostas
+        self.box = QFrame()
+        self.box.setObjectName("quiz_box")
+        self.box.setSizePolicy(
+            QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred
         )
-        info_label.setWordWrap(True)
-        info_layout.addWidget(info_label)
+        box_layout = QVBoxLayout()
+        box_layout.setSpacing(20)
+        box_layout.setContentsMargins(0, 0, 0, 0)
+        box_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
 
-        layout.addLayout(info_layout, 1)
+        self.question_label = _QuestionLabel(self._on_question_painted)
+        self.question_label.setObjectName("quiz_question")
+        self.question_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.question_label.setWordWrap(True)
+        self.question_label.setSizePolicy(
+            QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding
+        )
+        box_layout.addWidget(self.question_label)
 
-        # Botão de detalhes
-        details_btn = ModernButton("Ver →", level_color)
-        details_btn.setMaximumWidth(90)
-        details_btn.setMinimumHeight(36)
-        details_btn.setStyleSheet(
-            f"""
-            QPushButton {{
-                background-color: {level_color};
-                color: white;
-                border: none;
-                border-radius: 8px;
-                padding: 8px 14px;
-                font-size: 13px;
-                font-weight: 600;
-                font-family: 'Segoe UI', -apple-system, sans-serif;
-            }}
-            QPushButton:hover {{
-                background-color: {ModernButton.lighten_color(level_color, 15)};
-            }}
-            QPushButton:pressed {{
-                padding-top: 9px;
-                padding-bottom: 7px;
-            }}
+        # Botões de resposta (ambos com mesma cor para não induzir resposta)
+        btn_layout = QHBoxLayout()
+        btn_layout.setSpacing(12)
+        btn_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.yes_btn = ModernButton("Sim", SECONDARY_COLOR)
+        self.yes_btn.clicked.connect(lambda: on_answer(True))
+        btn_layout.addWidget(self.yes_btn)
+        self.no_btn = ModernButton("Não", SECONDARY_COLOR)
+        self.no_btn.clicked.connect(lambda: on_answer(False))
+        btn_layout.addWidget(self.no_btn)
+        box_layout.addLayout(btn_layout)
+        self.box.setLayout(box_layout)
+
+        # Adicionar sombra ao box
+        shadow = QGraphicsDropShadowEffect(self.box)
+        shadow.setBlurRadius(16)
+        shadow.setOffset(0, 4)
+        shadow.setColor(QColor(0, 0, 0, 25))
+        self.box.setGraphicsEffect(shadow)
+
+        # Centralizar a box
+        box_container = QHBoxLayout()
+        box_container.addStretch()
+        box_container.addWidget(self.box, 0, Qt.AlignmentFlag.AlignCenter)
+        box_container.addStretch()
+        content_layout.addLayout(box_container)
+        content_layout.addStretch()
+
+        # Botão cancelar
+        cancel_btn = ModernButton("Cancelar Avaliação", DANGER_COLOR)
+        cancel_btn.setMaximumHeight(60)
+        cancel_btn.clicked.connect(on_cancel)
+        content_layout.addWidget(cancel_btn)
+
+        content.setLayout(content_layout)
+        main_layout.addWidget(content)
+        self.setLayout(main_layout)
+
+    def show_question(self, question, eixo, number, total, available_height):
         """
+        Atualiza a tela para a pergunta indicada, no lugar.
+
+        Args:
+            question: Pergunta atual (data_manager.Pergunta)
+            eixo: Eixo da pergunta (data_manager.Eixo)
+            number: Número da pergunta (1-indexado)
+            total: Total de perguntas
+            available_height: Altura útil para a box (px)
+        """
+        progress_pct = int(number / total * 100)
+
+        if self.title_label.text() != eixo.nome:
+            self.title_label.setText(eixo.nome)
+        eixo_cor = _eixo_color_key(eixo.nome)
+        if eixo_cor != self._eixo_cor:
+            self._eixo_cor = eixo_cor
+            for widget in (self.header, self.progress_bar):
+                widget.setProperty("eixoCor", eixo_cor)
+                _repolish(widget)
+
+        self.progress_bar.setValue(progress_pct)
+        self.progress_text.setText(
+            f"Pergunta {number} de {total}  •  {progress_pct}% Concluído"
         )
-        details_btn.clicked.connect(lambda: self.on_view_details(number - 1))
-        layout.addWidget(details_btn, 0, Qt.AlignmentFlag.AlignVCenter)
+        self.question_label.setText(question.texto)
 
-        # Botão excluir (somente se possuir id)
-        if "id" in data:
-            delete_btn = ModernButton("✕", DANGER_COLOR)
-            delete_btn.setMaximumWidth(50)
-            delete_btn.setMinimumHeight(36)
-            delete_btn.setStyleSheet(
-                f"""
-                QPushButton {{
-                    background-color: {DANGER_COLOR};
-                    color: white;
-                    border: none;
-                    border-radius: 8px;
-                    padding: 6px 10px;
-                    font-size: 15px;
-                    font-weight: 600;
-                    font-family: 'Segoe UI', -apple-system, sans-serif;
-                }}
-                QPushButton:hover {{
-                    background-color: {ModernButton.lighten_color(DANGER_COLOR, 15)};
-                }}
-                QPushButton:pressed {{
-                    padding-top: 7px;
-                    padding-bottom: 5px;
-                }}
-                """
-            )
-            delete_btn.clicked.connect(lambda: self.on_delete(self.data.get("id")))
-            layout.addWidget(delete_btn, 0, Qt.AlignmentFlag.AlignVCenter)
+        if available_height != self._available_height:
+            self._set_available_height(available_height)
 
-        self.setLayout(layout)
+    def _set_available_height(self, available_height):
+        """Dimensões responsivas da box e dos botões."""
+        self._available_height = available_height
+        self.box.setMinimumHeight(int(available_height * 0.4))
+        self.box.setMaximumHeight(int(available_height * 0.6))
+        btn_width = max(100, int(available_height * 0.15))
+        btn_height = max(40, int(available_height * 0.12))
+        for btn in (self.yes_btn, self.no_btn):
+            btn.setMinimumWidth(btn_width)
+            btn.setMinimumHeight(btn_height)
+
+    def mark_answer(self, t0=None):
+        """Início da medição: instante da resposta (perf_counter)."""
+        self._answer_t0 = time.perf_counter() if t0 is None else t0
+
+    def _on_question_painted(self):
+        if self._answer_t0 is not None:
+            self.frame_times.append((time.perf_counter() - self._answer_t0) * 1000)
+            self._answer_t0 = None
+
+
+def _eixo_color_key(eixo_nome):
+    """Valor da propriedade eixoCor ('' = cor padrão SECONDARY_COLOR)."""
+    for indice, nome in enumerate(EIXO_COLORS):
+        if nome == eixo_nome:
+            return str(indice)
+    return ""
 
-        # Sombra para contraste visual
-        shadow = QGraphicsDropShadowEffect(self)
-        shadow.setBlurRadius(12)
-        shadow.setOffset(0, 2)
-        shadow.setColor(QColor(0, 0, 0, 20))
-        self.setGraphicsEffect(shadow)
+
+def _export_pdf_job(job, record, file_path, pdf_cache=None):
+    """Tarefa: grava o prontuário em file_path (do cache, se disponível)."""
+    job.report(10, "Gerando prontuário...")
+    pdf_data = _render_pdf(record, pdf_cache)
+    job.check()
+    with open(file_path, "wb") as f:
+        f.write(pdf_data)
+    job.report(100, "Concluído")
+    return file_path
+
+
+def _render_pdf(record, pdf_cache=None):
+    """Bytes do prontuário, reaproveitando o cache de PDFs quando houver."""
+    # ReportLab é a dependência mais pesada do app: importado no primeiro
+    # PDF, não na abertura. Com os estilos em cache no módulo, criar o
+    # gerador é barato
+    from pdf_generator import PDFGenerator
+
+    render = PDFGenerator().generate_prontuario_bytes
+    if pdf_cache is None:
+        return render(record)
+    return pdf_cache.get_or_render(record, render)
+
+
+def _batch_export_job(job, destino, db, filtros):
+    """Tarefa: exportação em lote com progresso e cancelamento."""
+    from batch_export import export_batch
+
+    def progress(feitos, total):
+        job.report(feitos * 100 // total if total else 100, f"{feitos} de {total}")
+
+    return export_batch(
+        destino,
+        db=db,
+        progress=progress,
+        should_cancel=job.is_cancelled,
+        **filtros,
+    )
+
+
+# Pausa na digitação antes de consultar a busca do histórico
+SEARCH_DEBOUNCE_MS = 150
 
 
 class ExpertSystemApp(QMainWindow):
     """Aplicação principal do sistema de avaliação."""
 
-    def __init__(self):
+    # Emitido pelo OutboxWorker (outra thread) quando a fila de emails muda
+    outbox_changed = pyqtSignal()
+
+    def __init__(self, db=None, questions_data=None, history_manager=None):
+        """
+        Args:
+            db: Database já aberto (None abre aqui)
+            questions_data: Questionário já carregado (None carrega aqui)
+            history_manager: HistoryManager já criado (None cria um sobre
+                o mesmo db)
+
+        main() prepara os três em segundo plano (_load_app_data) enquanto o
+        splash é exibido; sem eles, tudo é feito de forma síncrona.
+        """
         super().__init__()
         self.setWindowTitle("Sistema de Avaliação de Risco - DSM-5")
         self.setMinimumSize(950, 700)
 
         # Inicializar banco de dados
-        self.db = Database()
+        self.db = db if db is not None else Database()
 
         # Carregar dados
-        questions_data = load_questions()
+        if questions_data is None:
+            questions_data = load_compiled_questions()
         if not questions_data:
             sys.exit(1)
 
         self.question_manager = QuestionManager(questions_data)
-        self.history_manager = HistoryManager()
+        # Uma única instância de Database para todo o app: menu, histórico,
+        # acordeon, outbox e exportação compartilham conexões e caches
+        self.history_manager = (
+            history_manager if history_manager is not None else HistoryManager(self.db)
+        )
+
+        # Tarefas longas (PDF, email) rodam fora da thread da interface
+        self.jobs = JobManager(parent=self)
+
+        # PDFs já renderizados, ao lado do banco de histórico
+        self.pdf_cache = PDFCache(default_cache_dir(self.db.db_path))
+
+        # Fila persistente de emails, entregue em segundo plano
+        self.outbox_status_label = None
+        self.outbox_changed.connect(self._refresh_outbox_status)
+        self.outbox = OutboxWorker(
+            self.db,
+            lambda record: _render_pdf(record, self.pdf_cache),
+            on_change=self.outbox_changed.emit,
+        )
+        self.outbox.start()
+
+        # Modelo da lista do histórico (existe enquanto a tela está aberta)
+        self.history_model = None
+
+        # Tela de perguntas, criada no primeiro start_quiz e reaproveitada
+        self.quiz_view = None
 
         # Configurar UI
         self.setup_ui()
@@ -473,12 +696,17 @@ class ExpertSystemApp(QMainWindow):
 
     def clear_stack(self):
         """Remove todos os widgets do stack."""
+        self.outbox_status_label = None
+        self.history_model = None
         while self.stack.count():
             widget = self.stack.widget(0)
             self.stack.removeWidget(widget)
-            widget.deleteLater()
+            # A tela de perguntas é reaproveitada entre avaliações
+            if widget is not self.quiz_view:
+                widget.deleteLater()
 
-    def _create_header_label(self, text, font_size, text_color, object_name):
+    @staticmethod
+    def _create_header_label(text, font_size, text_color, object_name):
         """Cria um label para header com propriedades padrão."""
         label = QLabel(text)
         label.setStyleSheet(
@@ -616,6 +844,16 @@ class ExpertSystemApp(QMainWindow):
         super().resizeEvent(event)
         self.adjust_header_fonts()
 
+    def closeEvent(self, event):
+        """Cancela tarefas pendentes e fecha as conexões do banco ao sair."""
+        self.jobs.cancel_all()
+        self.jobs.wait(5000)
+        self.outbox.stop()
+        self.db.close()
+        if self.history_manager.db is not self.db:
+            self.history_manager.db.close()
+        super().closeEvent(event)
+
     def show_menu(self):
         """Exibe o menu principal."""
         self.clear_stack()
@@ -717,8 +955,11 @@ class ExpertSystemApp(QMainWindow):
 
         self.stack.addWidget(widget)
 
-    def show_history(self, page=0):
-        """Exibe o histórico de avaliações com paginação."""
+    def show_history(self):
+        """Exibe o histórico de avaliações em lista virtualizada."""
+        # Carregado só ao abrir o histórico, fora do caminho de inicialização
+        from history_view import HistoryModel, HistoryListView
+
         self.clear_stack()
 
         widget = QWidget()
@@ -730,10 +971,9 @@ class ExpertSystemApp(QMainWindow):
         header = self.create_header("Histórico de Avaliações", bg_color=SECONDARY_COLOR)
         main_layout.addWidget(header)
 
-        # Conteúdo
-        scroll = QScrollArea()
-        scroll.setWidgetResizable(True)
-        scroll.setStyleSheet(f"background-color: {PRIMARY_COLOR}; border: none;")
+        # Conteúdo: o modelo busca o banco em blocos conforme a rolagem
+        self.history_model = HistoryModel(self.history_manager, parent=widget)
+        total_records = self.history_model.total
 
         content_widget = QWidget()
         content_layout = QVBoxLayout()
@@ -741,12 +981,6 @@ class ExpertSystemApp(QMainWindow):
         content_layout.setSpacing(10)
         content_widget.setStyleSheet(f"background-color: {PRIMARY_COLOR};")
 
-        # Configuração de paginação
-        records_per_page = 8
-        all_records = self.history_manager.get_all()
-        total_records = len(all_records)
-        total_pages = (total_records + records_per_page - 1) // records_per_page
-
         if total_records == 0:
             empty_label = QLabel("Nenhuma avaliação realizada ainda.")
             empty_label.setStyleSheet(
@@ -758,33 +992,18 @@ class ExpertSystemApp(QMainWindow):
             )
             empty_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
             content_layout.addWidget(empty_label)
+            content_layout.addStretch()
         else:
-            # Validar página
-            page = max(0, min(page, total_pages - 1))
-
-            # Calcular índices
-            start_idx = page * records_per_page
-            end_idx = start_idx + records_per_page
-
-            # Pegar registros para a página atual
-            records_to_display = all_records[start_idx:end_idx]
-
-            for idx, record in enumerate(records_to_display, start=start_idx + 1):
-                card = HistoryCard(
-                    idx,
-                    record,
-                    self.show_history_details,
-                    self.delete_evaluation,
-                )
-                content_layout.addWidget(card)
+            content_layout.addLayout(self._create_history_search_bar())
+            history_list = HistoryListView(self.history_model)
+            history_list.view_requested.connect(self.show_history_details)
+            history_list.delete_requested.connect(self.delete_evaluation)
+            content_layout.addWidget(history_list)
 
-        content_layout.addStretch()
         content_widget.setLayout(content_layout)
-        scroll.setWidget(content_widget)
+        main_layout.addWidget(content_widget, 1)
 
-        main_layout.addWidget(scroll)
-
-        # Barra de controles com paginação
+        # Barra de controles
         controls = QHBoxLayout()
         controls.setContentsMargins(20, 20, 20, 20)
         controls.setSpacing(12)
@@ -797,7 +1016,7 @@ class ExpertSystemApp(QMainWindow):
         controls.addWidget(back_btn, 0, Qt.AlignmentFlag.AlignLeft)
 
         # Botão limpar órfãs (se existirem)
-        orphan_count = len(self.db.get_orphan_avaliacoes())
+        orphan_count = self.db.count_orphan_avaliacoes()
         if orphan_count > 0:
             clean_btn = ModernButton(f"Limpar Órfãs ({orphan_count})", WARNING_COLOR)
             clean_btn.setMaximumWidth(220)
@@ -805,21 +1024,30 @@ class ExpertSystemApp(QMainWindow):
             clean_btn.clicked.connect(self.delete_orphans)
             controls.addWidget(clean_btn, 0, Qt.AlignmentFlag.AlignLeft)
 
+        # Exportação de prontuários em lote
+        if total_records > 0:
+            export_btn = ModernButton("Exportar em Lote", SUCCESS_COLOR)
+            export_btn.setMaximumWidth(220)
+            export_btn.setMinimumHeight(44)
+            export_btn.clicked.connect(self.show_batch_export_dialog)
+            controls.addWidget(export_btn, 0, Qt.AlignmentFlag.AlignLeft)
+
+        # Status da fila de emails (atualizado pelo OutboxWorker)
+        self.outbox_status_label = QLabel()
+        self.outbox_status_label.setStyleSheet(
+            f"color: {DARK_TEXT}; font-size: 12px; font-family: 'Poppins'; padding: 0px 8px;"
+        )
+        self.outbox_status_label.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.outbox_status_label.mousePressEvent = lambda e: self.show_outbox_dialog()
+        controls.addWidget(self.outbox_status_label, 0, Qt.AlignmentFlag.AlignLeft)
+        self._refresh_outbox_status()
+
         controls.addStretch(1)
 
-        # Paginação
+        # Total de avaliações (atualizado ao excluir)
         if total_records > 0:
-            # Botão página anterior
-            if page > 0:
-                prev_btn = ModernButton("← Anterior", ACCENT_COLOR)
-                prev_btn.setMaximumWidth(160)
-                prev_btn.setMinimumHeight(40)
-                prev_btn.clicked.connect(lambda: self.show_history(page - 1))
-                controls.addWidget(prev_btn)
-
-            # Texto de página
-            page_info = QLabel(f"Página {page + 1} de {total_pages}")
-            page_info.setStyleSheet(
+            count_label = QLabel()
+            count_label.setStyleSheet(
                 f"""
                 color: {DARK_TEXT};
                 font-size: 13px;
@@ -828,17 +1056,28 @@ class ExpertSystemApp(QMainWindow):
                 padding: 0px 16px;
             """
             )
-            page_info.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            page_info.setMinimumWidth(150)
-            controls.addWidget(page_info)
-
-            # Botão próxima página
-            if page < total_pages - 1:
-                next_btn = ModernButton("Próxima →", ACCENT_COLOR)
-                next_btn.setMaximumWidth(160)
-                next_btn.setMinimumHeight(40)
-                next_btn.clicked.connect(lambda: self.show_history(page + 1))
-                controls.addWidget(next_btn)
+            count_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            count_label.setMinimumWidth(150)
+
+            def atualizar_total(*_):
+                model = self.history_model
+                if model is None:
+                    return
+                if model.total is not None:
+                    count_label.setText(f"{model.total} avaliação(ões)")
+                else:
+                    # Busca: total conhecido só depois de carregar tudo
+                    mais = "" if model.is_complete() else "+"
+                    count_label.setText(f"{model.rowCount()}{mais} resultado(s)")
+
+            atualizar_total()
+            for sinal in (
+                self.history_model.rowsRemoved,
+                self.history_model.rowsInserted,
+                self.history_model.modelReset,
+            ):
+                sinal.connect(atualizar_total)
+            controls.addWidget(count_label)
 
         controls.addStretch(1)
         main_layout.addLayout(controls)
@@ -846,6 +1085,224 @@ class ExpertSystemApp(QMainWindow):
         widget.setLayout(main_layout)
         self.stack.addWidget(widget)
 
+    def _create_history_search_bar(self):
+        """Barra de busca por nome e filtros do histórico (resultados ao digitar)."""
+        bar = QHBoxLayout()
+        bar.setSpacing(8)
+        field_style = f"""
+            color: {DARK_TEXT};
+            background-color: {WHITE};
+            border: 1px solid {BORDER_COLOR};
+            border-radius: 6px;
+            padding: 6px 8px;
+            font-size: 13px;
+            font-family: 'Poppins';
+        """
+
+        search_input = QLineEdit()
+        search_input.setPlaceholderText("Buscar paciente...")
+        search_input.setClearButtonEnabled(True)
+        search_input.setStyleSheet(field_style)
+        bar.addWidget(search_input, 1)
+
+        level_combo = QComboBox()
+        level_combo.addItem("Todos os níveis", None)
+        for range_config in SCORE_RANGES:
+            level_combo.addItem(range_config["level"], range_config["level"])
+        level_combo.setStyleSheet(field_style)
+        bar.addWidget(level_combo)
+
+        # Pontuação: o menor valor do spinbox significa "sem limite"
+        score_min = QSpinBox()
+        score_max = QSpinBox()
+        for spin, texto in ((score_min, "Pts mín."), (score_max, "Pts máx.")):
+            spin.setRange(-1, 999)
+            spin.setValue(-1)
+            spin.setSpecialValueText(texto)
+            spin.setStyleSheet(field_style)
+            bar.addWidget(spin)
+
+        period_check = QCheckBox("Período")
+        period_check.setStyleSheet(f"color: {DARK_TEXT}; font-size: 13px; font-family: 'Poppins';")
+        bar.addWidget(period_check)
+        start_edit = QDateEdit(QDate.currentDate().addMonths(-6))
+        end_edit = QDateEdit(QDate.currentDate())
+        for date_edit in (start_edit, end_edit):
+            date_edit.setCalendarPopup(True)
+            date_edit.setDisplayFormat("dd/MM/yyyy")
+            date_edit.setEnabled(False)
+            date_edit.setStyleSheet(field_style)
+            period_check.toggled.connect(date_edit.setEnabled)
+            bar.addWidget(date_edit)
+
+        def aplicar():
+            model = self.history_model
+            if model is None:
+                return
+            periodo = period_check.isChecked()
+            model.set_filters(
+                {
+                    "texto": search_input.text().strip(),
+                    "nivel_risco": level_combo.currentData(),
+                    "pontuacao_min": score_min.value() if score_min.value() >= 0 else None,
+                    "pontuacao_max": score_max.value() if score_max.value() >= 0 else None,
+                    "data_inicio": start_edit.date().toPyDate() if periodo else None,
+                    "data_fim": end_edit.date().toPyDate() if periodo else None,
+                }
+            )
+
+        # Debounce: uma consulta quando a digitação dá uma pausa
+        debounce = QTimer(search_input)
+        debounce.setSingleShot(True)
+        debounce.setInterval(SEARCH_DEBOUNCE_MS)
+        debounce.timeout.connect(aplicar)
+        search_input.textChanged.connect(debounce.start)
+        level_combo.currentIndexChanged.connect(debounce.start)
+        score_min.valueChanged.connect(debounce.start)
+        score_max.valueChanged.connect(debounce.start)
+        period_check.toggled.connect(debounce.start)
+        start_edit.dateChanged.connect(debounce.start)
+        end_edit.dateChanged.connect(debounce.start)
+        search_input.returnPressed.connect(aplicar)
+        return bar
+
+    def show_batch_export_dialog(self):
+        """Diálogo de filtros para exportar vários prontuários de uma vez."""
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Exportar Prontuários em Lote")
+        dialog.setModal(True)
+
+        layout = QVBoxLayout()
+        layout.setSpacing(12)
+        layout.setContentsMargins(24, 24, 24, 24)
+        label_style = f"color: {PRIMARY_COLOR}; font-size: 14px; font-weight: 600; font-family: 'Poppins';"
+
+        level_label = QLabel("Nível de risco:")
+        level_label.setStyleSheet(label_style)
+        layout.addWidget(level_label)
+        level_combo = QComboBox()
+        level_combo.addItem("Todos", None)
+        for range_config in SCORE_RANGES:
+            level_combo.addItem(range_config["level"], range_config["level"])
+        layout.addWidget(level_combo)
+
+        period_check = QCheckBox("Filtrar por período")
+        period_check.setStyleSheet(label_style)
+        layout.addWidget(period_check)
+        dates_layout = QHBoxLayout()
+        start_edit = QDateEdit(QDate.currentDate().addMonths(-6))
+        end_edit = QDateEdit(QDate.currentDate())
+        for date_edit in (start_edit, end_edit):
+            date_edit.setCalendarPopup(True)
+            date_edit.setDisplayFormat("dd/MM/yyyy")
+            date_edit.setEnabled(False)
+            period_check.toggled.connect(date_edit.setEnabled)
+        dates_layout.addWidget(start_edit)
+        dates_layout.addWidget(QLabel("até"))
+        dates_layout.addWidget(end_edit)
+        layout.addLayout(dates_layout)
+
+        format_label = QLabel("Destino:")
+        format_label.setStyleSheet(label_style)
+        layout.addWidget(format_label)
+        format_combo = QComboBox()
+        format_combo.addItem("Um arquivo ZIP", "zip")
+        format_combo.addItem("Uma pasta", "dir")
+        layout.addWidget(format_combo)
+
+        layout.addSpacing(8)
+        btn_layout = QHBoxLayout()
+        btn_layout.setSpacing(12)
+        cancel_btn = ModernButton("Cancelar", BORDER_COLOR)
+        cancel_btn.clicked.connect(dialog.reject)
+        btn_layout.addWidget(cancel_btn)
+        export_btn = ModernButton("Exportar", SUCCESS_COLOR)
+        export_btn.clicked.connect(dialog.accept)
+        btn_layout.addWidget(export_btn)
+        layout.addLayout(btn_layout)
+        dialog.setLayout(layout)
+
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+
+        if format_combo.currentData() == "zip":
+            destino, _ = QFileDialog.getSaveFileName(
+                self,
+                "Salvar Prontuários",
+                f"prontuarios_{datetime.now():%Y%m%d}.zip",
+                "ZIP Files (*.zip)",
+            )
+            if destino and not destino.lower().endswith(".zip"):
+                destino += ".zip"
+        else:
+            destino = QFileDialog.getExistingDirectory(self, "Pasta de Destino")
+        if not destino:
+            return
+
+        filtros = {"nivel_risco": level_combo.currentData()}
+        if period_check.isChecked():
+            filtros["data_inicio"] = start_edit.date().toPyDate()
+            filtros["data_fim"] = end_edit.date().toPyDate()
+
+        def on_success(resultado):
+            QMessageBox.information(
+                self,
+                "Exportação concluída",
+                f"{resultado['gerados']} de {resultado['total']} prontuário(s) gerado(s).\n\n{resultado['destino']}",
+            )
+
+        self.run_job(
+            "Exportando prontuários",
+            _batch_export_job,
+            destino,
+            self.db,
+            filtros,
+            on_success=on_success,
+        )
+
+    def _refresh_outbox_status(self):
+        """Atualiza o resumo da fila de emails na tela de histórico."""
+        if self.outbox_status_label is None:
+            return
+        counts = self.db.get_outbox_counts()
+        partes = [
+            f"{counts[status]} {STATUS_LABELS[status].lower()}"
+            for status in ("pendente", "enviando", "falhou")
+            if counts.get(status)
+        ]
+        self.outbox_status_label.setText(
+            "✉ " + " · ".join(partes) if partes else ""
+        )
+        self.outbox_status_label.setVisible(bool(partes))
+
+    def show_outbox_dialog(self):
+        """Lista os envios recentes da fila de emails."""
+        entries = self.db.get_outbox(limit=30)
+        linhas = []
+        for entry in entries:
+            linha = (
+                f"{STATUS_LABELS.get(entry['status'], entry['status'])}: "
+                f"{entry['nome_paciente'] or entry['nome_destinatario']} → {entry['destinatario']}"
+            )
+            if entry["status"] != "enviado" and entry["ultimo_erro"]:
+                linha += f"\n    {entry['ultimo_erro']} (tentativas: {entry['tentativas']})"
+            linhas.append(linha)
+
+        box = QMessageBox(self)
+        box.setWindowTitle("Fila de Emails")
+        box.setText("\n".join(linhas) or "Nenhum email na fila.")
+        retry_btn = None
+        if self.db.get_outbox_counts().get("falhou"):
+            retry_btn = box.addButton(
+                "Reenviar falhas", QMessageBox.ButtonRole.ActionRole
+            )
+        box.addButton(QMessageBox.StandardButton.Close)
+        box.exec()
+        if retry_btn is not None and box.clickedButton() is retry_btn:
+            self.db.retry_failed_outbox()
+            self.outbox.wake()
+            self._refresh_outbox_status()
+
     def delete_evaluation(self, avaliacao_id):
         """Exclui uma avaliação específica após confirmação."""
         if avaliacao_id is None:
@@ -858,7 +1315,12 @@ class ExpertSystemApp(QMainWindow):
         )
         if reply == QMessageBox.StandardButton.Yes:
             self.db.delete_avaliacao(avaliacao_id)
-            self.show_history()  # atualizar lista
+            self.pdf_cache.invalidate(avaliacao_id)
+            # Remove só a linha, mantendo a posição da rolagem
+            if self.history_model is None or not self.history_model.remove_id(
+                avaliacao_id
+            ):
+                self.show_history()
 
     def delete_orphans(self):
         """Exclui todas as avaliações órfãs (sem respostas)."""
@@ -877,6 +1339,7 @@ class ExpertSystemApp(QMainWindow):
         if reply == QMessageBox.StandardButton.Yes:
             for av in orphans:
                 self.db.delete_avaliacao(av["id"])
+                self.pdf_cache.invalidate(av["id"])
             self.show_history()
 
     def start_quiz(self):
@@ -890,176 +1353,27 @@ class ExpertSystemApp(QMainWindow):
             self.ask_patient_name()
             return
 
-        self.clear_stack()
-
-        question = self.question_manager.get_current_question()
-        eixo = self.question_manager.get_current_eixo()
-        current_number = self.question_manager.get_current_question_number()
-        progress_pct = (current_number / self.question_manager.total_questions) * 100
-
-        eixo_color = EIXO_COLORS.get(eixo["nome"], SECONDARY_COLOR)
-
-        widget = QWidget()
-        main_layout = QVBoxLayout()
-        main_layout.setSpacing(0)
-        main_layout.setContentsMargins(0, 0, 0, 0)
-
-        # Header
-        header = self.create_header(eixo["nome"], bg_color=eixo_color)
-        main_layout.addWidget(header)
-
-        # Progress bar
-        progress_frame = QFrame()
-        progress_frame.setStyleSheet(f"background-color: {LIGHT_BG}; padding: 10px;")
-        progress_layout = QVBoxLayout()
-
-        # Barra de progresso responsiva (QProgressBar)
-        progress_bar = QProgressBar()
-        progress_bar.setRange(0, 100)
-        progress_bar.setValue(int(progress_pct))
-        progress_bar.setTextVisible(False)
-        progress_bar.setStyleSheet(
-            f"""
-            QProgressBar {{
-                background-color: {BORDER_COLOR};
-                border: none;
-                border-radius: 4px;
-                height: 8px;
-            }}
-            QProgressBar::chunk {{
-                background-color: {eixo_color};
-                border-radius: 4px;
-            }}
-        """
-        )
-
-        progress_layout.addWidget(progress_bar)
-
-        # Texto de progresso
-        progress_text = QLabel(
-            f"Pergunta {current_number} de {self.question_manager.total_questions}  •  {int(progress_pct)}% Concluído"
-        )
-        progress_text.setStyleSheet(
-            f"""
-            color: {DARK_TEXT};
-            font-size: 13px;
-            font-weight: 600;
-            font-family: 'Poppins', sans-serif;
-            margin-top: 8px;
-        """
-        )
-        progress_text.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        progress_layout.addWidget(progress_text)
-
-        progress_frame.setLayout(progress_layout)
-        main_layout.addWidget(progress_frame)
-
-        # Conteúdo
-        content = QWidget()
-        content_layout = QVBoxLayout()
-        content_layout.setContentsMargins(20, 20, 20, 20)
-        content_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-
-        # Calcular altura responsiva baseada no tamanho disponível
-        available_height = (
-            self.height() - 300
-        )  # Subtrair header, progress, botão cancelar
-        available_height = max(available_height, 300)  # Mínimo de 300px
-
-        # Box centralizada para pergunta e respostas (com altura responsiva)
-        box = QFrame()
-        box.setStyleSheet(
-            f"""
-            QFrame {{
-                background-color: {LIGHT_BG};
-                border-radius: 16px;
-                padding: 30px 40px;
-            }}
-        """
+        if self.quiz_view is None:
+            self.quiz_view = QuizView(self.answer, self.confirm_cancel)
+        if self.stack.currentWidget() is not self.quiz_view:
+            self.clear_stack()
+            self.stack.addWidget(self.quiz_view)
+            self.stack.setCurrentWidget(self.quiz_view)
+            self.adjust_header_fonts()
+
+        # Altura útil: descontar header, progresso e botão cancelar
+        available_height = max(self.height() - 300, 300)
+        self.quiz_view.show_question(
+            self.question_manager.get_current_question(),
+            self.question_manager.get_current_eixo(),
+            self.question_manager.get_current_question_number(),
+            self.question_manager.total_questions,
+            available_height,
         )
-        box.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
-        box.setMinimumHeight(int(available_height * 0.4))
-        box.setMaximumHeight(int(available_height * 0.6))
-
-        box_layout = QVBoxLayout()
-        box_layout.setSpacing(20)
-        box_layout.setContentsMargins(0, 0, 0, 0)
-        box_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
-
-        # Card da pergunta com espaço expansível
-        question_label = QLabel(question["texto"])
-        question_label.setStyleSheet(
-            f"""
-            color: {DARK_TEXT};
-            font-size: 18px;
-            font-weight: 600;
-            line-height: 1.5;
-            font-family: 'Poppins', sans-serif;
-            padding: 15px;
-            background-color: white;
-            """
-        )
-        question_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        question_label.setWordWrap(True)
-        question_label.setSizePolicy(
-            QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding
-        )
-        box_layout.addWidget(question_label)
-
-        # Botões de resposta (ambos com mesma cor para não induzir resposta)
-        btn_layout = QHBoxLayout()
-        btn_layout.setSpacing(12)
-        btn_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-
-        # Tamanho responsivo dos botões baseado na altura disponível
-        btn_width = max(100, int(available_height * 0.15))
-        btn_height = max(40, int(available_height * 0.12))
-
-        yes_btn = ModernButton("Sim", SECONDARY_COLOR)
-        yes_btn.setMinimumWidth(btn_width)
-        yes_btn.setMinimumHeight(btn_height)
-        yes_btn.clicked.connect(lambda: self.answer(True))
-        btn_layout.addWidget(yes_btn)
-
-        no_btn = ModernButton("Não", SECONDARY_COLOR)
-        no_btn.setMinimumWidth(btn_width)
-        no_btn.setMinimumHeight(btn_height)
-        no_btn.clicked.connect(lambda: self.answer(False))
-        btn_layout.addWidget(no_btn)
-
-        box_layout.addLayout(btn_layout)
-        box.setLayout(box_layout)
-
-        # Adicionar sombra ao box
-        shadow = QGraphicsDropShadowEffect(box)
-        shadow.setBlurRadius(16)
-        shadow.setOffset(0, 4)
-        shadow.setColor(QColor(0, 0, 0, 25))
-        box.setGraphicsEffect(shadow)
-
-        # Centralizar a box
-        box_container = QHBoxLayout()
-        box_container.addStretch()
-        box_container.addWidget(box, 0, Qt.AlignmentFlag.AlignCenter)
-        box_container.addStretch()
-
-        content_layout.addLayout(box_container)
-        content_layout.addStretch()
-
-        # Botão cancelar
-        cancel_btn = ModernButton("Cancelar Avaliação", DANGER_COLOR)
-        cancel_btn.setMaximumHeight(60)
-        cancel_btn.clicked.connect(self.confirm_cancel)
-        content_layout.addWidget(cancel_btn)
-
-        content.setLayout(content_layout)
-        main_layout.addWidget(content)
-
-        widget.setLayout(main_layout)
-        self.stack.addWidget(widget)
 
     def answer(self, response):
         """Processa uma resposta."""
+        self.quiz_view.mark_answer()
         response_str = "sim" if response else "nao"
         has_more = self.question_manager.answer_question(response_str)
 
@@ -1292,6 +1606,11 @@ class ExpertSystemApp(QMainWindow):
         accordion_widget = AccordionWidget(
             self.db, eixos_nomes, avaliacao_id=avaliacao_id
         )
+        accordion_widget.score_changed.connect(
+            lambda pontuacao, nivel: self._on_result_rescored(
+                pontuacao, nivel, level_label, score_label
+            )
+        )
         content_layout.addWidget(accordion_widget)
 
         # Card aviso
@@ -1364,41 +1683,90 @@ class ExpertSystemApp(QMainWindow):
 
         # Já salvo acima com transação; nada adicional aqui
 
+    def run_job(self, title, fn, *args, on_success=None):
+        """
+        Executa fn(job, *args) em segundo plano com um diálogo de progresso.
+
+        Args:
+            title: Título do diálogo de progresso
+            fn: Função da tarefa (ver jobs.Job)
+            on_success: Chamado com o retorno da tarefa, na thread da GUI
+
+        Returns:
+            O Job criado
+        """
+        progress = QProgressDialog(title, "Cancelar", 0, 100, self)
+        progress.setWindowTitle(title)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(300)
+        progress.setAutoClose(False)
+        progress.setAutoReset(False)
+        progress.setValue(0)
+
+        def on_progress(percent, message):
+            progress.setValue(percent)
+            if message:
+                progress.setLabelText(message)
+
+        def on_finished(result):
+            progress.close()
+            if on_success:
+                on_success(result)
+
+        def on_failed(message, details):
+            progress.close()
+            QMessageBox.critical(self, "Erro", f"{title}:\n{message}")
+
+        job = self.jobs.submit(
+            fn,
+            *args,
+            on_finished=on_finished,
+            on_failed=on_failed,
+            on_progress=on_progress,
+            on_cancelled=progress.close,
+        )
+        progress.canceled.connect(job.cancel)
+        return job
+
     def export_to_pdf(self, record):
         """Exporta o prontuário do paciente para PDF."""
-        try:
-            pdf_gen = PDFGenerator()
-
-            # Abrir diálogo para escolher local de salvamento
-            default_filename = f"prontuario_{record.get('patient_name', 'paciente').replace(' ', '_')}.pdf"
-            file_path, _ = QFileDialog.getSaveFileName(
-                self,
-                "Salvar Prontuário",
-                default_filename,
-                "PDF Files (*.pdf);;All Files (*)",
-            )
+        # Abrir diálogo para escolher local de salvamento
+        default_filename = f"prontuario_{record.get('patient_name', 'paciente').replace(' ', '_')}.pdf"
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Salvar Prontuário",
+            default_filename,
+            "PDF Files (*.pdf);;All Files (*)",
+        )
 
-            if file_path:
-                pdf_gen.generate_prontuario(record, file_path)
-                QMessageBox.information(
+        if file_path:
+            self.run_job(
+                "Gerando PDF",
+                _export_pdf_job,
+                record,
+                file_path,
+                self.pdf_cache,
+                on_success=lambda path: QMessageBox.information(
                     self,
                     "Sucesso",
-                    f"Prontuário salvo com sucesso!\n\n{file_path}",
-                )
-        except Exception as e:
-            QMessageBox.critical(
-                self,
-                "Erro",
-                f"Erro ao gerar PDF:\n{str(e)}",
+                    f"Prontuário salvo com sucesso!\n\n{path}",
+                ),
             )
 
     def send_via_email(self, record):
         """Abre diálogo para enviar prontuário por email."""
+        # Sem credenciais o envio falharia na fila; avisar antes de enfileirar
+        problemas = get_email_config().problems()
+        if problemas:
+            QMessageBox.warning(
+                self,
+                "Email não configurado",
+                "Não é possível enviar emails:\n\n"
+                + "\n".join(problemas)
+                + "\n\nConfigure o arquivo .env (veja .env.example).",
+            )
+            return
         try:
-            from email_sender import EmailSender
-            import tempfile
-            from pdf_generator import PDFGenerator
-
             # Dialog para entrar email
             dialog = QDialog(self)
             dialog.setWindowTitle("Enviar Prontuário por Email")
@@ -1504,42 +1872,19 @@ class ExpertSystemApp(QMainWindow):
                     QMessageBox.warning(self, "Erro", "Email inválido!")
                     return
 
-                try:
-                    # Gerar PDF em arquivo temporário
-                    pdf_gen = PDFGenerator()
-                    with tempfile.NamedTemporaryFile(
-                        suffix=".pdf", delete=False
-                    ) as tmp_file:
-                        pdf_path = tmp_file.name
-
-                    pdf_gen.generate_prontuario(record, pdf_path)
-
-                    # Enviar email
-                    sender = EmailSender()
-                    success, message = sender.send_prontuario(
-                        recipient_email,
-                        record.get("patient_name", "Paciente"),
-                        pdf_path,
-                    )
-
-                    if success:
-                        QMessageBox.information(self, "Sucesso", message)
-                    else:
-                        QMessageBox.critical(self, "Erro", message)
-
-                    # Limpar arquivo temporário
-                    import os
-
-                    try:
-                        os.unlink(pdf_path)
-                    except:
-                        pass
-
-                except Exception as e:
-                    import traceback
-
-                    error_msg = f"{str(e)}\n\n{traceback.format_exc()}"
-                    QMessageBox.critical(self, "Erro ao enviar email", error_msg)
+                # Só enfileira: o OutboxWorker gera o PDF e entrega
+                self.db.enqueue_email(
+                    record["id"],
+                    recipient_email,
+                    record.get("patient_name", "Paciente"),
+                )
+                self.outbox.wake()
+                QMessageBox.information(
+                    self,
+                    "Email na fila",
+                    f"O prontuário será enviado para {recipient_email} em segundo plano.\n"
+                    "Acompanhe o status na tela de histórico.",
+                )
 
         except Exception as e:
             QMessageBox.critical(
@@ -1548,9 +1893,9 @@ class ExpertSystemApp(QMainWindow):
                 f"Erro ao enviar email:\n{str(e)}",
             )
 
-    def show_history_details(self, index):
+    def show_history_details(self, avaliacao_id):
         """Exibe detalhes da avaliação selecionada com renderização otimizada."""
-        record = self.history_manager.get_assessment(index)
+        record = self.history_manager.get_assessment(avaliacao_id)
         if not record:
             self.show_history()
             return
@@ -1743,6 +2088,11 @@ class ExpertSystemApp(QMainWindow):
                 accordion_widget = AccordionWidget(
                     self.db, eixos_nomes, avaliacao_id=record.get("id")
                 )
+                accordion_widget.score_changed.connect(
+                    lambda pontuacao, nivel: self._on_record_rescored(
+                        record, pontuacao, nivel, title, score_label
+                    )
+                )
                 rl.addWidget(accordion_widget)
             else:
                 responses_list = ResponsesListWidget(record["responses"])
@@ -1799,21 +2149,256 @@ class ExpertSystemApp(QMainWindow):
         widget.setLayout(main_layout)
         self.stack.addWidget(widget)
 
+    def _on_result_rescored(self, pontuacao, nivel, level_label, score_label):
+        """Atualiza o cartão de resultado após uma resposta ser editada."""
+        level_label.setText(
+            f"{LEVEL_ICONS.get(nivel, '●')}  NÍVEL DE RISCO: {nivel.upper()}"
+        )
+        score_label.setText(f"Pontuação Total: {pontuacao} pontos")
+
+    def _on_record_rescored(self, record, pontuacao, nivel, title, score_label):
+        """Atualiza a tela de detalhes após uma resposta ser editada."""
+        title.setText(f"{LEVEL_ICONS.get(nivel, '●')}  Nível de Risco: {nivel}")
+        score_label.setText(f"Pontuação: {pontuacao} pontos")
+        # Manter PDF/email coerentes com as respostas editadas
+        self.pdf_cache.invalidate(record["id"])
+        atualizado = self.history_manager.get_assessment(record["id"])
+        if atualizado:
+            record.update(atualizado)
+
+
+def export_main(argv=None):
+    """
+    Exportação em lote pela linha de comando (sem abrir a janela).
+
+    Exemplo:
+        python main.py export prontuarios.zip --nivel Alto --de 2025-01-01
+    """
+    from batch_export import export_batch
+
+    parser = argparse.ArgumentParser(
+        prog="main.py export", description="Exporta prontuários em lote"
+    )
+    parser.add_argument("destino", help="Pasta de saída ou arquivo .zip")
+    parser.add_argument("--de", dest="data_inicio", type=_parse_date)
+    parser.add_argument("--ate", dest="data_fim", type=_parse_date)
+    parser.add_argument(
+        "--nivel",
+        dest="nivel_risco",
+        choices=[range_config["level"] for range_config in SCORE_RANGES],
+    )
+    parser.add_argument("--db", dest="db_path", default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    def progress(feitos, total):
+        print(f"\r{feitos}/{total}", end="", flush=True)
+
+    resultado = export_batch(progress=progress, **vars(args))
+    print(f"\n{resultado['gerados']} prontuário(s) em {resultado['destino']}")
+    return 0
+
+
+def _parse_date(valor):
+    """Converte AAAA-MM-DD para date (argparse)."""
+    return datetime.strptime(valor, "%Y-%m-%d").date()
+
+
+# Módulos que não devem ser carregados antes da janela ficar interativa
+HEAVY_MODULES = ("reportlab", "smtplib", "email.mime", "dotenv", "numpy", "tempfile")
+
+# Espera após a abertura antes de pré-importar os módulos adiados
+WARM_UP_DELAY_MS = 500
+
+
+class StartupSplash(QLabel):
+    """
+    Splash da abertura, desenhado em código (nenhum arquivo de imagem no
+    executável).
+
+    QLabel sem moldura em vez de QSplashScreen: o show() do QSplashScreen
+    bloqueia até a janela ser exposta (até 1 s sem display).
+    """
+
+    WIDTH = 520
+    HEIGHT = 240
+
+    def __init__(self):
+        super().__init__(
+            None, Qt.WindowType.SplashScreen | Qt.WindowType.FramelessWindowHint
+        )
+        self._base = self._paint_base()
+        self.setPixmap(self._base)
+        self.setFixedSize(self.WIDTH, self.HEIGHT)
+        screen = QApplication.primaryScreen()
+        if screen is not None:
+            self.move(screen.availableGeometry().center() - self.rect().center())
+
+    def _paint_base(self):
+        pixmap = QPixmap(self.WIDTH, self.HEIGHT)
+        pixmap.fill(QColor(WHITE))
+        painter = QPainter(pixmap)
+        painter.fillRect(0, 0, self.WIDTH, 8, QColor(SECONDARY_COLOR))
+        painter.setPen(QColor(DARK_TEXT))
+        painter.setFont(QFont(FONT_FAMILY_TITLE, 20, QFont.Weight.Bold))
+        painter.drawText(
+            pixmap.rect().adjusted(0, 0, 0, -60),
+            Qt.AlignmentFlag.AlignCenter,
+            "Sistema de Avaliação de Risco",
+        )
+        painter.setPen(QColor(SECONDARY_TEXT))
+        painter.setFont(QFont(FONT_FAMILY_BODY, 11))
+        painter.drawText(
+            pixmap.rect().adjusted(0, 40, 0, -20),
+            Qt.AlignmentFlag.AlignCenter,
+            "Transtornos Alimentares - Critérios DSM-5",
+        )
+        painter.end()
+        return pixmap
+
+    def show_message(self, mensagem):
+        """Mostra a etapa atual no rodapé do splash."""
+        pixmap = QPixmap(self._base)
+        painter = QPainter(pixmap)
+        painter.setPen(QColor(SECONDARY_TEXT))
+        painter.setFont(QFont(FONT_FAMILY_BODY, 10))
+        painter.drawText(
+            pixmap.rect().adjusted(0, 0, 0, -16),
+            Qt.AlignmentFlag.AlignBottom | Qt.AlignmentFlag.AlignHCenter,
+            mensagem,
+        )
+        painter.end()
+        self.setPixmap(pixmap)
+
+
+def _load_app_data(job):
+    """Tarefa: etapas pesadas da abertura, enquanto o splash é exibido."""
+    job.report(10, "Abrindo banco de dados...")
+    db = Database()  # Aplica migrações pendentes
+    job.report(50, "Carregando perguntas...")
+    questions_data = load_compiled_questions()
+    job.report(80, "Carregando histórico...")
+    history_manager = HistoryManager(db)
+    return db, questions_data, history_manager
+
+
+def _warm_up_modules(job):
+    """Tarefa: pré-importa o que foi adiado (primeiro PDF sem espera)."""
+    import pdf_generator  # noqa: F401 (ReportLab)
+    import history_view  # noqa: F401
+    import email_sender  # noqa: F401
+
+
+def _startup_report(marcos, sair=False):
+    """
+    Relata quanto tempo cada etapa da abertura levou.
+
+    Ativado por APP_STARTUP_REPORT=1 (ou =exit para fechar logo em seguida,
+    usado por 'benchmark.py inicio'). Os tempos são em ms desde o início da
+    importação de main.py. Vai para stderr, ou para o arquivo em
+    APP_STARTUP_REPORT_FILE (o executável sem console não tem stderr).
+
+    Args:
+        marcos: Lista de (etapa, time.perf_counter())
+        sair: Encerra o app após o relatório
+    """
+    linhas = ["Inicialização (ms desde a importação de main.py):"]
+    anterior = _T_INICIO
+    for etapa, instante in marcos:
+        linhas.append(
+            f"  {etapa:<18}{(instante - _T_INICIO) * 1000:8.1f}"
+            f"  (+{(instante - anterior) * 1000:.1f})"
+        )
+        anterior = instante
+    pesados = [nome for nome in HEAVY_MODULES if nome in sys.modules]
+    linhas.append(f"  módulos pesados: {', '.join(pesados) or 'nenhum'}")
+    texto = "\n".join(linhas) + "\n"
+
+    destino = os.environ.get("APP_STARTUP_REPORT_FILE")
+    if destino:
+        # Escrita atômica: o benchmark espera o arquivo aparecer
+        with open(destino + ".tmp", "w", encoding="utf-8") as f:
+            f.write(texto)
+        os.replace(destino + ".tmp", destino)
+    elif sys.stderr is not None:
+        sys.stderr.write(texto)
+        sys.stderr.flush()
+    if sair:
+        QApplication.quit()
+
 
 def main():
-    """Função principal."""
+    """
+    Função principal.
+
+    A abertura é feita em etapas para algo aparecer na tela o quanto antes:
+    splash imediatamente após o QApplication; banco (migrações), perguntas e
+    histórico em segundo plano; a janela só é montada com os dados prontos.
+    Os módulos adiados (ReportLab, email) são pré-importados depois que a
+    janela fica interativa.
+    """
+    if len(sys.argv) > 1 and sys.argv[1] == "export":
+        sys.exit(export_main(sys.argv[2:]))
+
+    relatorio = os.environ.get("APP_STARTUP_REPORT")
+    marcos = [("imports", time.perf_counter())]
+
     app = QApplication(sys.argv)
 
     # Configurar fonte padrão (maior para legibilidade)
     font = QFont("Poppins", 13)
     app.setFont(font)
+    marcos.append(("QApplication", time.perf_counter()))
+
+    splash = StartupSplash()
+    splash.show()
+    app.processEvents()
+    marcos.append(("splash", time.perf_counter()))
 
-    # Criar e mostrar janela
-    window = ExpertSystemApp()
-    window.show()
+    jobs = JobManager(max_threads=1, parent=app)
+    estado = {}
+
+    def dados_prontos(dados):
+        marcos.append(("dados prontos", time.perf_counter()))
+        db, questions_data, history_manager = dados
+        if not questions_data:
+            splash.close()
+            app.exit(1)
+            return
+
+        # Criar e mostrar janela
+        window = estado["window"] = ExpertSystemApp(db, questions_data, history_manager)
+        window.show()
+        splash.close()
+        marcos.append(("janela criada", time.perf_counter()))
+        # Roda após o primeiro ciclo do event loop, já com a janela pintada
+        QTimer.singleShot(0, interativa)
+
+    def interativa():
+        marcos.append(("interativo", time.perf_counter()))
+        if relatorio:
+            _startup_report(marcos, sair=relatorio == "exit")
+        if relatorio != "exit":
+            QTimer.singleShot(WARM_UP_DELAY_MS, lambda: jobs.submit(_warm_up_modules))
+
+    def falhou(mensagem, _traceback):
+        splash.close()
+        QMessageBox.critical(None, "Erro ao iniciar", mensagem)
+        app.exit(1)
+
+    jobs.submit(
+        _load_app_data,
+        on_finished=dados_prontos,
+        on_failed=falhou,
+        on_progress=lambda _percent, mensagem: splash.show_message(mensagem),
+    )
 
     sys.exit(app.exec())
 
 
 if __name__ == "__main__":
+    import multiprocessing
+
+    # Necessário para o ProcessPoolExecutor no executável congelado
+    multiprocessing.freeze_support()
     main()
@@ -25,7 +25,8 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Interface Tk antiga (ui_components_windows.py) não entra no executável
+    excludes=['tkinter'],
     noarchive=False,
     optimize=2,
 )
@@ -41,7 +42,9 @@ exe = EXE(
     debug=False,
     bootloader_ignore_signals=False,
     strip=False,
-    upx=True,
+    # Sem UPX: as DLLs do Qt comprimidas seriam descompactadas a cada
+    # abertura (e costumam disparar a verificação do antivírus)
+    upx=False,
     upx_exclude=[],
     runtime_tmpdir=None,
     console=False,
@@ -0,0 +1,46 @@
+"""
+Comandos de manutenção do banco de histórico.
+
+Uso:
+    python maintenance.py rescore [--db caminho.db] [--chunk 500]
+"""
+
+import argparse
+import time
+
+from db import Database
+
+
+def cmd_rescore(args):
+    """Recalcula pontos e nível de risco de todas as avaliações."""
+    t0 = time.perf_counter()
+    with Database(args.db) as db:
+        resultado = db.rescore_all(chunk_size=args.chunk)
+    print(
+        f"{resultado['avaliacoes']} avaliações processadas, "
+        f"{resultado['alteradas']} alteradas "
+        f"({time.perf_counter() - t0:.2f}s)"
+    )
+
+
+COMMANDS = {
+    "rescore": cmd_rescore,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--db", default=None, help="Arquivo .db (padrão: banco do usuário)"
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("rescore", help=cmd_rescore.__doc__)
+    p.add_argument("--chunk", type=int, default=500)
+
+    args = parser.parse_args()
+    COMMANDS[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
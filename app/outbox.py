@@ -0,0 +1,230 @@
+"""
+Entrega em segundo plano da fila de emails (tabela outbox).
+
+A interface só enfileira (Database.enqueue_email); o OutboxWorker gera o
+PDF, envia por uma sessão SMTP reaproveitada e registra o resultado. Falhas
+voltam para a fila com espera exponencial; a fila sobrevive a reinícios.
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+
+# Espera antes da n-ésima nova tentativa: BACKOFF_BASE * 2^(n-1), até o teto
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+MAX_ATTEMPTS = 8
+
+# Espera após um erro do banco (ex.: "database is locked") antes de retomar
+ERROR_BACKOFF_SECONDS = 15
+
+# Reserva 'enviando' tida como abandonada (instância que caiu sem devolvê-la);
+# bem acima do tempo de entregar um lote, mesmo com timeouts de SMTP
+CLAIM_STALE_SECONDS = 3600
+
+# Limite de envios por minuto (provedores bloqueiam rajadas)
+RATE_LIMIT_PER_MINUTE = 20
+
+# Rótulos de status para a interface
+STATUS_LABELS = {
+    "pendente": "Na fila",
+    "enviando": "Enviando",
+    "enviado": "Enviado",
+    "falhou": "Falhou",
+}
+
+logger = logging.getLogger(__name__)
+
+
+def backoff_delay(tentativas):
+    """Segundos até a próxima tentativa após `tentativas` falhas."""
+    return min(BACKOFF_BASE_SECONDS * 2 ** max(tentativas - 1, 0), BACKOFF_MAX_SECONDS)
+
+
+class RateLimiter:
+    """Janela deslizante: no máximo `limit` eventos a cada `period` segundos."""
+
+    def __init__(self, limit, period=60.0):
+        self.limit = limit
+        self.period = period
+        self._eventos = deque()
+
+    def wait_time(self):
+        """Segundos até um novo evento ser permitido (0 = agora)."""
+        agora = time.monotonic()
+        while self._eventos and agora - self._eventos[0] >= self.period:
+            self._eventos.popleft()
+        if len(self._eventos) < self.limit:
+            return 0.0
+        return self.period - (agora - self._eventos[0])
+
+    def record(self):
+        self._eventos.append(time.monotonic())
+
+
+class OutboxWorker(threading.Thread):
+    """
+    Thread que drena a outbox enquanto o app está aberto.
+
+    Args:
+        db: Database compartilhado (conexões são por thread)
+        render_pdf: Callable(record) -> bytes do prontuário
+        sender_factory: Callable() -> EmailSender (padrão: EmailSender)
+        on_change: Callable sem argumentos chamado após cada mudança de
+            status (ex.: emitir um sinal Qt para atualizar a tela)
+        rate_limit: Envios por minuto
+    """
+
+    def __init__(
+        self,
+        db,
+        render_pdf,
+        sender_factory=None,
+        on_change=None,
+        rate_limit=RATE_LIMIT_PER_MINUTE,
+    ):
+        super().__init__(name="OutboxWorker", daemon=True)
+        self.db = db
+        self.render_pdf = render_pdf
+        self.sender_factory = sender_factory
+        self.on_change = on_change
+        self.limiter = RateLimiter(rate_limit)
+        # Dono das reservas deste worker na outbox (único entre instâncias)
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:12]}"
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+
+    def wake(self):
+        """Acorda o worker (ex.: logo após enfileirar um envio)."""
+        self._wake_event.set()
+
+    def stop(self, timeout=5):
+        """Encerra a thread; envios em andamento voltam para a fila."""
+        self._stop_event.set()
+        self._wake_event.set()
+        self.join(timeout)
+
+    def _notify(self):
+        if self.on_change:
+            self.on_change()
+
+    def _sleep(self, seconds):
+        """Espera até `seconds`, um wake() ou stop()."""
+        self._wake_event.wait(max(seconds, 0))
+        self._wake_event.clear()
+
+    def _seconds_until_next_due(self):
+        proxima = self.db.next_outbox_due()
+        if proxima is None:
+            return None
+        try:
+            delta = datetime.fromisoformat(proxima) - datetime.now()
+        except ValueError:
+            return 0
+        return max(delta.total_seconds(), 0)
+
+    def run(self):
+        recuperar = True
+        while not self._stop_event.is_set():
+            # Um erro do banco não pode matar a thread: a fila ficaria parada
+            # até reiniciar o app. Registra, espera e tenta de novo.
+            try:
+                if recuperar:
+                    if self.db.recover_outbox(
+                        self.owner, timedelta(seconds=CLAIM_STALE_SECONDS)
+                    ):
+                        self._notify()
+                    recuperar = False
+                self._run_once()
+            except Exception:
+                logger.exception(
+                    "Erro ao processar a outbox; nova tentativa em %ss",
+                    ERROR_BACKOFF_SECONDS,
+                )
+                # Um lote interrompido no meio volta para a fila antes do
+                # próximo claim
+                recuperar = True
+                self._sleep(ERROR_BACKOFF_SECONDS)
+        try:
+            # Só as reservas deste worker: as de outra instância seguem com ela
+            self.db.recover_outbox(self.owner)
+        except Exception:
+            logger.exception("Erro ao devolver envios à outbox no encerramento")
+
+    def _run_once(self):
+        """Reserva e entrega um lote, ou dorme até o próximo envio devido."""
+        lote = self.db.claim_outbox(limit=self.limiter.limit, dono=self.owner)
+        if not lote:
+            espera = self._seconds_until_next_due()
+            # Sem nada devido: dorme até o próximo ou até um wake()
+            self._sleep(60 if espera is None else min(espera, 60))
+            return
+        self._notify()
+        self._deliver(lote)
+
+    def _deliver(self, lote):
+        """Envia um lote reservado por uma única sessão SMTP."""
+        # Mesmo nome de arquivo da exportação em lote ('<id>_<paciente>.pdf')
+        from batch_export import export_filename
+
+        sender = None
+        try:
+            for item in lote:
+                espera = self.limiter.wait_time()
+                while espera > 0 and not self._stop_event.is_set():
+                    self._stop_event.wait(espera)
+                    espera = self.limiter.wait_time()
+                if self._stop_event.is_set():
+                    # O restante volta para 'pendente' em recover_outbox()
+                    return
+
+                record = self.db.get_avaliacao_completa(item["avaliacao_id"])
+                if record is None:
+                    self.db.mark_outbox_failed(item["id"], "Avaliação não encontrada")
+                    self._notify()
+                    continue
+
+                try:
+                    if sender is None:
+                        sender = self._new_sender()
+                    pdf_data = self.render_pdf(record)
+                    ok, mensagem = sender.send_prontuario(
+                        item["destinatario"],
+                        item["nome_destinatario"],
+                        pdf_data,
+                        filename=export_filename(record),
+                    )
+                except Exception as e:
+                    ok, mensagem = False, str(e)
+
+                self.limiter.record()
+                if ok:
+                    self.db.mark_outbox_sent(item["id"])
+                else:
+                    self._fail(item, mensagem)
+                self._notify()
+        finally:
+            if sender is not None:
+                sender.close()
+
+    def _new_sender(self):
+        if self.sender_factory is not None:
+            sender = self.sender_factory()
+        else:
+            from email_sender import EmailSender
+
+            sender = EmailSender()
+        sender.connect()
+        return sender
+
+    def _fail(self, item, mensagem):
+        tentativas = item["tentativas"] + 1
+        if tentativas >= MAX_ATTEMPTS:
+            self.db.mark_outbox_failed(item["id"], mensagem)
+        else:
+            proxima = datetime.now() + timedelta(seconds=backoff_delay(tentativas))
+            self.db.mark_outbox_failed(item["id"], mensagem, proxima)
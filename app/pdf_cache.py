@@ -0,0 +1,158 @@
+"""
+Cache de prontuários PDF já renderizados.
+
+Cada arquivo é endereçado pelo conteúdo: '<avaliacao_id>-<hash>.pdf', onde
+o hash cobre cabeçalho, respostas e TEMPLATE_VERSION (config.py). Editar uma
+resposta (ou mudar o layout) muda o hash, então versões antigas nunca são
+servidas; elas são removidas no próximo put e pela evicção LRU por tamanho.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from config import TEMPLATE_VERSION
+
+# Limite padrão do diretório do cache
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+
+def default_cache_dir(db_path=None):
+    """Diretório do cache: 'pdf_cache' ao lado do dbhistory.db."""
+    if db_path:
+        return Path(db_path).parent / "pdf_cache"
+    return Path.home() / ".app_pythonse" / "pdf_cache"
+
+
+def record_hash(record):
+    """Hash estável do conteúdo de um prontuário (formato get_avaliacao_completa)."""
+    conteudo = {
+        "template": TEMPLATE_VERSION,
+        "id": record.get("id"),
+        "patient_name": record.get("patient_name"),
+        "data": record.get("data"),
+        "level": record.get("level"),
+        "score": record.get("score"),
+        "responses": [
+            [
+                r.get("eixo_nome"),
+                r.get("pergunta_id", r.get("question_id")),
+                r.get("pergunta_texto"),
+                r.get("resposta"),
+                r.get("pontos"),
+            ]
+            for r in record.get("responses", [])
+        ],
+    }
+    dados = json.dumps(conteudo, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(dados.encode("utf-8")).hexdigest()[:32]
+
+
+class PDFCache:
+    """Cache LRU de PDFs em disco, limitado por tamanho total."""
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = Path(directory or default_cache_dir())
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, avaliacao_id, digest):
+        return self.directory / f"{avaliacao_id}-{digest}.pdf"
+
+    def get(self, record):
+        """
+        Retorna os bytes do PDF em cache para este conteúdo, ou None.
+
+        Args:
+            record: Dicionário no formato de get_avaliacao_completa
+
+        Returns:
+            bytes, ou None se não houver entrada válida
+        """
+        path = self._path(record.get("id"), record_hash(record))
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        # mtime marca o último uso (ordem da evicção LRU)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def put(self, record, data):
+        """
+        Grava o PDF e descarta versões anteriores da mesma avaliação.
+
+        Args:
+            record: Dicionário no formato de get_avaliacao_completa
+            data: Conteúdo do PDF (bytes)
+        """
+        avaliacao_id = record.get("id")
+        path = self._path(avaliacao_id, record_hash(record))
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        with self._lock:
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+            self._remove(avaliacao_id, manter=path)
+            self._evict()
+
+    def get_or_render(self, record, render):
+        """
+        Retorna o PDF do cache ou renderiza com render(record) e guarda.
+
+        Args:
+            record: Dicionário no formato de get_avaliacao_completa
+            render: Callable que recebe o record e devolve bytes
+
+        Returns:
+            Conteúdo do PDF (bytes)
+        """
+        # Avaliações ainda não salvas (sem id) não são cacheadas
+        if record.get("id") is None:
+            return render(record)
+        data = self.get(record)
+        if data is None:
+            data = render(record)
+            self.put(record, data)
+        return data
+
+    def invalidate(self, avaliacao_id):
+        """Remove todas as versões em cache de uma avaliação."""
+        with self._lock:
+            self._remove(avaliacao_id)
+
+    def clear(self):
+        """Esvazia o cache."""
+        with self._lock:
+            for path in self.directory.glob("*.pdf"):
+                path.unlink(missing_ok=True)
+
+    def _remove(self, avaliacao_id, manter=None):
+        for path in self.directory.glob(f"{avaliacao_id}-*.pdf"):
+            if path != manter:
+                path.unlink(missing_ok=True)
+
+    def _evict(self):
+        """Remove os arquivos usados há mais tempo até caber em max_bytes."""
+        entradas = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pdf"):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entradas.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+        if total <= self.max_bytes:
+            return
+        for _, tamanho, path in sorted(entradas):
+            Path(path).unlink(missing_ok=True)
+            total -= tamanho
+            if total <= self.max_bytes:
+                break
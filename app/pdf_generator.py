@@ -12,16 +12,73 @@ from reportlab.platypus import (
 from reportlab.lib import colors
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT, TA_JUSTIFY
 from reportlab.pdfgen import canvas
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from datetime import datetime
+import copy
+import functools
+import io
 import os
 
+from config import TEMPLATE_VERSION  # noqa: F401 (reexportado)
+
+
+class WatermarkTemplate:
+    """
+    Marca d'água pré-calculada (texto, fonte, largura, ângulo, opacidade).
+
+    Uma instância pode ser compartilhada por todos os documentos de um lote;
+    cada documento a desenha uma única vez como form XObject.
+    """
+
+    def __init__(
+        self,
+        text="DOCUMENTO ACADÊMICO",
+        font_name="Helvetica-Bold",
+        font_size=80,
+        alpha=0.30,
+        angle=45,
+    ):
+        self.text = text
+        self.font_name = font_name
+        self.font_size = font_size
+        self.alpha = alpha
+        self.angle = angle
+        # Largura medida uma única vez (evita recalcular a cada página)
+        self.text_width = stringWidth(text, font_name, font_size)
+
+    def form_name(self, pagesize):
+        """Nome do form XObject para um tamanho de página."""
+        width, height = pagesize
+        return f"Watermark_{int(width)}x{int(height)}"
+
+    def draw(self, canv, pagesize):
+        """
+        Desenha o texto diagonal no centro da página.
+
+        A opacidade não é aplicada aqui: forms do ReportLab não levam
+        ExtGState nos recursos, então quem usa o form define o alpha.
+        """
+        width, height = pagesize
+        canv.saveState()
+        canv.setFont(self.font_name, self.font_size)
+        canv.translate(width / 2, height / 2)
+        canv.rotate(self.angle)
+        canv.drawString(-self.text_width / 2, 0, self.text)
+        canv.restoreState()
+
+
+# Marca d'água padrão, compartilhada por todos os documentos do processo
+DEFAULT_WATERMARK = WatermarkTemplate()
+
 
 class WatermarkCanvas(canvas.Canvas):
     """Canvas customizado para adicionar marca d'água em todas as páginas."""
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, watermark=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.page_num = 0
+        self.watermark = watermark or DEFAULT_WATERMARK
+        self._watermark_forms = set()
 
     def showPage(self):
         """Adiciona marca d'água antes de mostrar a página."""
@@ -30,83 +87,216 @@ class WatermarkCanvas(canvas.Canvas):
         super().showPage()
 
     def _add_watermark(self):
-        """Adiciona marca d'água com texto diagonal e 30% opacidade."""
-        width, height = self._pagesize
+        """
+        Referencia a marca d'água na página atual.
+
+        O conteúdo é emitido uma única vez por documento (e por tamanho de
+        página) como form XObject; as demais páginas só fazem 'Do'.
+        """
+        name = self.watermark.form_name(self._pagesize)
+        if name not in self._watermark_forms:
+            self.beginForm(name)
+            self.watermark.draw(self, self._pagesize)
+            self.endForm()
+            self._watermark_forms.add(name)
 
-        # Salvar estado do canvas
         self.saveState()
+        # Configurar transparência 30% (0.30 alpha = 70% opaco); o form
+        # herda o estado gráfico da página
+        self.setFillAlpha(self.watermark.alpha)
+        self.doForm(name)
+        self.restoreState()
 
-        # Configurar transparência 30% (0.30 alpha = 70% opaco)
-        self.setFillAlpha(0.30)
-        self.setFont("Helvetica-Bold", 80)
 
-        # Desenhar texto diagonal no centro
-        self.translate(width / 2, height / 2)
-        self.rotate(45)
-        self.drawCentredString(0, 0, "DOCUMENTO ACADÊMICO")
+# Cores do texto de resposta
+ANSWER_COLOR_SIM = "#059669"
+ANSWER_COLOR_NAO = "#DC2626"
 
-        # Restaurar estado
-        self.restoreState()
+# Estilos, TableStyles e flowables constantes, construídos uma única vez por
+# processo e compartilhados por todos os PDFGenerator. Não devem ser alterados.
+_cache = None
 
 
-class PDFGenerator:
-    """Gerador de PDFs para prontuários de pacientes."""
+def _build_cache():
+    """Constrói estilos e elementos estáticos do prontuário."""
+    styles = getSampleStyleSheet()
 
-    def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self.setup_custom_styles()
+    # Estilo para título
+    styles.add(
+        ParagraphStyle(
+            name="CustomTitle",
+            parent=styles["Heading1"],
+            fontSize=24,
+            textColor=colors.HexColor("#0D7377"),
+            spaceAfter=12,
+            alignment=TA_CENTER,
+            fontName="Helvetica-Bold",
+        )
+    )
+
+    # Estilo para subtítulo
+    styles.add(
+        ParagraphStyle(
+            name="CustomSubtitle",
+            parent=styles["Heading2"],
+            fontSize=14,
+            textColor=colors.HexColor("#0D7377"),
+            spaceAfter=6,
+            alignment=TA_CENTER,
+            fontName="Helvetica-Bold",
+        )
+    )
+
+    # Estilo para seções
+    styles.add(
+        ParagraphStyle(
+            name="SectionTitle",
+            parent=styles["Heading2"],
+            fontSize=13,
+            textColor=colors.HexColor("#0D7377"),
+            spaceAfter=8,
+            spaceBefore=10,
+            fontName="Helvetica-Bold",
+        )
+    )
 
-    def setup_custom_styles(self):
-        """Configura estilos customizados para o PDF."""
-        # Estilo para título
-        self.styles.add(
-            ParagraphStyle(
-                name="CustomTitle",
-                parent=self.styles["Heading1"],
-                fontSize=24,
-                textColor=colors.HexColor("#0D7377"),
-                spaceAfter=12,
-                alignment=TA_CENTER,
-                fontName="Helvetica-Bold",
-            )
+    # Estilo para texto normal
+    styles.add(
+        ParagraphStyle(
+            name="CustomNormal",
+            parent=styles["Normal"],
+            fontSize=11,
+            spaceAfter=6,
+            alignment=TA_LEFT,
         )
+    )
 
-        # Estilo para subtítulo
-        self.styles.add(
+    # Aviso acadêmico destacado
+    styles.add(
+        ParagraphStyle(
+            name="AvisoAcademico",
+            parent=styles["Normal"],
+            fontSize=11,
+            textColor=colors.red,
+            alignment=TA_CENTER,
+            fontName="Helvetica-Bold",
+            spaceAfter=12,
+            borderColor=colors.red,
+            borderWidth=2,
+            borderPadding=10,
+            backColor=colors.HexColor("#FEE2E2"),
+        )
+    )
+
+    # Pergunta e resposta (uma cor por resposta) do histórico detalhado
+    styles.add(
+        ParagraphStyle(
+            name="Question",
+            parent=styles["Normal"],
+            fontSize=10,
+            spaceAfter=8,
+            leftIndent=20,
+            textColor=colors.black,
+        )
+    )
+    for name, color in (("AnswerSim", ANSWER_COLOR_SIM), ("AnswerNao", ANSWER_COLOR_NAO)):
+        styles.add(
             ParagraphStyle(
-                name="CustomSubtitle",
-                parent=self.styles["Heading2"],
-                fontSize=14,
-                textColor=colors.HexColor("#0D7377"),
-                spaceAfter=6,
-                alignment=TA_CENTER,
-                fontName="Helvetica-Bold",
+                name=name,
+                parent=styles["Normal"],
+                fontSize=10,
+                spaceAfter=12,
+                leftIndent=40,
+                textColor=colors.HexColor(color),
             )
         )
 
-        # Estilo para seções
-        self.styles.add(
-            ParagraphStyle(
-                name="SectionTitle",
-                parent=self.styles["Heading2"],
-                fontSize=13,
-                textColor=colors.HexColor("#0D7377"),
-                spaceAfter=8,
-                spaceBefore=10,
-                fontName="Helvetica-Bold",
-            )
+    def info_table_style(background):
+        return TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (0, -1), colors.HexColor(background)),
+                ("TEXTCOLOR", (0, 0), (-1, -1), colors.black),
+                ("ALIGN", (0, 0), (-1, -1), "LEFT"),
+                ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
+                ("FONTSIZE", (0, 0), (-1, -1), 11),
+                ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
+                ("TOPPADDING", (0, 0), (-1, -1), 8),
+                ("GRID", (0, 0), (-1, -1), 1, colors.HexColor("#E5E7EB")),
+            ]
         )
 
-        # Estilo para texto normal
-        self.styles.add(
-            ParagraphStyle(
-                name="CustomNormal",
-                parent=self.styles["Normal"],
-                fontSize=11,
-                spaceAfter=6,
-                alignment=TA_LEFT,
+    normal = styles["CustomNormal"]
+    return {
+        "styles": styles,
+        "patient_table_style": info_table_style("#E0F2FE"),
+        "result_table_style": info_table_style("#FED7D7"),
+        # Flowables sem dados do paciente (copiados a cada documento)
+        "header": [
+            Paragraph(
+                "⚠️ DOCUMENTO ACADÊMICO - APENAS PARA FINS EDUCACIONAIS ⚠️",
+                styles["AvisoAcademico"],
+            ),
+            Spacer(1, 0.1 * inch),
+            Paragraph("PRONTUÁRIO DE AVALIAÇÃO", styles["CustomTitle"]),
+            Spacer(1, 0.2 * inch),
+        ],
+        "labels": {
+            texto: Paragraph(f"<b>{texto}</b>", normal)
+            for texto in (
+                "Nome do Paciente:",
+                "Data da Avaliação:",
+                "Nível de Risco:",
+                "Pontuação Total:",
             )
-        )
+        },
+        "responses_title": Paragraph(
+            "HISTÓRICO DE RESPOSTAS DETALHADO", styles["SectionTitle"]
+        ),
+        "no_responses": Paragraph("Nenhuma resposta registrada.", normal),
+        "footer": [
+            Paragraph(
+                "<b>Este documento é um projeto acadêmico e NÃO deve ser utilizado para diagnóstico clínico real.</b>",
+                normal,
+            ),
+            Paragraph(
+                "<i>Use apenas para fins educacionais e de pesquisa. Consulte um profissional de saúde credenciado para diagnóstico real.</i>",
+                normal,
+            ),
+        ],
+    }
+
+
+def _get_cache():
+    global _cache
+    if _cache is None:
+        _cache = _build_cache()
+    return _cache
+
+
+def _fresh(flowable):
+    """
+    Cópia rasa de um flowable pré-construído.
+
+    O texto já vem interpretado (frags compartilhados); só o estado de
+    layout (wrap/split) fica na cópia, então documentos gerados em paralelo
+    não interferem entre si.
+    """
+    return copy.copy(flowable)
+
+
+class PDFGenerator:
+    """Gerador de PDFs para prontuários de pacientes."""
+
+    def __init__(self, watermark=None):
+        """
+        Args:
+            watermark: WatermarkTemplate a usar (padrão: DEFAULT_WATERMARK,
+                compartilhada entre documentos)
+        """
+        cache = _get_cache()
+        self._cache = cache
+        self.styles = cache["styles"]
+        self.watermark = watermark or DEFAULT_WATERMARK
 
     def generate_prontuario(self, record, output_path=None):
         """
@@ -114,16 +304,18 @@ class PDFGenerator:
 
         Args:
             record: Dicionário com dados da avaliação
+            output_path: Caminho do arquivo ou stream gravável (ex.: BytesIO);
+                se omitido, gera um nome no diretório atual
 
         Returns:
-            Caminho do arquivo PDF gerado
+            Caminho do arquivo PDF gerado, ou o próprio stream
         """
-        if not output_path:
+        if output_path is None or output_path == "":
             patient_name = record.get("patient_name", "Paciente").replace(" ", "_")
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             output_path = f"prontuario_{patient_name}_{timestamp}.pdf"
 
-        # Criar documento PDF com canvas customizado
+        # Criar documento PDF
         doc = SimpleDocTemplate(
             output_path,
             pagesize=A4,
@@ -131,69 +323,32 @@ class PDFGenerator:
             leftMargin=0.75 * inch,
             topMargin=0.75 * inch,
             bottomMargin=0.75 * inch,
-            canvasmaker=WatermarkCanvas,
         )
 
         # Lista de elementos para o PDF
         story = []
 
-        # Aviso acadêmico destacado
-        aviso_style = ParagraphStyle(
-            name="AvisoAcademico",
-            parent=self.styles["Normal"],
-            fontSize=11,
-            textColor=colors.red,
-            alignment=TA_CENTER,
-            fontName="Helvetica-Bold",
-            spaceAfter=12,
-            borderColor=colors.red,
-            borderWidth=2,
-            borderPadding=10,
-            backColor=colors.HexColor("#FEE2E2"),
-        )
-
-        story.append(
-            Paragraph(
-                "⚠️ DOCUMENTO ACADÊMICO - APENAS PARA FINS EDUCACIONAIS ⚠️",
-                aviso_style,
-            )
-        )
-        story.append(Spacer(1, 0.1 * inch))
+        cache = self._cache
+        normal = self.styles["CustomNormal"]
+        labels = cache["labels"]
 
-        # Título
-        story.append(Paragraph("PRONTUÁRIO DE AVALIAÇÃO", self.styles["CustomTitle"]))
-        story.append(Spacer(1, 0.2 * inch))
+        # Aviso acadêmico e título
+        story.extend(_fresh(f) for f in cache["header"])
 
         # Informações do paciente
         patient_info = [
             [
-                Paragraph("<b>Nome do Paciente:</b>", self.styles["CustomNormal"]),
-                Paragraph(
-                    record.get("patient_name", "Não informado"),
-                    self.styles["CustomNormal"],
-                ),
+                _fresh(labels["Nome do Paciente:"]),
+                Paragraph(record.get("patient_name", "Não informado"), normal),
             ],
             [
-                Paragraph("<b>Data da Avaliação:</b>", self.styles["CustomNormal"]),
-                Paragraph(record.get("data", "N/A"), self.styles["CustomNormal"]),
+                _fresh(labels["Data da Avaliação:"]),
+                Paragraph(record.get("data", "N/A"), normal),
             ],
         ]
 
         patient_table = Table(patient_info, colWidths=[2.5 * inch, 3.5 * inch])
-        patient_table.setStyle(
-            TableStyle(
-                [
-                    ("BACKGROUND", (0, 0), (0, -1), colors.HexColor("#E0F2FE")),
-                    ("TEXTCOLOR", (0, 0), (-1, -1), colors.black),
-                    ("ALIGN", (0, 0), (-1, -1), "LEFT"),
-                    ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
-                    ("FONTSIZE", (0, 0), (-1, -1), 11),
-                    ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
-                    ("TOPPADDING", (0, 0), (-1, -1), 8),
-                    ("GRID", (0, 0), (-1, -1), 1, colors.HexColor("#E5E7EB")),
-                ]
-            )
-        )
+        patient_table.setStyle(cache["patient_table_style"])
         story.append(patient_table)
         story.append(Spacer(1, 0.3 * inch))
 
@@ -212,40 +367,22 @@ class PDFGenerator:
 
         result_info = [
             [
-                Paragraph("<b>Nível de Risco:</b>", self.styles["CustomNormal"]),
-                Paragraph(
-                    f"<font color='{level_color}'><b>{level}</b></font>",
-                    self.styles["CustomNormal"],
-                ),
+                _fresh(labels["Nível de Risco:"]),
+                Paragraph(f"<font color='{level_color}'><b>{level}</b></font>", normal),
             ],
             [
-                Paragraph("<b>Pontuação Total:</b>", self.styles["CustomNormal"]),
-                Paragraph(f"{score} pontos", self.styles["CustomNormal"]),
+                _fresh(labels["Pontuação Total:"]),
+                Paragraph(f"{score} pontos", normal),
             ],
         ]
 
         result_table = Table(result_info, colWidths=[2.5 * inch, 3.5 * inch])
-        result_table.setStyle(
-            TableStyle(
-                [
-                    ("BACKGROUND", (0, 0), (0, -1), colors.HexColor("#FED7D7")),
-                    ("TEXTCOLOR", (0, 0), (-1, -1), colors.black),
-                    ("ALIGN", (0, 0), (-1, -1), "LEFT"),
-                    ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
-                    ("FONTSIZE", (0, 0), (-1, -1), 11),
-                    ("BOTTOMPADDING", (0, 0), (-1, -1), 8),
-                    ("TOPPADDING", (0, 0), (-1, -1), 8),
-                    ("GRID", (0, 0), (-1, -1), 1, colors.HexColor("#E5E7EB")),
-                ]
-            )
-        )
+        result_table.setStyle(cache["result_table_style"])
         story.append(result_table)
         story.append(Spacer(1, 0.3 * inch))
 
         # Respostas detalhadas
-        story.append(
-            Paragraph("HISTÓRICO DE RESPOSTAS DETALHADO", self.styles["SectionTitle"])
-        )
+        story.append(_fresh(cache["responses_title"]))
 
         responses = record.get("responses", [])
         if responses:
@@ -257,6 +394,10 @@ class PDFGenerator:
                     responses_by_eixo[eixo] = []
                 responses_by_eixo[eixo].append(resp)
 
+            question_style = self.styles["Question"]
+            answer_sim_style = self.styles["AnswerSim"]
+            answer_nao_style = self.styles["AnswerNao"]
+
             # Exibir respostas por eixo
             question_counter = 1  # Contador global para numeração sequencial
             for eixo, eixo_responses in responses_by_eixo.items():
@@ -267,78 +408,60 @@ class PDFGenerator:
                     pergunta_texto = resp.get(
                         "pergunta_texto", "Pergunta não disponível"
                     )
-                    resposta = resp.get("resposta", "N/A")
-                    resposta_text = "SIM" if resposta in ("sim", True) else "NÃO"
+                    is_sim = resp.get("resposta", "N/A") in ("sim", True)
                     pontos = resp.get("pontos", 0)
-                    resposta_color = (
-                        "#059669" if resposta in ("sim", True) else "#DC2626"
-                    )
-
-                    # Criar estilo para questão
-                    question_style = ParagraphStyle(
-                        name=f"Question{question_counter}",
-                        parent=self.styles["Normal"],
-                        fontSize=10,
-                        spaceAfter=8,
-                        leftIndent=20,
-                        textColor=colors.black,
-                    )
 
                     # Pergunta com número sequencial global
-                    question_text = Paragraph(
-                        f"<b>Q{question_counter:02d}:</b> {pergunta_texto}",
-                        question_style,
+                    story.append(
+                        Paragraph(
+                            f"<b>Q{question_counter:02d}:</b> {pergunta_texto}",
+                            question_style,
+                        )
                     )
-                    story.append(question_text)
 
                     # Resposta com cor
-                    answer_style = ParagraphStyle(
-                        name=f"Answer{question_counter}",
-                        parent=self.styles["Normal"],
-                        fontSize=10,
-                        spaceAfter=12,
-                        leftIndent=40,
-                        textColor=colors.HexColor(resposta_color),
-                    )
-                    answer_text_para = Paragraph(
-                        f"<b>Resposta:</b> <b>{resposta_text}</b> (+{pontos} pts)",
-                        answer_style,
+                    story.append(
+                        Paragraph(
+                            f"<b>Resposta:</b> <b>{'SIM' if is_sim else 'NÃO'}</b> (+{pontos} pts)",
+                            answer_sim_style if is_sim else answer_nao_style,
+                        )
                     )
-                    story.append(answer_text_para)
 
                     question_counter += 1  # Incrementar para próxima questão
 
                 story.append(Spacer(1, 0.2 * inch))
         else:
-            story.append(
-                Paragraph(
-                    "Nenhuma resposta registrada.",
-                    self.styles["CustomNormal"],
-                )
-            )
+            story.append(_fresh(cache["no_responses"]))
 
         # Rodapé
         story.append(Spacer(1, 0.3 * inch))
         story.append(
             Paragraph(
                 f"<i>Prontuário gerado em {datetime.now().strftime('%d/%m/%Y às %H:%M:%S')}</i>",
-                self.styles["CustomNormal"],
-            )
-        )
-        story.append(
-            Paragraph(
-                "<b>Este documento é um projeto acadêmico e NÃO deve ser utilizado para diagnóstico clínico real.</b>",
-                self.styles["CustomNormal"],
-            )
-        )
-        story.append(
-            Paragraph(
-                "<i>Use apenas para fins educacionais e de pesquisa. Consulte um profissional de saúde credenciado para diagnóstico real.</i>",
-                self.styles["CustomNormal"],
+                normal,
             )
         )
+        story.extend(_fresh(f) for f in cache["footer"])
 
-        # Compilar PDF
-        doc.build(story)
+        # Compilar PDF (o canvas com marca d'água é passado ao build; o
+        # SimpleDocTemplate ignora canvasmaker no construtor)
+        doc.build(
+            story,
+            canvasmaker=functools.partial(WatermarkCanvas, watermark=self.watermark),
+        )
 
         return output_path
+
+    def generate_prontuario_bytes(self, record):
+        """
+        Gera o prontuário inteiramente em memória.
+
+        Args:
+            record: Dicionário com dados da avaliação
+
+        Returns:
+            Conteúdo do PDF (bytes)
+        """
+        buffer = io.BytesIO()
+        self.generate_prontuario(record, buffer)
+        return buffer.getvalue()
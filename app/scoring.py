@@ -0,0 +1,142 @@
+"""
+Pontuação em lote de vetores de respostas.
+
+Usado na reavaliação do histórico (Database.rescore_all) e em análises
+offline. Com NumPy instalado o cálculo é vetorizado; sem ele, cai para uma
+implementação em Python puro com o mesmo resultado.
+
+O NumPy só é importado na primeira pontuação em lote (_np): db importa este
+módulo, e a abertura do app não deve carregá-lo.
+"""
+
+from bisect import bisect_right
+from collections import namedtuple
+from functools import lru_cache
+
+from config import SCORE_RANGES
+
+# Valor de célula para pergunta sem resposta (não pontua)
+SEM_RESPOSTA = -1
+
+# Tabela mínima de pesos; Questionario (data_manager) tem os mesmos atributos
+TabelaPesos = namedtuple("TabelaPesos", ["pesos_sim", "pesos_nao", "eixo_offsets"])
+
+_FAIXAS = sorted(SCORE_RANGES, key=lambda faixa: faixa["min"])
+_MINIMOS = [faixa["min"] for faixa in _FAIXAS]
+_MAXIMOS = [faixa["max"] for faixa in _FAIXAS]
+# Último elemento: fora de qualquer faixa (mesmo fallback de get_risk_level)
+_NIVEIS = [faixa["level"] for faixa in _FAIXAS] + ["Crítico"]
+
+
+@lru_cache(maxsize=None)
+def _np():
+    """Módulo numpy, importado no primeiro uso; None se não instalado."""
+    try:
+        import numpy
+    except ImportError:  # NumPy é opcional
+        return None
+    return numpy
+
+
+def _usar_numpy(use_numpy):
+    if use_numpy is False:
+        return False
+    disponivel = _np() is not None
+    if use_numpy and not disponivel:
+        raise RuntimeError("NumPy não está instalado")
+    return disponivel
+
+
+def risk_levels(totais, use_numpy=None):
+    """
+    Classifica vários totais de uma vez pelas faixas de SCORE_RANGES.
+
+    Equivalente a aplicar utils.get_risk_level em cada total, com busca
+    binária nas faixas em vez de varredura linear.
+
+    Args:
+        totais: Sequência (ou array) de pontuações
+        use_numpy: True/False força a implementação; None escolhe sozinho
+
+    Returns:
+        Array NumPy de strings ou lista de strings, na ordem de totais
+    """
+    if _usar_numpy(use_numpy):
+        np = _np()
+        totais = np.asarray(totais)
+        idx = np.searchsorted(_MINIMOS, totais, side="right") - 1
+        seguro = np.clip(idx, 0, len(_FAIXAS) - 1)
+        fora = (idx < 0) | (totais > np.asarray(_MAXIMOS)[seguro])
+        return np.asarray(_NIVEIS)[np.where(fora, len(_FAIXAS), seguro)]
+
+    niveis = []
+    for total in totais:
+        i = bisect_right(_MINIMOS, total) - 1
+        niveis.append(_NIVEIS[i] if i >= 0 and total <= _MAXIMOS[i] else _NIVEIS[-1])
+    return niveis
+
+
+def score_batch(respostas, questionario=None, use_numpy=None):
+    """
+    Pontua N vetores de respostas em uma passada.
+
+    Cada linha tem uma célula por pergunta, na ordem do questionário:
+    1 = sim, 0 = não, SEM_RESPOSTA (-1) = não respondida (0 pontos).
+
+    Args:
+        respostas: Matriz N×P (array NumPy ou sequência de sequências)
+        questionario: Questionario ou TabelaPesos; padrão: questions.json
+        use_numpy: True/False força a implementação; None escolhe sozinho
+
+    Returns:
+        Dicionário com 'subtotais' (N×eixos), 'totais' (N) e 'niveis' (N);
+        arrays NumPy no caminho vetorizado, listas no fallback
+    """
+    if questionario is None:
+        from data_manager import load_compiled_questions
+
+        questionario = load_compiled_questions()
+    pesos_sim = list(questionario.pesos_sim)
+    pesos_nao = list(questionario.pesos_nao)
+    offsets = list(questionario.eixo_offsets) or [0]
+
+    if _usar_numpy(use_numpy):
+        np = _np()
+        matriz = np.asarray(respostas, dtype=np.int8).reshape(-1, len(pesos_sim))
+        pontos = np.where(
+            matriz == 1,
+            np.asarray(pesos_sim, dtype=np.int32),
+            np.where(matriz == 0, np.asarray(pesos_nao, dtype=np.int32), 0),
+        )
+        if pontos.shape[0]:
+            subtotais = np.add.reduceat(pontos, offsets, axis=1)
+        else:
+            subtotais = np.zeros((0, len(offsets)), dtype=np.int32)
+        totais = subtotais.sum(axis=1)
+        return {
+            "subtotais": subtotais,
+            "totais": totais,
+            "niveis": risk_levels(totais, use_numpy=True),
+        }
+
+    faixas_eixo = list(zip(offsets, offsets[1:] + [len(pesos_sim)]))
+    subtotais = []
+    totais = []
+    for linha in respostas:
+        por_eixo = []
+        for inicio, fim in faixas_eixo:
+            soma = 0
+            for i in range(inicio, fim):
+                valor = linha[i]
+                if valor == 1:
+                    soma += pesos_sim[i]
+                elif valor == 0:
+                    soma += pesos_nao[i]
+            por_eixo.append(soma)
+        subtotais.append(por_eixo)
+        totais.append(sum(por_eixo))
+    return {
+        "subtotais": subtotais,
+        "totais": totais,
+        "niveis": risk_levels(totais, use_numpy=False),
+    }
@@ -0,0 +1,108 @@
+"""
+Configuração comum dos testes.
+
+Os módulos do app são importados como o próprio app faz (imports planos de
+app/). O servidor SMTP local usa aiosmtpd com STARTTLS (certificado
+autoassinado gerado pelo openssl) e AUTH, como os provedores reais.
+"""
+
+import os
+import shutil
+import socket
+import ssl
+import subprocess
+import sys
+from email import message_from_bytes
+
+import pytest
+
+APP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+sys.path.insert(0, APP_DIR)
+
+SMTP_LOGIN = "clinica@example.com"
+SMTP_PASSWORD = "senha-de-app"
+
+
+class SMTPSink:
+    """Handler do aiosmtpd que guarda as mensagens recebidas."""
+
+    def __init__(self):
+        self.mensagens = []  # (peer, destinatários, email.message.Message)
+
+    async def handle_DATA(self, server, session, envelope):
+        self.mensagens.append(
+            (session.peer, envelope.rcpt_tos, message_from_bytes(envelope.content))
+        )
+        return "250 OK"
+
+    def sessoes(self):
+        """Conexões distintas (endereço:porta do cliente) que entregaram algo."""
+        return {peer for peer, _, _ in self.mensagens}
+
+
+def attachment_names(msg):
+    """Nomes dos anexos de uma mensagem, como um cliente de email os lê."""
+    return [part.get_filename() for part in msg.walk() if part.get_filename()]
+
+
+def _porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(scope="session")
+def tls_context(tmp_path_factory):
+    if shutil.which("openssl") is None:
+        pytest.skip("openssl indisponível para gerar o certificado de teste")
+    pasta = tmp_path_factory.mktemp("tls")
+    cert, chave = pasta / "cert.pem", pasta / "key.pem"
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+            "-keyout", str(chave), "-out", str(cert),
+            "-days", "1", "-subj", "/CN=localhost",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    contexto = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    contexto.load_cert_chain(cert, chave)
+    return contexto
+
+
+@pytest.fixture
+def smtp_sink(tls_context):
+    """Servidor SMTP local; devolve (SMTPSink, EmailConfig apontando para ele)."""
+    controller_mod = pytest.importorskip("aiosmtpd.controller")
+    from aiosmtpd.smtp import AuthResult
+
+    from email_config import EmailConfig
+
+    def autenticar(server, session, envelope, mechanism, auth_data):
+        return AuthResult(
+            success=auth_data.login == SMTP_LOGIN.encode()
+            and auth_data.password == SMTP_PASSWORD.encode()
+        )
+
+    sink = SMTPSink()
+    porta = _porta_livre()
+    controller = controller_mod.Controller(
+        sink,
+        hostname="127.0.0.1",
+        port=porta,
+        tls_context=tls_context,
+        require_starttls=True,
+        authenticator=autenticar,
+        auth_require_tls=True,
+    )
+    controller.start()
+    try:
+        yield sink, EmailConfig(
+            sender_email=SMTP_LOGIN,
+            sender_password=SMTP_PASSWORD,
+            smtp_server="127.0.0.1",
+            smtp_port=porta,
+        )
+    finally:
+        controller.stop()
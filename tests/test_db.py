@@ -0,0 +1,323 @@
+"""Persistência (db.Database) sobre um arquivo SQLite temporário."""
+
+import sqlite3
+import threading
+from datetime import datetime
+
+import pytest
+
+from db import MIGRATIONS, Database
+from utils import get_risk_level
+
+
+def _em_thread(fn):
+    thread = threading.Thread(target=fn)
+    thread.start()
+    thread.join()
+
+
+def test_conexao_da_thread_e_liberada_quando_ela_termina(tmp_path):
+    db = Database(tmp_path / "app.db")
+    for _ in range(5):
+        _em_thread(db.get_total_avaliacoes)
+    # Só a da thread principal (migrações) continua aberta
+    assert len(db._conexoes) == 1
+    db.close()
+    assert len(db._conexoes) == 0
+
+
+def test_close_nao_fecha_conexao_de_thread_viva(tmp_path):
+    db = Database(tmp_path / "app.db")
+    pronta, liberar = threading.Event(), threading.Event()
+    resultado = []
+
+    def trabalho():
+        db.get_avaliacoes_page(10)
+        pronta.set()
+        liberar.wait(10)
+        resultado.append(db.get_avaliacoes_page(10))
+
+    thread = threading.Thread(target=trabalho)
+    thread.start()
+    pronta.wait(10)
+    db.close()
+    liberar.set()
+    thread.join()
+
+    assert resultado == [([], None)]
+    assert len(db._conexoes) == 0
+
+
+def _salvar(db, nome, pontuacao=1, nivel_risco="Baixo"):
+    return db.save_avaliacao_with_respostas(
+        nome_paciente=nome,
+        nivel_risco=nivel_risco,
+        pontuacao=pontuacao,
+        respostas=[],
+    )
+
+
+@pytest.mark.parametrize("fts", [True, False], ids=["fts5", "like"])
+def test_busca_por_prefixo_de_palavra_sem_acentos(tmp_path, fts):
+    db = Database(tmp_path / "app.db")
+    if not fts:
+        # Como num SQLite sem FTS5 (a migração 6 pula o índice)
+        db._tem_fts = False
+    for nome in ["José da Conceição", "Maria Josefa", "Ana_Souza", "Bruno 50% Silva"]:
+        _salvar(db, nome)
+
+    def buscar(texto):
+        resultados, _ = db.search_avaliacoes({"texto": texto}, limit=10)
+        return {r["patient_name"] for r in resultados}
+
+    assert buscar("jose") == {"José da Conceição", "Maria Josefa"}
+    assert buscar("CONCEI jo") == {"José da Conceição"}
+    # Prefixo de palavra, não trecho no meio dela
+    assert buscar("sefa") == set()
+    # '_' e '%' separam palavras, não são curingas de LIKE
+    assert buscar("o_z") == set()
+    assert buscar("j%a") == set()
+    assert buscar("souza") == {"Ana_Souza"}
+    assert buscar("50% sil") == {"Bruno 50% Silva"}
+    db.close()
+
+
+def _resposta(question_id, resposta, pontos=0):
+    return {
+        "eixo_nome": "Eixo 1",
+        "question_id": question_id,
+        "pergunta_texto": f"Pergunta {question_id}",
+        "resposta": resposta,
+        "pontos": pontos,
+    }
+
+
+def test_rescore_all_sem_pesos_no_catalogo(tmp_path):
+    caminho = tmp_path / "app.db"
+    with Database(caminho) as db:
+        db.save_avaliacao_with_respostas("Ana", "Baixo", 1, [_resposta(1, "sim", 1)])
+
+    with Database(caminho, pesos={}) as db:
+        assert db.rescore_all() == {"avaliacoes": 0, "alteradas": 0}
+        assert db.get_avaliacao_completa(1)["score"] == 1
+
+
+def _criar_banco_da_versao_inicial(caminho):
+    """Banco com o schema de antes das migrações (sem schema_version)."""
+    conn = sqlite3.connect(caminho)
+    conn.executescript(
+        """
+        CREATE TABLE respostas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            eixo TEXT NOT NULL,
+            pergunta_id INTEGER NOT NULL,
+            pergunta_texto TEXT NOT NULL,
+            resposta INTEGER NOT NULL CHECK (resposta IN (0,1)),
+            pontos INTEGER DEFAULT 0,
+            data_criacao TIMESTAMP NOT NULL,
+            avaliacao_id INTEGER,
+            FOREIGN KEY (avaliacao_id) REFERENCES avaliacoes(id)
+        );
+        CREATE TABLE avaliacoes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome_paciente TEXT NOT NULL,
+            nivel_risco TEXT NOT NULL,
+            pontuacao INTEGER NOT NULL,
+            data_criacao TIMESTAMP NOT NULL
+        );
+        INSERT INTO avaliacoes VALUES
+            (1, 'José da Conceição', 'Baixo', 3, '2024-01-10 09:00:00'),
+            (2, 'Maria', 'Baixo', 0, '2024-01-11 10:30:00');
+        -- Texto repetido em cada resposta; 999 não existe no questions.json
+        INSERT INTO respostas VALUES
+            (1, 'Eixo antigo', 1, 'Texto antigo 1', 1, 2, '2024-01-10 09:00:00', 1),
+            (2, 'Eixo antigo', 999, 'Pergunta removida', 0, 1, '2024-01-10 09:00:00', 1),
+            (3, 'Eixo antigo', 999, 'Pergunta removida', 1, 0, '2024-01-11 10:30:00', 2);
+        """
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_migracoes_a_partir_da_versao_inicial_preservam_os_dados(tmp_path):
+    caminho = tmp_path / "antigo.db"
+    _criar_banco_da_versao_inicial(caminho)
+
+    with Database(caminho) as db:
+        assert db.get_schema_version() == MIGRATIONS[-1][0]
+        assert db.get_total_avaliacoes() == 2
+
+        ana = db.get_avaliacao_completa(1)
+        assert (ana["patient_name"], ana["level"], ana["score"]) == (
+            "José da Conceição",
+            "Baixo",
+            3,
+        )
+        assert [
+            (r["id"], r["pergunta_id"], r["resposta"], r["pontos"])
+            for r in ana["responses"]
+        ] == [(1, 1, "sim", 2), (2, 999, "nao", 1)]
+        # Pergunta fora do questions.json mantém o texto gravado
+        assert ana["responses"][1]["pergunta_texto"] == "Pergunta removida"
+        assert ana["responses"][1]["eixo_nome"] == "Eixo antigo"
+
+        # Índice de busca reconstruído com os nomes já gravados
+        resultados, _ = db.search_avaliacoes({"texto": "conceicao"}, limit=10)
+        assert [r["id"] for r in resultados] == [1]
+
+        colunas = {
+            row[1] for row in db._get_conn().execute("PRAGMA table_info(respostas)")
+        }
+        assert {"eixo", "pergunta_texto"}.isdisjoint(colunas)
+
+    # Reabrir não reaplica nada
+    with Database(caminho) as db:
+        assert db.get_schema_version() == MIGRATIONS[-1][0]
+        assert db.get_total_avaliacoes() == 2
+
+
+def test_paginacao_keyset_com_datas_empatadas(tmp_path):
+    db = Database(tmp_path / "app.db")
+    datas = [
+        datetime(2024, 1, 2),
+        datetime(2024, 1, 3),
+        datetime(2024, 1, 3),
+        datetime(2024, 1, 3),
+        datetime(2024, 1, 1),
+    ]
+    db.save_avaliacoes_bulk(
+        {
+            "nome_paciente": f"Paciente {i}",
+            "nivel_risco": "Baixo",
+            "pontuacao": 0,
+            "respostas": [],
+            "data_criacao": data,
+        }
+        for i, data in enumerate(datas)
+    )
+    # Mais recentes primeiro; o id desempata dentro da mesma data
+    esperado = [4, 3, 2, 1, 5]
+    assert [r["id"] for r in db.get_avaliacoes()] == esperado
+
+    paginas, cursor = [], None
+    while True:
+        # Página de 2: a primeira fronteira cai no meio do empate (3 | 2)
+        pagina, cursor = db.get_avaliacoes_page(2, after=cursor)
+        paginas.append([r["id"] for r in pagina])
+        if cursor is None:
+            break
+    assert paginas == [[4, 3], [2, 1], [5]]
+
+    chaves = db.get_avaliacoes_keys(10)
+    assert [id_ for _, id_ in chaves] == esperado
+    # Cada chave serve de cursor: continua exatamente depois dela
+    pagina, _ = db.get_avaliacoes_page(10, after=chaves[1])
+    assert [r["id"] for r in pagina] == esperado[2:]
+
+    # Página do tamanho exato do que resta não anuncia próxima
+    pagina, cursor = db.get_avaliacoes_page(3, after=chaves[1])
+    assert [r["id"] for r in pagina] == esperado[2:] and cursor is None
+    db.close()
+
+
+def _estado(db):
+    """(pontuação, nível, [(pergunta, resposta, pontos)]) de cada avaliação."""
+    return {
+        av["id"]: (
+            av["score"],
+            av["level"],
+            [(r["pergunta_id"], r["resposta"], r["pontos"]) for r in av["responses"]],
+        )
+        for av in db.iter_avaliacoes_completas()
+    }
+
+
+def test_update_resposta_concorda_com_rescore_all(tmp_path):
+    db = Database(tmp_path / "app.db")
+    pesos = db._get_pesos()
+    perguntas = sorted(pesos)[:6]
+    for i in range(4):
+        marcadas = {p: (i + j) % 3 != 0 for j, p in enumerate(perguntas)}
+        pontos = {p: pesos[p][0 if sim else 1] for p, sim in marcadas.items()}
+        total = sum(pontos.values())
+        db.save_avaliacao_with_respostas(
+            f"Paciente {i}",
+            get_risk_level(total),
+            total,
+            [_resposta(p, "sim" if marcadas[p] else "nao", pontos[p]) for p in perguntas],
+        )
+    assert db.rescore_all()["alteradas"] == 0
+
+    respostas = [
+        (r["id"], r["resposta"])
+        for av in db.iter_avaliacoes_completas()
+        for r in av["responses"]
+    ]
+    for resposta_id, atual in respostas[::2]:
+        novo = db.update_resposta(resposta_id, "nao" if atual == "sim" else "sim")
+        av = db.get_avaliacao(novo["avaliacao_id"])
+        assert (av["score"], av["level"]) == (novo["pontuacao"], novo["nivel_risco"])
+
+    depois_das_edicoes = _estado(db)
+    # Recalcular tudo do zero não encontra nada a corrigir
+    assert db.rescore_all() == {"avaliacoes": 4, "alteradas": 0}
+    assert _estado(db) == depois_das_edicoes
+    db.close()
+
+
+def test_save_avaliacoes_bulk_igual_a_salvar_uma_a_uma(tmp_path):
+    avaliacoes = [
+        {
+            "nome_paciente": f"Paciente {i}",
+            "nivel_risco": "Baixo",
+            "pontuacao": i,
+            "respostas": [_resposta(1, "sim", 2), _resposta(900 + i, i % 2, 1)],
+            "data_criacao": datetime(2024, 1, 1 + i),
+        }
+        for i in range(3)
+    ]
+    with Database(tmp_path / "uma_a_uma.db") as db:
+        for av in avaliacoes:
+            db.save_avaliacoes_bulk([av])
+        esperado = _estado(db)
+    with Database(tmp_path / "lote.db") as db:
+        assert db.save_avaliacoes_bulk(avaliacoes) == [1, 2, 3]
+        assert _estado(db) == esperado
+        # Perguntas fora do questions.json entram no catálogo
+        assert esperado[2] == (1, "Baixo", [(1, "sim", 2), (901, "sim", 1)])
+        assert db.get_avaliacao_completa(2)["responses"][1]["pergunta_texto"] == "Pergunta 901"
+
+
+def test_save_avaliacoes_bulk_e_atomico(tmp_path):
+    db = Database(tmp_path / "app.db")
+    valida = {
+        "nome_paciente": "Ana",
+        "nivel_risco": "Baixo",
+        "pontuacao": 1,
+        "respostas": [_resposta(950, "sim", 1)],
+    }
+    with pytest.raises(KeyError):
+        db.save_avaliacoes_bulk([valida, {"nome_paciente": "Sem pontuação"}])
+    assert db.get_total_avaliacoes() == 0
+
+    # A pergunta 950 do lote desfeito não ficou marcada como conhecida
+    avaliacao_id = db.save_avaliacao_with_respostas(**valida)
+    assert db.get_avaliacao_completa(avaliacao_id)["responses"][0]["pergunta_texto"] == (
+        "Pergunta 950"
+    )
+    db.close()
+
+
+def test_catalogo_sincronizado_do_questionario_compilado(tmp_path, monkeypatch):
+    import data_manager
+
+    def nao_usar():
+        raise AssertionError("questions.json reprocessado na abertura do banco")
+
+    monkeypatch.setattr(data_manager, "load_questions", nao_usar)
+    questionario = data_manager.load_compiled_questions()
+
+    with Database(tmp_path / "app.db") as db:
+        assert db._get_pesos() == {
+            p.id: (p.peso_sim, p.peso_nao) for p in questionario.perguntas
+        }
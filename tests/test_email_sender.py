@@ -0,0 +1,25 @@
+"""Envio por SMTP contra um servidor local (aiosmtpd)."""
+
+from conftest import attachment_names
+from email_sender import EmailSender
+
+
+def test_send_many_usa_uma_unica_sessao(smtp_sink):
+    sink, config = smtp_sink
+    envios = [
+        ("ana@example.com", "Ana", b"%PDF-1.4 a", "prontuario_Ana.pdf"),
+        ("joao@example.com", "João", b"%PDF-1.4 b", "prontuario_João_Conceição.pdf"),
+        ("anon@example.com", "Anônimo", b"%PDF-1.4 c", "prontuario_Anônimo.pdf"),
+    ]
+
+    resultados = EmailSender(config).send_many(envios)
+
+    assert [ok for ok, _ in resultados] == [True, True, True]
+    assert len(sink.mensagens) == 3
+    assert len(sink.sessoes()) == 1
+    for (email, _, pdf, nome), (_, destinatarios, msg) in zip(envios, sink.mensagens):
+        assert destinatarios == [email]
+        assert attachment_names(msg) == [nome]
+        anexo = next(p for p in msg.walk() if p.get_filename())
+        assert anexo.get_payload(decode=True) == pdf
+
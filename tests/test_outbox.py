@@ -0,0 +1,123 @@
+"""Entrega da outbox por uma sessão SMTP reaproveitada (aiosmtpd local)."""
+
+import logging
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+import outbox
+from batch_export import export_filename
+from conftest import attachment_names
+from db import Database
+from email_sender import EmailSender
+from outbox import OutboxWorker
+
+PACIENTES = ["Ana Souza", "José da Conceição", "Anônimo"]
+
+
+def _render(record):
+    return b"%PDF-1.4 prontuario " + str(record["id"]).encode()
+
+
+def _salvar(db, nome):
+    return db.save_avaliacao_with_respostas(
+        nome_paciente=nome,
+        nivel_risco="Baixo",
+        pontuacao=1,
+        respostas=[
+            {
+                "eixo_nome": "Eixo 1",
+                "question_id": 1,
+                "pergunta_texto": "Pergunta 1",
+                "resposta": "sim",
+                "pontos": 1,
+            }
+        ],
+    )
+
+
+def _entregar(db, config, itens):
+    """Enfileira (avaliacao_id, email, nome) e roda o worker até esvaziar."""
+    for avaliacao_id, email, nome in itens:
+        db.enqueue_email(avaliacao_id, email, nome)
+    worker = OutboxWorker(db, _render, sender_factory=lambda: EmailSender(config))
+    worker.start()
+    try:
+        prazo = time.monotonic() + 15
+        while db.get_outbox_counts().get("enviado", 0) < len(itens):
+            assert time.monotonic() < prazo, db.get_outbox()
+            time.sleep(0.05)
+    finally:
+        worker.stop()
+
+
+def test_lote_da_outbox_em_uma_sessao(tmp_path, smtp_sink):
+    sink, config = smtp_sink
+    db = Database(tmp_path / "outbox.db")
+    itens = [
+        (_salvar(db, nome), f"paciente{i}@example.com", nome)
+        for i, nome in enumerate(PACIENTES)
+    ]
+
+    _entregar(db, config, itens)
+
+    assert len(sink.mensagens) == len(itens)
+    assert len(sink.sessoes()) == 1
+    recebidas = {destinatarios[0]: msg for _, destinatarios, msg in sink.mensagens}
+    for avaliacao_id, email, _ in itens:
+        msg = recebidas[email]
+        assert attachment_names(msg) == [export_filename(db.get_avaliacao(avaliacao_id))]
+        anexo = next(p for p in msg.walk() if p.get_filename())
+        assert anexo.get_payload(decode=True) == _render({"id": avaliacao_id})
+    db.close()
+
+
+def test_worker_sobrevive_a_erro_do_banco(tmp_path, smtp_sink, monkeypatch, caplog):
+    sink, config = smtp_sink
+    db = Database(tmp_path / "outbox.db")
+    itens = [(_salvar(db, "Ana Souza"), "ana@example.com", "Ana Souza")]
+
+    claim_original = db.claim_outbox
+    chamadas = []
+
+    def claim_travado(*args, **kwargs):
+        chamadas.append(args)
+        if len(chamadas) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return claim_original(*args, **kwargs)
+
+    monkeypatch.setattr(db, "claim_outbox", claim_travado)
+    monkeypatch.setattr(outbox, "ERROR_BACKOFF_SECONDS", 0.05)
+
+    with caplog.at_level(logging.ERROR, logger="outbox"):
+        _entregar(db, config, itens)
+
+    assert len(chamadas) >= 2
+    assert "database is locked" in caplog.text
+    assert len(sink.mensagens) == 1
+    db.close()
+
+
+def test_recover_outbox_nao_devolve_reservas_de_outra_instancia(tmp_path):
+    db = Database(tmp_path / "outbox.db")
+    avaliacao_id = _salvar(db, "Ana Souza")
+    for i in range(2):
+        db.enqueue_email(avaliacao_id, f"p{i}@example.com", "Ana Souza")
+    (nossa,) = db.claim_outbox(limit=1, dono="worker-a")
+    (alheia,) = db.claim_outbox(limit=1, dono="worker-b")
+
+    assert db.recover_outbox("worker-a") == 1
+    status = {item["id"]: item["status"] for item in db.get_outbox()}
+    assert status == {nossa["id"]: "pendente", alheia["id"]: "enviando"}
+
+    # Reserva recente de outro dono não é tida como abandonada...
+    assert db.recover_outbox("worker-c", timedelta(hours=1)) == 0
+    # ...uma antiga, sim
+    with db._transaction() as cursor:
+        cursor.execute(
+            "UPDATE outbox SET reservado_em = ? WHERE id = ?",
+            ((datetime.now() - timedelta(hours=2)).isoformat(" "), alheia["id"]),
+        )
+    assert db.recover_outbox("worker-c", timedelta(hours=1)) == 1
+    assert db.get_outbox_counts() == {"pendente": 2}
+    db.close()
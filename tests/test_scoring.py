@@ -0,0 +1,63 @@
+"""Pontuação em lote (scoring): NumPy e Python puro dão o mesmo resultado."""
+
+import random
+
+import pytest
+
+from data_manager import load_compiled_questions
+from scoring import SEM_RESPOSTA, TabelaPesos, risk_levels, score_batch
+from utils import get_risk_level
+
+np = pytest.importorskip("numpy")
+
+
+def _como_listas(resultado):
+    return {chave: np.asarray(valor).tolist() for chave, valor in resultado.items()}
+
+
+def _matriz(linhas, colunas, seed=0):
+    sorteio = random.Random(seed)
+    return [
+        [sorteio.choice((1, 0, SEM_RESPOSTA)) for _ in range(colunas)]
+        for _ in range(linhas)
+    ]
+
+
+def test_score_batch_igual_com_e_sem_numpy():
+    questionario = load_compiled_questions()
+    matriz = _matriz(200, len(questionario.pesos_sim))
+    # Extremos: tudo sim, tudo não, nada respondido
+    for valor in (1, 0, SEM_RESPOSTA):
+        matriz.append([valor] * len(questionario.pesos_sim))
+
+    vetorizado = score_batch(matriz, questionario, use_numpy=True)
+    puro = score_batch(matriz, questionario, use_numpy=False)
+
+    assert _como_listas(vetorizado) == _como_listas(puro)
+    # Mesmo total e nível que a pontuação pergunta a pergunta
+    for linha, total, nivel in zip(matriz, puro["totais"], puro["niveis"]):
+        esperado = sum(
+            questionario.pesos_sim[i] if v == 1 else questionario.pesos_nao[i]
+            for i, v in enumerate(linha)
+            if v != SEM_RESPOSTA
+        )
+        assert (total, nivel) == (esperado, get_risk_level(esperado))
+
+
+def test_score_batch_subtotais_por_eixo_e_lote_vazio():
+    tabela = TabelaPesos([2, 3, 1, 4], [1, 0, 2, 1], (0, 2))
+    matriz = [[1, 0, 1, SEM_RESPOSTA], [SEM_RESPOSTA, 1, 0, 1]]
+    for use_numpy in (True, False):
+        resultado = _como_listas(score_batch(matriz, tabela, use_numpy=use_numpy))
+        assert resultado["subtotais"] == [[2, 1], [3, 6]]
+        assert resultado["totais"] == [3, 9]
+
+        vazio = _como_listas(score_batch([], tabela, use_numpy=use_numpy))
+        assert vazio["totais"] == [] and vazio["niveis"] == []
+
+
+def test_risk_levels_igual_a_get_risk_level():
+    totais = list(range(-5, 200))
+    esperado = [get_risk_level(t) for t in totais]
+    assert list(risk_levels(totais, use_numpy=False)) == esperado
+    assert risk_levels(totais, use_numpy=True).tolist() == esperado
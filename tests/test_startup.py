@@ -0,0 +1,52 @@
+"""A abertura do app não deve carregar os módulos pesados (main.HEAVY_MODULES)."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import APP_DIR
+
+pytest.importorskip("PyQt6")
+
+
+def _rodar(argumentos, **kwargs):
+    # Processo novo: o do pytest já pode ter importado esses módulos
+    return subprocess.run(
+        [sys.executable, *argumentos],
+        cwd=APP_DIR,
+        capture_output=True,
+        text=True,
+        timeout=60,
+        check=True,
+        **kwargs,
+    )
+
+
+def test_importar_main_nao_carrega_modulos_pesados():
+    saida = _rodar(
+        [
+            "-c",
+            "import sys, main; "
+            "print(','.join(m for m in main.HEAVY_MODULES if m in sys.modules))",
+        ]
+    )
+    assert saida.stdout.strip() == ""
+
+
+def test_abertura_ate_interativo_sem_modulos_pesados(tmp_path):
+    relatorio = tmp_path / "inicio.txt"
+    env = dict(
+        os.environ,
+        APP_STARTUP_REPORT="exit",
+        APP_STARTUP_REPORT_FILE=str(relatorio),
+        HOME=str(tmp_path),
+        USERPROFILE=str(tmp_path),
+        QT_QPA_PLATFORM="offscreen",
+    )
+    _rodar(["main.py"], env=env)
+
+    texto = relatorio.read_text(encoding="utf-8")
+    assert "interativo" in texto
+    assert "módulos pesados: nenhum" in texto